@@ -5,17 +5,22 @@ from dataclasses import dataclass
 from enum import Enum, auto
 import re
 
-from smt.util import Memory, TransactionalMapping, TransactionalSet
+from smt.util import Memory, TransactionalMapping, TransactionalSet, BoundedCache
 from smt.logic import Sort, Expr, Symbol, ValencySymbol, WrapperSymbol, \
     NegatorSymbol, VariableSymbol, FunctionSymbol, MacroSymbol, \
-    boolean, BooleanConstSymbol, BooleanConnectiveSymbol, \
+    BooleanConstSymbol, BooleanConnectiveSymbol, \
     BooleanImplicationSymbol, BooleanEqSymbol, \
     integer, IntegerEqSymbol, IntegerSumSymbol, IntegerDiffSymbol, \
-    boolean_and, TseitinVarSymbol, to_cnf, \
-    Model, Status
+    ExprBuilder, TseitinVarSymbol, to_cnf, \
+    ComponentResult, ComponentModel, Status
 from smt.interpreters.scanner_base import Position, Message, MessageSet, AbstractScanner
 from smt.interpreters.parser_base import Node, SequenceNode, VoidVisitor
 
+try:
+    from smt.logic.sweeping import sweep
+except ImportError:
+    sweep = None
+
 
 # -----------------------------------------------------------------------------
 
@@ -594,7 +599,7 @@ class SymbolTable:
         seen: 'MutableSet[Expr]' = set()
         labels: 'MutableMapping[Expr, str]' = {}
 
-        def find_duplicates(e: 'Expr') -> 'None':
+        for e in expr.postorder():
             for π in e.args:
                 if (π in seen) and (len(π.args) > 0) and not isinstance(π.symbol, NegatorSymbol):
                     labels[π] = f"[{len(labels)+1}]"
@@ -624,7 +629,6 @@ class SymbolTable:
                 image = _Image(True, var)
             return image
 
-        expr.bottom_up(find_duplicates)
         lines = expr.bottom_up_eval(make_image).get_lines(0)
         if len(refs) > 0:
             lines.append("where")
@@ -644,13 +648,24 @@ class SymbolTable:
 
 
 class Smtlib(VoidVisitor[Tag]):
-    def __init__(self, ms: 'MessageSet') -> 'None':
+    def __init__(self,
+                 ms: 'MessageSet',
+                 lazy_macros: 'bool' = False,
+                 workers: 'int' = 0,
+                 bdd_limit: 'int' = 16,
+                 sweeping: 'bool' = False) -> 'None':
+        if sweeping and sweep is None:
+            raise ValueError("SAT sweeping needs numpy")
         self.__ms = ms
+        self.__lazy_macros = lazy_macros
+        self.__workers, self.__bdd_limit = workers, bdd_limit
+        self.__sweeping = sweeping
+        self.__solved: 'BoundedCache[Expr, ComponentResult]' = BoundedCache(1 << 10)
         self.__mem = Memory()
         self.__symbols = SymbolTable(self.__mem)
         self.__assertions: 'MutableSet[Expr]' = TransactionalSet(self.__mem)
         self.__stack = _ExprStack()
-        self.__model: 'Optional[Model]' = None
+        self.__model: 'Optional[ComponentModel]' = None
 
     @property
     def symbols(self) -> 'SymbolTable':
@@ -658,9 +673,7 @@ class Smtlib(VoidVisitor[Tag]):
 
     @property
     def assertion(self) -> 'Expr':
-        if len(self.__assertions) == 0:
-            return boolean(True)
-        return boolean_and(*self.__assertions)
+        return ExprBuilder(BooleanConnectiveSymbol(True)).extend(self.__assertions).build()
 
     def execute(self, pos: 'Position') -> 'None':
         self._visit(CommandListNode(Scanner(pos, self.__ms)))
@@ -681,18 +694,23 @@ class Smtlib(VoidVisitor[Tag]):
             self.__assertions.add(expr)
 
     def _visit_check_sat_node(self, _: 'CheckSatNode') -> 'None':
-        self.__model = Model(self.assertion)
+        assertion = self.assertion
+        if self.__sweeping:
+            assertion = sweep(assertion)
+        self.__model = ComponentModel((assertion,), self.__workers, self.__solved, self.__bdd_limit)
         self.__model.solve()
         print(self.__model.status)
 
     def _visit_declare_const_node(self, node: 'DeclareConstNode') -> 'None':
         sort = node.sort.value if node.sort.is_consistent else Sort.UNKNOWN
-        self.__declare_symbol(node.ident, VariableSymbol(sort))
+        name = node.ident.name if node.ident.is_consistent else None
+        self.__declare_symbol(node.ident, VariableSymbol(sort, name))
 
     def _visit_declare_fun_node(self, node: 'DeclareFunNode') -> 'None':
         arg_sorts = tuple(π.value if π.is_consistent else Sort.UNKNOWN for π in node.args)
         sort = node.sort.value if node.sort.is_consistent else Sort.UNKNOWN
-        symbol = FunctionSymbol(sort, arg_sorts)
+        name = node.ident.name if node.ident.is_consistent else None
+        symbol = FunctionSymbol(sort, arg_sorts, name)
         self.__declare_symbol(node.ident, symbol)
 
     def _visit_define_fun_node(self, node: 'DefineFunNode') -> 'None':
@@ -712,7 +730,7 @@ class Smtlib(VoidVisitor[Tag]):
             sort = node.sort.value
         if isinstance(body.symbol, ValencySymbol) and sort != body.symbol.sort:
             self.__ms.add(Message(node.sort.start, "invalid function definition, sort mismatch"))
-        symbol = MacroSymbol(sort, tuple(formal_args), body)
+        symbol = MacroSymbol(sort, tuple(formal_args), body, self.__lazy_macros)
         self.__declare_symbol(node.ident, symbol)
 
     def _visit_get_model_node(self, node: 'CheckSatNode') -> 'None':
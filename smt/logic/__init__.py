@@ -1,6 +1,6 @@
-from smt.logic.symbols_base import Sort, Expr, \
-    Symbol, ValencySymbol, WrapperSymbol, \
-    NegatorSymbol, VariableSymbol, FunctionSymbol, MacroSymbol
+from smt.logic.symbols_base import Sort, Expr, Substitution, Traversal, IncrementalEval, Fingerprinter, \
+    ConnectiveTrait, CommutativeTrait, Symbol, ValencySymbol, ApplicationStatistics, RetentionPolicy, \
+    WeakRetentionPolicy, WrapperSymbol, NegatorSymbol, VariableSymbol, FunctionSymbol, MacroSymbol, expand_macros
 from smt.logic.builtin_symbols import \
     BooleanConstSymbol, boolean, \
     BooleanConnectiveSymbol, boolean_and, boolean_or, \
@@ -10,5 +10,9 @@ from smt.logic.builtin_symbols import \
     IntegerConstSymbol, integer, \
     IntegerSumSymbol, integer_sum, \
     IntegerDiffSymbol, integer_diff, \
-    TseitinVarSymbol, to_cnf
+    ExprBuilder, TseitinVarSymbol, to_cnf
+from smt.logic.rewriting import DiscriminationTree, Rule, RewriteSystem
+from smt.logic.aig import AIG, aig_minimize
 from smt.logic.dpll import Literal, Clause, Assignment, Status, Model
+from smt.logic.bdd import BDD, BddModel
+from smt.logic.components import partition, ComponentResult, ComponentModel
@@ -0,0 +1,439 @@
+from typing import Optional, Tuple, List, Dict, Set, Iterable, Sequence, Mapping
+from heapq import heappush, heappop
+
+from smt.logic.symbols_base import Sort, Expr, NegatorSymbol, VariableSymbol, expand_macros
+from smt.logic.builtin_symbols import BooleanConstSymbol, BooleanConnectiveSymbol, ExprBuilder, \
+    boolean, boolean_or
+
+
+# -----------------------------------------------------------------------------
+
+
+# A literal is twice the index of its node plus the complement bit. Node 0 is
+# the constant false, so literals 0 and 1 stand for false and true.
+FALSE, TRUE = 0, 1
+
+_CUT_SIZE = 4
+_MAX_CUTS = 8
+_FULL = 0xFFFF
+_VAR_TABLES = (0xAAAA, 0xCCCC, 0xF0F0, 0xFF00)
+
+_Cover = List[Tuple[int, ...]]
+
+
+class AIG:
+    def __init__(self) -> 'None':
+        self.__left: 'List[int]' = [-1]
+        self.__right: 'List[int]' = [-1]
+        self.__levels: 'List[int]' = [0]
+        self.__strash: 'Dict[Tuple[int, int], int]' = {}
+        self.__inputs: 'Dict[Expr, int]' = {}
+        self.__input_exprs: 'Dict[int, Expr]' = {}
+
+    @property
+    def node_count(self) -> 'int':
+        return len(self.__left)
+
+    @property
+    def and_count(self) -> 'int':
+        return len(self.__left) - len(self.__inputs) - 1
+
+    @property
+    def inputs(self) -> 'Tuple[Expr, ...]':
+        return tuple(self.__inputs)
+
+    def input(self, expr: 'Expr') -> 'int':
+        assert expr.symbol.sort == Sort.BOOL
+        n = self.__inputs.get(expr)
+        if n is None:
+            n = self.__new_node(-1, -1, 0)
+            self.__inputs[expr], self.__input_exprs[n] = n, expr
+        return n << 1
+
+    def is_input(self, lit: 'int') -> 'bool':
+        return (lit >> 1) in self.__input_exprs
+
+    def is_and(self, lit: 'int') -> 'bool':
+        return self.__left[lit >> 1] >= 0
+
+    def input_expr(self, lit: 'int') -> 'Expr':
+        return self.__input_exprs[lit >> 1]
+
+    def fanins(self, lit: 'int') -> 'Tuple[int, int]':
+        n = lit >> 1
+        return self.__left[n], self.__right[n]
+
+    def level(self, lit: 'int') -> 'int':
+        return self.__levels[lit >> 1]
+
+    def conjoin(self, a: 'int', b: 'int') -> 'int':
+        if a > b:
+            a, b = b, a
+        if a == FALSE or a == b ^ 1:
+            return FALSE
+        if a == TRUE or a == b:
+            return b
+        n = self.__strash.get((a, b))
+        if n is None:
+            n = self.__new_node(a, b, max(self.__levels[a >> 1], self.__levels[b >> 1]) + 1)
+            self.__strash[(a, b)] = n
+        return n << 1
+
+    def disjoin(self, a: 'int', b: 'int') -> 'int':
+        return self.conjoin(a ^ 1, b ^ 1) ^ 1
+
+    def conjoin_many(self, lits: 'Iterable[int]') -> 'int':
+        # The two shallowest operands are paired first, which keeps the result
+        # as shallow as the levels of the operands allow.
+        heap: 'List[Tuple[int, int]]' = []
+        for λ in lits:
+            heappush(heap, (self.level(λ), λ))
+        if len(heap) == 0:
+            return TRUE
+        while len(heap) > 1:
+            _, a = heappop(heap)
+            _, b = heappop(heap)
+            c = self.conjoin(a, b)
+            heappush(heap, (self.level(c), c))
+        return heap[0][1]
+
+    def add_expr(self, expr: 'Expr') -> 'int':
+        assert expr.symbol.sort == Sort.BOOL
+        expr = expand_macros(expr)
+        memo: 'Dict[Expr, int]' = {}
+        stack: 'List[Expr]' = [expr]
+        while len(stack) > 0:
+            ε = stack[-1]
+            if ε in memo:
+                stack.pop()
+                continue
+            sym = ε.symbol
+            if isinstance(sym, BooleanConstSymbol):
+                memo[ε] = TRUE if sym.value else FALSE
+            elif isinstance(sym, (NegatorSymbol, BooleanConnectiveSymbol)) and sym.sort == Sort.BOOL:
+                pending = [π for π in ε.args if π not in memo]
+                if len(pending) > 0:
+                    stack.extend(pending)
+                    continue
+                lits = [memo[π] for π in ε.args]
+                if isinstance(sym, NegatorSymbol):
+                    memo[ε] = lits[0] ^ 1
+                elif sym.neutral_elem:
+                    memo[ε] = self.conjoin_many(lits)
+                else:
+                    memo[ε] = self.conjoin_many(λ ^ 1 for λ in lits) ^ 1
+            else:
+                memo[ε] = self.input(ε)
+            stack.pop()
+        return memo[expr]
+
+    def to_expr(self, lit: 'int') -> 'Expr':
+        return self.to_exprs((lit,))[0]
+
+    def to_exprs(self, lits: 'Sequence[int]') -> 'List[Expr]':
+        memo: 'Dict[int, Expr]' = {0: boolean(False)}
+
+        def expr_of(λ: 'int') -> 'Expr':
+            e = memo[λ >> 1]
+            return e.negated if λ & 1 else e
+
+        for n, leaves in self.__supergates(lits):
+            if leaves is None:
+                memo[n] = self.__input_exprs[n]
+            else:
+                memo[n] = ExprBuilder(BooleanConnectiveSymbol(True)).extend(expr_of(λ) for λ in leaves).build()
+        return [expr_of(λ) for λ in lits]
+
+    def to_cnf(self, lits: 'Sequence[int]') -> 'Expr':
+        names: 'Dict[int, Expr]' = {0: boolean(False)}
+
+        def expr_of(λ: 'int') -> 'Expr':
+            e = names[λ >> 1]
+            return e.negated if λ & 1 else e
+
+        clauses = ExprBuilder(BooleanConnectiveSymbol(True))
+        for n in self.__cone(lits):
+            if n in self.__input_exprs:
+                names[n] = self.__input_exprs[n]
+            elif n != 0:
+                names[n] = v = VariableSymbol(Sort.BOOL).apply()
+                a, b = expr_of(self.__left[n]), expr_of(self.__right[n])
+                clauses.add(boolean_or(v.negated, a), boolean_or(v.negated, b),
+                            boolean_or(v, a.negated, b.negated))
+        return clauses.extend(expr_of(λ) for λ in lits).build()
+
+    def simulate(self, lits: 'Sequence[int]', patterns: 'Mapping[Expr, int]', width: 'int') -> 'List[int]':
+        # Every input carries `width` independent bits, so one pass evaluates
+        # the graph under `width` assignments at once.
+        mask = (1 << width) - 1
+        values: 'Dict[int, int]' = {0: 0}
+
+        def value_of(λ: 'int') -> 'int':
+            v = values[λ >> 1]
+            return v ^ mask if λ & 1 else v
+
+        for n in self.__cone(lits):
+            if n in self.__input_exprs:
+                values[n] = patterns[self.__input_exprs[n]] & mask
+            elif n != 0:
+                values[n] = value_of(self.__left[n]) & value_of(self.__right[n])
+        return [value_of(λ) for λ in lits]
+
+    def cleanup(self, lits: 'Sequence[int]') -> 'Tuple[AIG, List[int]]':
+        aig = AIG()
+        memo: 'Dict[int, int]' = {0: FALSE}
+        for n in self.__cone(lits):
+            if n in self.__input_exprs:
+                memo[n] = aig.input(self.__input_exprs[n])
+            elif n != 0:
+                memo[n] = aig.conjoin(_map(memo, self.__left[n]), _map(memo, self.__right[n]))
+        return aig, [_map(memo, λ) for λ in lits]
+
+    def balance(self, lits: 'Sequence[int]') -> 'Tuple[AIG, List[int]]':
+        aig = AIG()
+        memo: 'Dict[int, int]' = {0: FALSE}
+        for n, leaves in self.__supergates(lits):
+            if leaves is None:
+                memo[n] = aig.input(self.__input_exprs[n])
+            else:
+                memo[n] = aig.conjoin_many(_map(memo, λ) for λ in leaves)
+        return aig, [_map(memo, λ) for λ in lits]
+
+    def rewrite(self, lits: 'Sequence[int]') -> 'Tuple[AIG, List[int]]':
+        # Every node is rebuilt either from its two fanins or, if that is
+        # estimated to save nodes, from the irredundant sum of products of its
+        # function over one of its cuts of at most four leaves. The estimate
+        # counts the nodes of the maximum fanout-free cone that would die
+        # against the nodes the new implementation adds or keeps alive.
+        cone = self.__cone(lits)
+        refs = self.__fanouts(cone, lits)
+        cuts = self.__enumerate_cuts(cone)
+        aig = AIG()
+        memo: 'Dict[int, int]' = {0: FALSE}
+        for n in cone:
+            if n in self.__input_exprs:
+                memo[n] = aig.input(self.__input_exprs[n])
+                continue
+            if n == 0:
+                continue
+            mark = aig.node_count
+            res = aig.conjoin(_map(memo, self.__left[n]), _map(memo, self.__right[n]))
+            default_added = aig.node_count - mark
+            best_gain, best = 0, None
+            for cut in cuts[n][1:]:
+                mffc = self.__mffc(n, cut, refs)
+                if len(mffc) < 2:
+                    continue
+                table = self.__truth_table(n, cut)
+                leaves = [memo[κ] for κ in cut]
+                trial = aig.node_count
+                candidate = aig.__synthesize(table, leaves)
+                added = aig.node_count - trial
+                images = {memo[μ] >> 1 for μ in mffc if μ != n}
+                alive = aig.__count_in_cone(candidate, images, {λ >> 1 for λ in leaves})
+                aig.__truncate(trial)
+                gain = default_added + len(mffc) - 1 - added - alive
+                if gain > best_gain:
+                    best_gain, best = gain, (table, leaves)
+            if best is not None:
+                res = aig.__synthesize(*best)
+            memo[n] = res
+        rewritten, roots = aig.cleanup([_map(memo, λ) for λ in lits])
+        original, original_roots = self.cleanup(lits)
+        if rewritten.and_count < original.and_count:
+            return rewritten, roots
+        return original, original_roots
+
+    def __new_node(self, left: 'int', right: 'int', level: 'int') -> 'int':
+        self.__left.append(left)
+        self.__right.append(right)
+        self.__levels.append(level)
+        return len(self.__left) - 1
+
+    def __truncate(self, count: 'int') -> 'None':
+        for n in range(count, len(self.__left)):
+            assert n not in self.__input_exprs
+            del self.__strash[(self.__left[n], self.__right[n])]
+        del self.__left[count:], self.__right[count:], self.__levels[count:]
+
+    def __cone(self, lits: 'Iterable[int]') -> 'List[int]':
+        # Fanins always precede a node, so ascending indices are a topological
+        # order.
+        seen: 'Set[int]' = set()
+        stack = [λ >> 1 for λ in lits]
+        while len(stack) > 0:
+            n = stack.pop()
+            if n not in seen:
+                seen.add(n)
+                if self.__left[n] >= 0:
+                    stack.append(self.__left[n] >> 1)
+                    stack.append(self.__right[n] >> 1)
+        return sorted(seen)
+
+    def __fanouts(self, cone: 'Iterable[int]', lits: 'Iterable[int]') -> 'Dict[int, int]':
+        refs: 'Dict[int, int]' = {}
+        for n in cone:
+            if self.__left[n] >= 0:
+                for λ in (self.__left[n], self.__right[n]):
+                    refs[λ >> 1] = refs.get(λ >> 1, 0) + 1
+        for λ in lits:
+            refs[λ >> 1] = refs.get(λ >> 1, 0) + 1
+        return refs
+
+    def __supergates(self, lits: 'Sequence[int]') -> 'List[Tuple[int, Optional[List[int]]]]':
+        # A supergate is a maximal tree of uncomplemented AND edges whose inner
+        # nodes have no other fanout; only the nodes it is rooted at are kept.
+        cone = self.__cone(lits)
+        refs = self.__fanouts(cone, lits)
+        needed = {λ >> 1 for λ in lits}
+        gates: 'Dict[int, Optional[List[int]]]' = {}
+        for n in reversed(cone):
+            if n not in needed or n == 0:
+                continue
+            if self.__left[n] < 0:
+                gates[n] = None
+                continue
+            leaves: 'List[int]' = []
+            stack = [self.__right[n], self.__left[n]]
+            while len(stack) > 0:
+                λ = stack.pop()
+                m = λ >> 1
+                if not λ & 1 and self.__left[m] >= 0 and refs[m] == 1:
+                    stack.append(self.__right[m])
+                    stack.append(self.__left[m])
+                else:
+                    leaves.append(λ)
+                    needed.add(m)
+            gates[n] = leaves
+        return sorted(gates.items())
+
+    def __enumerate_cuts(self, cone: 'Iterable[int]') -> 'Dict[int, List[Tuple[int, ...]]]':
+        cuts: 'Dict[int, List[Tuple[int, ...]]]' = {}
+        for n in cone:
+            if self.__left[n] < 0:
+                cuts[n] = [(n,)]
+                continue
+            merged: 'Set[Tuple[int, ...]]' = set()
+            for a in cuts[self.__left[n] >> 1]:
+                for b in cuts[self.__right[n] >> 1]:
+                    c = tuple(sorted(set(a) | set(b)))
+                    if len(c) <= _CUT_SIZE:
+                        merged.add(c)
+            kept: 'List[Tuple[int, ...]]' = []
+            for c in sorted(merged, key=lambda κ: (len(κ), κ)):
+                if not any(set(d) <= set(c) for d in kept):
+                    kept.append(c)
+                    if len(kept) == _MAX_CUTS:
+                        break
+            cuts[n] = [(n,), *kept]
+        return cuts
+
+    def __mffc(self, n: 'int', cut: 'Tuple[int, ...]', refs: 'Mapping[int, int]') -> 'List[int]':
+        leaves = set(cut)
+        counts: 'Dict[int, int]' = {}
+        nodes: 'List[int]' = []
+        stack = [n]
+        while len(stack) > 0:
+            m = stack.pop()
+            nodes.append(m)
+            for λ in (self.__left[m], self.__right[m]):
+                f = λ >> 1
+                if f in leaves or self.__left[f] < 0:
+                    continue
+                counts[f] = counts.get(f, refs[f]) - 1
+                if counts[f] == 0:
+                    stack.append(f)
+        return nodes
+
+    def __truth_table(self, n: 'int', cut: 'Tuple[int, ...]') -> 'int':
+        tables: 'Dict[int, int]' = {κ: _VAR_TABLES[i] for i, κ in enumerate(cut)}
+
+        def table_of(λ: 'int') -> 'int':
+            t = tables[λ >> 1]
+            return t ^ _FULL if λ & 1 else t
+
+        stack = [n]
+        while len(stack) > 0:
+            m = stack[-1]
+            if m in tables:
+                stack.pop()
+                continue
+            assert self.__left[m] >= 0
+            pending = [λ >> 1 for λ in (self.__left[m], self.__right[m]) if (λ >> 1) not in tables]
+            if len(pending) > 0:
+                stack.extend(pending)
+                continue
+            tables[m] = table_of(self.__left[m]) & table_of(self.__right[m])
+            stack.pop()
+        return tables[n]
+
+    def __synthesize(self, table: 'int', leaves: 'Sequence[int]') -> 'int':
+        if table == 0:
+            return FALSE
+        if table == _FULL:
+            return TRUE
+        positive, negative = _isop(table, table, len(leaves))[0], _isop(table ^ _FULL, table ^ _FULL, len(leaves))[0]
+        if _cover_cost(negative) < _cover_cost(positive):
+            return self.__build_cover(negative, leaves) ^ 1
+        return self.__build_cover(positive, leaves)
+
+    def __build_cover(self, cover: '_Cover', leaves: 'Sequence[int]') -> 'int':
+        cubes = [self.conjoin_many(leaves[κ >> 1] ^ (κ & 1) for κ in cube) for cube in cover]
+        return self.conjoin_many(γ ^ 1 for γ in cubes) ^ 1
+
+    def __count_in_cone(self, lit: 'int', nodes: 'Set[int]', leaves: 'Set[int]') -> 'int':
+        count, seen, stack = 0, set(), [lit >> 1]
+        while len(stack) > 0:
+            n = stack.pop()
+            if n in seen or n in leaves or self.__left[n] < 0:
+                continue
+            seen.add(n)
+            count += n in nodes
+            stack.append(self.__left[n] >> 1)
+            stack.append(self.__right[n] >> 1)
+        return count
+
+
+def _map(memo: 'Mapping[int, int]', lit: 'int') -> 'int':
+    return memo[lit >> 1] ^ (lit & 1)
+
+
+def _cofactors(table: 'int', i: 'int') -> 'Tuple[int, int]':
+    m, shift = _VAR_TABLES[i], 1 << i
+    t0, t1 = table & ~m & _FULL, table & m
+    return t0 | (t0 << shift), t1 | (t1 >> shift)
+
+
+def _isop(lower: 'int', upper: 'int', n: 'int') -> 'Tuple[_Cover, int]':
+    # Minato-Morreale: an irredundant cover of some function between `lower`
+    # and `upper`, as cubes of literals 2 * variable + complement bit.
+    if lower == 0:
+        return [], 0
+    if upper == _FULL:
+        return [()], _FULL
+    i = n - 1
+    while _cofactors(lower, i)[0] == lower and _cofactors(upper, i)[0] == upper:
+        i -= 1
+    l0, l1 = _cofactors(lower, i)
+    u0, u1 = _cofactors(upper, i)
+    c0, f0 = _isop(l0 & ~u1 & _FULL, u0, i)
+    c1, f1 = _isop(l1 & ~u0 & _FULL, u1, i)
+    c2, f2 = _isop((l0 & ~f0 | l1 & ~f1) & _FULL, u0 & u1, i)
+    m = _VAR_TABLES[i]
+    cover = [(*γ, 2 * i + 1) for γ in c0] + [(*γ, 2 * i) for γ in c1] + c2
+    return cover, (f0 & ~m | f1 & m | f2) & _FULL
+
+
+def _cover_cost(cover: '_Cover') -> 'int':
+    return sum(max(len(γ) - 1, 0) for γ in cover) + len(cover) - 1
+
+
+def aig_minimize(expr: 'Expr') -> 'Expr':
+    aig = AIG()
+    root = aig.add_expr(expr)
+    aig, (root,) = aig.balance((root,))
+    aig, (root,) = aig.rewrite((root,))
+    return aig.to_expr(root)
+
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,366 @@
+from typing import Optional, Tuple, List, Dict, Set, Iterable, Sequence, Callable, Any
+
+from smt.util import BoundedCache
+from smt.logic import Sort, Expr, NegatorSymbol, VariableSymbol, BooleanConstSymbol, BooleanConnectiveSymbol, \
+    expand_macros, boolean
+from smt.logic.dpll import Status
+
+
+# -----------------------------------------------------------------------------
+
+
+FALSE, TRUE = 0, 1
+
+
+class BDD:
+    def __init__(self, cache_size: 'int' = 1 << 16) -> 'None':
+        self.__var: 'List[int]' = [-1, -1]
+        self.__low: 'List[int]' = [FALSE, TRUE]
+        self.__high: 'List[int]' = [FALSE, TRUE]
+        self.__unique: 'List[Dict[Tuple[int, int], int]]' = []
+        self.__variables: 'List[Expr]' = []
+        self.__indices: 'Dict[Expr, int]' = {}
+        self.__order: 'List[int]' = []
+        self.__levels: 'List[int]' = []
+        self.__computed: 'BoundedCache[Tuple[Any, ...], int]' = BoundedCache(cache_size)
+
+    @property
+    def variables(self) -> 'Tuple[Expr, ...]':
+        return tuple(self.__variables)
+
+    @property
+    def order(self) -> 'Tuple[Expr, ...]':
+        return tuple(self.__variables[υ] for υ in self.__order)
+
+    @property
+    def node_count(self) -> 'int':
+        return len(self.__var)
+
+    def variable(self, expr: 'Expr') -> 'int':
+        assert expr.symbol.sort == Sort.BOOL
+        υ = self.__indices.get(expr)
+        if υ is None:
+            υ = len(self.__variables)
+            self.__variables.append(expr)
+            self.__indices[expr] = υ
+            self.__unique.append({})
+            self.__levels.append(len(self.__order))
+            self.__order.append(υ)
+        return self.__mk(υ, FALSE, TRUE)
+
+    def top(self, f: 'int') -> 'Optional[Expr]':
+        υ = self.__var[f]
+        return None if υ < 0 else self.__variables[υ]
+
+    def cofactors(self, f: 'int') -> 'Tuple[int, int]':
+        return self.__low[f], self.__high[f]
+
+    def ite(self, f: 'int', g: 'int', h: 'int') -> 'int':
+        if f == TRUE:
+            return g
+        if f == FALSE:
+            return h
+        if g == h:
+            return g
+        if g == TRUE and h == FALSE:
+            return f
+        key = (f, g, h)
+        res = self.__computed.get(key)
+        if res is None:
+            level = min(self.__level(f), self.__level(g), self.__level(h))
+            f0, f1 = self.__cofactors(f, level)
+            g0, g1 = self.__cofactors(g, level)
+            h0, h1 = self.__cofactors(h, level)
+            res = self.__mk(self.__order[level], self.ite(f0, g0, h0), self.ite(f1, g1, h1))
+            self.__computed.put(key, res)
+        return res
+
+    def apply(self, op: 'Callable[[bool, bool], bool]', f: 'int', g: 'int') -> 'int':
+        if f <= TRUE and g <= TRUE:
+            return TRUE if op(f == TRUE, g == TRUE) else FALSE
+        key = (op, f, g)
+        res = self.__computed.get(key)
+        if res is None:
+            level = min(self.__level(f), self.__level(g))
+            f0, f1 = self.__cofactors(f, level)
+            g0, g1 = self.__cofactors(g, level)
+            res = self.__mk(self.__order[level], self.apply(op, f0, g0), self.apply(op, f1, g1))
+            self.__computed.put(key, res)
+        return res
+
+    def negate(self, f: 'int') -> 'int':
+        return self.ite(f, FALSE, TRUE)
+
+    def conjoin(self, f: 'int', g: 'int') -> 'int':
+        return self.ite(f, g, FALSE)
+
+    def disjoin(self, f: 'int', g: 'int') -> 'int':
+        return self.ite(f, TRUE, g)
+
+    def exists(self, variables: 'Iterable[Expr]', f: 'int') -> 'int':
+        quantified = frozenset(self.__indices[ν] for ν in variables if ν in self.__indices)
+        memo: 'Dict[int, int]' = {}
+
+        def quantify(g: 'int') -> 'int':
+            if g <= TRUE:
+                return g
+            res = memo.get(g)
+            if res is None:
+                υ = self.__var[g]
+                low, high = quantify(self.__low[g]), quantify(self.__high[g])
+                res = self.disjoin(low, high) if υ in quantified else self.__mk(υ, low, high)
+                memo[g] = res
+            return res
+
+        return quantify(f)
+
+    def add_expr(self, expr: 'Expr') -> 'int':
+        assert expr.symbol.sort == Sort.BOOL
+        expr = expand_macros(expr)
+        memo: 'Dict[Expr, int]' = {}
+        stack: 'List[Expr]' = [expr]
+        while len(stack) > 0:
+            ε = stack[-1]
+            if ε in memo:
+                stack.pop()
+                continue
+            sym = ε.symbol
+            if isinstance(sym, BooleanConstSymbol):
+                memo[ε] = TRUE if sym.value else FALSE
+            elif isinstance(sym, (NegatorSymbol, BooleanConnectiveSymbol)) and sym.sort == Sort.BOOL:
+                pending = [π for π in ε.args if π not in memo]
+                if len(pending) > 0:
+                    stack.extend(pending)
+                    continue
+                if isinstance(sym, NegatorSymbol):
+                    memo[ε] = self.negate(memo[ε.args[0]])
+                else:
+                    # Smaller operands first keep the intermediate results small.
+                    operands = sorted((memo[π] for π in ε.args), key=self.size)
+                    res = TRUE if sym.neutral_elem else FALSE
+                    for ω in operands:
+                        res = self.conjoin(res, ω) if sym.neutral_elem else self.disjoin(res, ω)
+                    memo[ε] = res
+            else:
+                memo[ε] = self.variable(ε)
+            stack.pop()
+        return memo[expr]
+
+    def satisfy(self, f: 'int') -> 'Optional[Dict[Expr, bool]]':
+        if f == FALSE:
+            return None
+        assignment: 'Dict[Expr, bool]' = {}
+        while f != TRUE:
+            ν = self.__variables[self.__var[f]]
+            if self.__low[f] != FALSE:
+                assignment[ν], f = False, self.__low[f]
+            else:
+                assignment[ν], f = True, self.__high[f]
+        return assignment
+
+    def count(self, f: 'int') -> 'int':
+        memo: 'Dict[int, int]' = {FALSE: 0, TRUE: 1}
+
+        def count_below(g: 'int') -> 'int':
+            res = memo.get(g)
+            if res is None:
+                level = self.__levels[self.__var[g]]
+                low, high = self.__low[g], self.__high[g]
+                res = count_below(low) << (self.__level(low) - level - 1)
+                res += count_below(high) << (self.__level(high) - level - 1)
+                memo[g] = res
+            return res
+
+        return count_below(f) << self.__level(f)
+
+    def size(self, *roots: 'int') -> 'int':
+        return len(self.__reachable(roots))
+
+    def collect(self, roots: 'Sequence[int]') -> 'List[int]':
+        # Live nodes are copied level by level from the bottom up, so children
+        # always get their new numbers before their parents.
+        live = self.__reachable(roots)
+        var, low, high = self.__var, self.__low, self.__high
+        remap = {FALSE: FALSE, TRUE: TRUE}
+        self.__var, self.__low, self.__high = [-1, -1], [FALSE, TRUE], [FALSE, TRUE]
+        self.__unique = [{} for _ in self.__variables]
+        for g in sorted(live, key=lambda ν: -self.__levels[var[ν]]):
+            remap[g] = self.__mk(var[g], remap[low[g]], remap[high[g]])
+        self.__computed.clear()
+        return [remap[ρ] for ρ in roots]
+
+    def reorder(self, roots: 'Sequence[int]') -> 'List[int]':
+        # Sifting: every variable, the most populous first, is moved through
+        # all levels by adjacent swaps and left where the diagram was smallest.
+        # Reference counts drop nodes that die in a swap from the unique tables
+        # at once, and the diagram is compacted after each variable.
+        roots = self.collect(roots)
+        counts = [len(τ) for τ in self.__unique]
+        for υ in sorted(range(len(self.__variables)), key=lambda ν: -counts[ν]):
+            refs = self.__count_refs(roots)
+            level = best_level = self.__levels[υ]
+            size = best_size = self.size(*roots)
+            for step in (1, -1):
+                stop = len(self.__order) - 1 if step > 0 else 0
+                while level != stop:
+                    size += self.__swap(min(level, level + step), refs)
+                    level += step
+                    if size < best_size:
+                        best_size, best_level = size, level
+            while level != best_level:
+                self.__swap(level, refs)
+                level += 1
+            roots = self.collect(roots)
+        return roots
+
+    def __mk(self, υ: 'int', low: 'int', high: 'int') -> 'int':
+        if low == high:
+            return low
+        table = self.__unique[υ]
+        f = table.get((low, high))
+        if f is None:
+            f = len(self.__var)
+            self.__var.append(υ)
+            self.__low.append(low)
+            self.__high.append(high)
+            table[(low, high)] = f
+        return f
+
+    def __level(self, f: 'int') -> 'int':
+        υ = self.__var[f]
+        return len(self.__order) if υ < 0 else self.__levels[υ]
+
+    def __cofactors(self, f: 'int', level: 'int') -> 'Tuple[int, int]':
+        if self.__level(f) == level:
+            return self.__low[f], self.__high[f]
+        return f, f
+
+    def __reachable(self, roots: 'Iterable[int]') -> 'Set[int]':
+        seen: 'Set[int]' = set()
+        stack = [ρ for ρ in roots if ρ > TRUE]
+        while len(stack) > 0:
+            f = stack.pop()
+            if f not in seen:
+                seen.add(f)
+                for g in (self.__low[f], self.__high[f]):
+                    if g > TRUE:
+                        stack.append(g)
+        return seen
+
+    def __count_refs(self, roots: 'Sequence[int]') -> 'List[int]':
+        refs = [0] * len(self.__var)
+        for table in self.__unique:
+            for low, high in table:
+                refs[low] += 1
+                refs[high] += 1
+        for ρ in roots:
+            refs[ρ] += 1
+        return refs
+
+    def __reference(self, f: 'int', refs: 'List[int]') -> 'int':
+        # Returns the number of nodes that came alive.
+        if f <= TRUE:
+            return 0
+        if f == len(refs):
+            refs.append(0)
+            refs[self.__low[f]] += 1
+            refs[self.__high[f]] += 1
+        refs[f] += 1
+        return 1 if refs[f] == 1 else 0
+
+    def __release(self, f: 'int', refs: 'List[int]') -> 'int':
+        # Returns the number of nodes that died.
+        var, low, high = self.__var, self.__low, self.__high
+        freed = 0
+        stack = [f]
+        while len(stack) > 0:
+            g = stack.pop()
+            if g <= TRUE:
+                continue
+            refs[g] -= 1
+            if refs[g] == 0:
+                del self.__unique[var[g]][(low[g], high[g])]
+                freed += 1
+                stack.append(low[g])
+                stack.append(high[g])
+        return freed
+
+    def __swap(self, level: 'int', refs: 'List[int]') -> 'int':
+        # Nodes keep their numbers and their functions; only the nodes of the
+        # upper variable that depend on the lower one are rebuilt in place.
+        # Returns the change in the number of live nodes.
+        var, low, high = self.__var, self.__low, self.__high
+        x, y = self.__order[level], self.__order[level + 1]
+        nodes = self.__unique[x]
+        self.__unique[x] = {}
+        changed: 'List[int]' = []
+        for key, f in nodes.items():
+            if var[key[0]] == y or var[key[1]] == y:
+                changed.append(f)
+            else:
+                self.__unique[x][key] = f
+        self.__order[level], self.__order[level + 1] = y, x
+        self.__levels[x], self.__levels[y] = level + 1, level
+        delta = 0
+        for f in changed:
+            f0, f1 = low[f], high[f]
+            f00, f01 = (low[f0], high[f0]) if var[f0] == y else (f0, f0)
+            f10, f11 = (low[f1], high[f1]) if var[f1] == y else (f1, f1)
+            a = self.__mk(x, f00, f10)
+            delta += self.__reference(a, refs)
+            b = self.__mk(x, f01, f11)
+            delta += self.__reference(b, refs)
+            delta -= self.__release(f0, refs) + self.__release(f1, refs)
+            var[f], low[f], high[f] = y, a, b
+            self.__unique[y][(a, b)] = f
+        return delta
+
+
+# -----------------------------------------------------------------------------
+
+
+class BddModel:
+    status: 'Optional[Status]'
+
+    def __init__(self, expr: 'Expr', reorder_limit: 'int' = 1 << 12) -> 'None':
+        # Conjuncts are added one at a time, and the variables are sifted
+        # whenever the live diagram outgrows the limit, which then doubles.
+        self.__bdd = bdd = BDD()
+        expr = expand_macros(expr)
+        conjuncts = expr.args if expr.symbol == BooleanConnectiveSymbol(True) else (expr,)
+        root = TRUE
+        for ε in sorted(conjuncts, key=lambda π: π.dag_size):
+            root = bdd.conjoin(root, bdd.add_expr(ε))
+            if bdd.size(root) > reorder_limit:
+                (root,) = bdd.reorder((root,))
+                reorder_limit = max(reorder_limit, bdd.size(root)) * 2
+        self.__root = root
+        self.__assignment: 'Dict[Expr, bool]' = {}
+        self.status = None
+
+    @property
+    def bdd(self) -> 'BDD':
+        return self.__bdd
+
+    @property
+    def root(self) -> 'int':
+        return self.__root
+
+    def solve(self) -> 'None':
+        assignment = self.__bdd.satisfy(self.__root)
+        if assignment is None:
+            self.status = Status.UNSAT
+        else:
+            self.status = Status.SAT
+            self.__assignment = {ν: assignment.get(ν, False) for ν in self.__bdd.variables}
+
+    def count(self) -> 'int':
+        return self.__bdd.count(self.__root)
+
+    def eval(self, expr: 'Expr') -> 'Optional[Expr]':
+        assert (expr.symbol.sort is Sort.BOOL) and isinstance(expr.symbol, VariableSymbol)
+        value = self.__assignment.get(expr)
+        return None if value is None else boolean(value)
+
+
+# -----------------------------------------------------------------------------
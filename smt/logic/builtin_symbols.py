@@ -1,15 +1,18 @@
-from typing import Optional, Tuple, Set
+from typing import Optional, Tuple, List, Set, Dict, Iterable, Any, cast
 
 from smt.util import Unique
 from smt.logic.symbols_base import Sort, BooleanMixin, IntegerMixin, \
     BooleanArgsMixin, IntegerArgsMixin, BinaryValencyMixin, MultiaryValencyMixin, \
-    Expr, BinaryReducerMixin, \
-    ValencySymbol, VariableSymbol, AssociativeCommutativeSymbol, ConstSymbol
+    ConnectiveTrait, CommutativeTrait, Expr, Fingerprinter, BinaryReducerMixin, \
+    ValencySymbol, NegatorSymbol, VariableSymbol, AssociativeCommutativeSymbol, ConstSymbol, expand_macros
 
 
 # -----------------------------------------------------------------------------
 
 
+_NOT = NegatorSymbol(Sort.BOOL)
+
+
 @Unique.priority(1)
 @Unique.cached
 class BooleanConstSymbol(ConstSymbol[bool], BooleanMixin):
@@ -18,7 +21,7 @@ class BooleanConstSymbol(ConstSymbol[bool], BooleanMixin):
 
 
 @Unique.cached
-class BooleanConnectiveSymbol(AssociativeCommutativeSymbol,
+class BooleanConnectiveSymbol(AssociativeCommutativeSymbol, ConnectiveTrait,
                               BooleanMixin, BooleanArgsMixin):
     def __init__(self, neutral_elem: 'bool'):
         super().__init__()
@@ -29,10 +32,13 @@ class BooleanConnectiveSymbol(AssociativeCommutativeSymbol,
     def neutral_elem(self) -> 'bool':
         return self.__neutral_elem
 
+    def _fingerprint_fields(self, fingerprinter: 'Fingerprinter') -> 'Tuple[Any, ...]':
+        return self.neutral_elem,
+
     def _binary_reduce(self, a: 'Expr', b: 'Expr') -> 'Optional[Expr]':
         if a == b:
             return a
-        if a == b.negated:
+        if _complementary(a, b):
             return self.__one
         if a == self.__zero:
             return b
@@ -41,19 +47,61 @@ class BooleanConnectiveSymbol(AssociativeCommutativeSymbol,
 
         opposite = self.__opposite
         if b.symbol == opposite:
-            b_args: 'Set[Expr]' = set(b.args)
-            if a.negated in b_args:
-                return self.apply(a, *(b_args - {a.negated}))
-            a_args: 'Set[Expr]' = set(a.args) if a.symbol == opposite else {a}
-            if a_args <= b_args:
+            b_args = b.arg_set
+            a_sym = a.symbol
+            if a_sym == _NOT:
+                a_negated = a.args[0] if a.args[0] in b_args else None
+            else:
+                # The negation of an atom is a negator node and that of a clause
+                # is a nested connective of this kind.
+                kind = self if a_sym == opposite else _NOT
+                a_negated = next((β for β in b.args if β.symbol == kind and _complementary(a, β)), None)
+            if a_negated is not None:
+                return self.apply(a, opposite.apply(*(b_args - {a_negated})))
+            if a.symbol != opposite:
+                return a if a in b_args else None
+            a_args, a_signature, b_signature = a.arg_set, a.arg_signature, b.arg_signature
+            if (a_signature & ~b_signature) == 0 and a_args <= b_args:
                 return a
-            common = a_args & b_args
-            if len(common) > 0:
-                if opposite.apply(*(a_args - common)) == opposite.apply(*(b_args - common)).negated:
-                    return opposite.apply(*common)
+            if (a_signature & b_signature) != 0:
+                common = a_args & b_args
+                if len(common) > 0:
+                    a_rest, b_rest = a_args - common, b_args - common
+                    if any(isinstance(π.symbol, BooleanConnectiveSymbol) for π in a_rest | b_rest):
+                        resolved = _complementary(opposite.apply(*a_rest), opposite.apply(*b_rest))
+                    else:
+                        # Clauses of literals only resolve on a single complementary pair.
+                        resolved = len(a_rest) == 1 and len(b_rest) == 1 and \
+                            _complementary(next(iter(a_rest)), next(iter(b_rest)))
+                    if resolved:
+                        return opposite.apply(*common)
 
         return None
 
+    def _needs_pairwise_reduce(self, e: 'Expr') -> 'bool':
+        return e.symbol == self.__opposite
+
+    # Clauses are indexed by the (atom, polarity) keys of their literals, so a
+    # complementary literal is found by flipping the polarity of a key instead
+    # of building a negation. A clause is also indexed by the key set of its
+    # literals and by those of its nested conjunctions, which meet the flipped
+    # key set of a complementary clause.
+    def _occurrence_keys(self, e: 'Expr') -> 'Optional[Iterable[Any]]':
+        keys: 'List[Any]' = [_literal_key(π) for π in e.args]
+        keys.append(frozenset(keys))
+        keys.extend(frozenset(_literal_key(γ) for γ in π.args) for π in e.args if π.symbol == self)
+        return keys
+
+    def _partner_keys(self, e: 'Expr') -> 'Optional[Tuple[Iterable[Any], Iterable[Expr]]]':
+        if e.symbol == self.__opposite:
+            keys = [_literal_key(π) for π in e.args]
+            flipped = frozenset((α, not polarity) for α, polarity in keys)
+            nested = (frozenset((α, not polarity) for α, polarity in map(_literal_key, π.args))
+                      for π in e.args if π.symbol == self)
+            return (*keys, flipped, *nested), e.args
+        atom, polarity = _literal_key(e)
+        return ((atom, polarity), (atom, not polarity)), ()
+
     def _negate(self, *args: 'Expr') -> 'Optional[Expr]':
         return self.__opposite.apply(*(π.negated for π in args))
 
@@ -62,28 +110,50 @@ class BooleanConnectiveSymbol(AssociativeCommutativeSymbol,
         return BooleanConnectiveSymbol(not self.neutral_elem)
 
 
+def _literal_key(e: 'Expr') -> 'Tuple[Expr, bool]':
+    return (e.args[0], False) if e.symbol == _NOT else (e, True)
+
+
+def _complementary(a: 'Expr', b: 'Expr') -> 'bool':
+    # Whether b is the negation of a, decided from the structure alone: the
+    # negation of a reduced connective is its reduced dual.
+    a_sym, b_sym = a.symbol, b.symbol
+    if a_sym == _NOT:
+        return a.args[0] == b
+    if b_sym == _NOT:
+        return b.args[0] == a
+    if isinstance(a_sym, BooleanConstSymbol) and isinstance(b_sym, BooleanConstSymbol):
+        return a_sym.value != b_sym.value
+    if isinstance(a_sym, BooleanConnectiveSymbol) and isinstance(b_sym, BooleanConnectiveSymbol):
+        return a_sym.neutral_elem != b_sym.neutral_elem and len(a.args) == len(b.args) and \
+            all(any(_complementary(α, β) for β in b.args) for α in a.args)
+    return False
+
+
 @Unique.cached
-class BooleanImplicationSymbol(ValencySymbol, BinaryValencyMixin, BinaryReducerMixin,
+class BooleanImplicationSymbol(ValencySymbol, BinaryValencyMixin, BinaryReducerMixin, ConnectiveTrait,
                                BooleanMixin, BooleanArgsMixin):
     def _binary_reduce(self, a: 'Expr', b: 'Expr') -> 'Optional[Expr]':
         return boolean_or(a.negated, b)
 
 
 @Unique.cached
-class BooleanEqSymbol(ValencySymbol, MultiaryValencyMixin, BooleanMixin, BooleanArgsMixin):
+class BooleanEqSymbol(ValencySymbol, MultiaryValencyMixin, ConnectiveTrait, CommutativeTrait,
+                      BooleanMixin, BooleanArgsMixin):
     def _reduce(self, *args: 'Expr') -> 'Optional[Expr]':
         es: 'Set[Expr]' = set(args)
         if len(es) == 1:
             return boolean(True)
-        new_args = tuple(sorted(es))
         if len(es) == 2:
-            a, b = new_args
+            a, b = sorted(es)
             return boolean_and(boolean_or(a.negated, b), boolean_or(a, b.negated))
-        return boolean_and(*(boolean_eq(*new_args[i: i+2]) for i in range(len(es)-1)))
+        # Either all members hold or none does; unlike a chain of pairwise
+        # equalities, this form does not depend on the order of the members.
+        return boolean_or(boolean_and(*es), boolean_and(*(ε.negated for ε in es)))
 
 
 @Unique.cached
-class IntegerEqSymbol(ValencySymbol, MultiaryValencyMixin, BooleanMixin, IntegerArgsMixin):
+class IntegerEqSymbol(ValencySymbol, MultiaryValencyMixin, CommutativeTrait, BooleanMixin, IntegerArgsMixin):
     def _reduce(self, *args: 'Expr') -> 'Optional[Expr]':
         es: 'Set[Expr]' = set(args)
         if len(es) == 1:
@@ -108,7 +178,7 @@ class IntegerEqSymbol(ValencySymbol, MultiaryValencyMixin, BooleanMixin, Integer
 
 
 @Unique.cached
-class BooleanXorSymbol(ValencySymbol, MultiaryValencyMixin,
+class BooleanXorSymbol(ValencySymbol, MultiaryValencyMixin, ConnectiveTrait, CommutativeTrait,
                        BooleanMixin, BooleanArgsMixin):
     def _reduce(self, *args: 'Expr') -> 'Optional[Expr]':
         return boolean_and(boolean_or(*args), boolean_and(*args).negated)  # TODO: probably bullshit!
@@ -129,7 +199,10 @@ class IntegerSumSymbol(AssociativeCommutativeSymbol,
                        IntegerMixin, IntegerArgsMixin):
     def _binary_reduce(self, a: 'Expr', b: 'Expr') -> 'Optional[Expr]':
         a_sym, b_sym = a.symbol, b.symbol
-        if a == b.negated:
+        # Sums are flattened and constants folded, so a complement is always an
+        # explicit negator node; looking for one builds no negation.
+        if (isinstance(b_sym, NegatorSymbol) and b.args[0] == a) or \
+                (isinstance(a_sym, NegatorSymbol) and a.args[0] == b):
             return integer(0)
         if a == integer(0):
             return b
@@ -137,6 +210,9 @@ class IntegerSumSymbol(AssociativeCommutativeSymbol,
             return integer(a_sym.value + b_sym.value)
         return None
 
+    def _needs_pairwise_reduce(self, e: 'Expr') -> 'bool':
+        return False
+
     def _negate(self, *args: 'Expr') -> 'Optional[Expr]':
         return integer_sum(*(π.negated for π in args))
 
@@ -190,17 +266,153 @@ def integer_diff(a: 'Expr', b: 'Expr') -> 'Expr':
 # -----------------------------------------------------------------------------
 
 
+class ExprBuilder:
+    def __init__(self, symbol: 'ValencySymbol') -> 'None':
+        assert isinstance(symbol, (BooleanConnectiveSymbol, IntegerSumSymbol, BooleanEqSymbol, IntegerEqSymbol))
+        self.__symbol = symbol
+        self.__args: 'Dict[Expr, int]' = {}
+        self.__negators: 'Dict[Expr, Expr]' = {}
+        self.__const: 'Optional[Expr]' = None
+        self.__result: 'Optional[Expr]' = None
+
+    @property
+    def symbol(self) -> 'ValencySymbol':
+        return self.__symbol
+
+    def add(self, *args: 'Expr') -> 'ExprBuilder':
+        return self.extend(args)
+
+    def extend(self, args: 'Iterable[Expr]') -> 'ExprBuilder':
+        symbol = self.__symbol
+        flatten = isinstance(symbol, (BooleanConnectiveSymbol, IntegerSumSymbol))
+        stack = list(args)
+        stack.reverse()
+        while len(stack) > 0 and self.__result is None:
+            ε = stack.pop()
+            if flatten and ε.symbol == symbol:
+                stack.extend(reversed(ε.args))
+            elif isinstance(symbol, BooleanConnectiveSymbol):
+                self.__add_connective_arg(symbol, ε)
+            elif isinstance(symbol, IntegerSumSymbol):
+                self.__add_sum_arg(ε)
+            else:
+                self.__add_eq_arg(ε)
+        return self
+
+    def build(self) -> 'Expr':
+        if self.__result is not None:
+            return self.__result
+        symbol, args = self.__symbol, self.__args
+        if isinstance(symbol, IntegerSumSymbol):
+            const = self.__const
+            if const is not None and (const != integer(0) or len(args) == 0):
+                args = {**args, const: 1}
+            if len(args) == 0:
+                return integer(0)
+            if len(args) == 1 and sum(args.values()) == 1:
+                return next(iter(args))
+            return symbol.apply(*(ε for ε, n in args.items() for _ in range(n)))
+        if isinstance(symbol, BooleanConnectiveSymbol):
+            if len(args) < 2:
+                return next(iter(args)) if len(args) == 1 else boolean(symbol.neutral_elem)
+        elif len(args) < 2:
+            return boolean(True)
+        return symbol.apply(*args)
+
+    def __len__(self) -> 'int':
+        n = sum(self.__args.values())
+        return n + 1 if isinstance(self.__symbol, IntegerSumSymbol) and self.__const is not None else n
+
+    def __insert(self, e: 'Expr') -> 'None':
+        args = self.__args
+        args[e] = args.get(e, 0) + 1
+        if isinstance(e.symbol, NegatorSymbol):
+            self.__negators[e.args[0]] = e
+
+    def __complement(self, e: 'Expr') -> 'Optional[Expr]':
+        # Only explicit negator nodes are matched, so that no negation has to be
+        # built for every argument; subtler complements are left to the final
+        # reduction.
+        c = e.args[0] if isinstance(e.symbol, NegatorSymbol) else self.__negators.get(e)
+        return c if c is not None and c in self.__args else None
+
+    def __add_connective_arg(self, symbol: 'BooleanConnectiveSymbol', e: 'Expr') -> 'None':
+        sym = e.symbol
+        if isinstance(sym, BooleanConstSymbol):
+            if sym.value != symbol.neutral_elem:
+                self.__result = e
+        elif self.__complement(e) is not None:
+            self.__result = boolean(not symbol.neutral_elem)
+        elif e not in self.__args:
+            self.__insert(e)
+
+    def __add_sum_arg(self, e: 'Expr') -> 'None':
+        sym = e.symbol
+        if isinstance(sym, IntegerConstSymbol):
+            const = self.__const
+            self.__const = e if const is None else integer(cast(IntegerConstSymbol, const.symbol).value + sym.value)
+            return
+        c = self.__complement(e)
+        if c is None:
+            self.__insert(e)
+        else:
+            args = self.__args
+            args[c] -= 1
+            if args[c] == 0:
+                del args[c]
+
+    def __add_eq_arg(self, e: 'Expr') -> 'None':
+        if e in self.__args:
+            return
+        if isinstance(self.__symbol, BooleanEqSymbol):
+            contradiction = self.__complement(e) is not None
+        elif isinstance(e.symbol, IntegerConstSymbol):
+            contradiction, self.__const = self.__const is not None, e
+        else:
+            contradiction = False
+        if contradiction:
+            self.__result = boolean(False)
+        else:
+            self.__insert(e)
+
+
+_shared_constants: 'Tuple[Unique, ...]' = (
+    NegatorSymbol(Sort.BOOL), NegatorSymbol(Sort.INT),
+    BooleanConnectiveSymbol(True), BooleanConnectiveSymbol(False),
+    BooleanImplicationSymbol(), BooleanEqSymbol(), BooleanXorSymbol(),
+    IntegerEqSymbol(), IntegerSumSymbol(), IntegerDiffSymbol(),
+    boolean(True), boolean(False), integer(0)
+)
+
+
+# -----------------------------------------------------------------------------
+
+
 @Unique.priority(2)
 @Unique.cached
 class TseitinVarSymbol(VariableSymbol):
     def __init__(self, expr: 'Expr'):
         assert expr.symbol.sort == Sort.BOOL
         super().__init__(Sort.BOOL)
+        self.__expr = expr
+
+    @classmethod
+    def _get_structure(cls, expr: 'Expr') -> 'int':
+        # Below any printable name, ordered by the definition.
+        return expr.structure >> 8
+
+    @property
+    def expr(self) -> 'Expr':
+        return self.__expr
+
+    def _fingerprint_fields(self, fingerprinter: 'Fingerprinter') -> 'Tuple[Any, ...]':
+        return fingerprinter(self.expr),
 
 
 def to_cnf(expr: 'Expr') -> 'Expr':
     assert expr.symbol.sort == Sort.BOOL
-    eqs: 'Set[Expr]' = set()
+    expr = expand_macros(expr)
+    eqs = ExprBuilder(BooleanConnectiveSymbol(True))
 
     def transform(e: 'Expr', args: 'Tuple[Expr, ...]') -> 'Expr':
         w = e.symbol.apply(*args)
@@ -209,13 +421,13 @@ def to_cnf(expr: 'Expr') -> 'Expr':
             w = TseitinVarSymbol(w).apply()
             if sym.neutral_elem:
                 eqs.add(boolean_implies(boolean_and(*args), w))
-                eqs.update(boolean_implies(w, π) for π in args)
+                eqs.extend(boolean_implies(w, π) for π in args)
             else:
                 eqs.add(boolean_implies(w, boolean_or(*args)))
-                eqs.update(boolean_implies(π, w) for π in args)
+                eqs.extend(boolean_implies(π, w) for π in args)
         return w
 
-    return boolean_and(expr.bottom_up_transform(transform), *eqs)
+    return eqs.add(expr.bottom_up_transform(transform)).build()
 
 
 # -----------------------------------------------------------------------------
@@ -0,0 +1,122 @@
+from typing import Union, Optional, Tuple, List, Dict, Iterable, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from smt.util import BoundedCache
+from smt.logic import Sort, Expr, VariableSymbol, BooleanConnectiveSymbol, ExprBuilder, boolean
+from smt.logic.dpll import Status, Model
+from smt.logic.bdd import BddModel
+
+
+# -----------------------------------------------------------------------------
+
+
+def partition(exprs: 'Iterable[Expr]') -> 'List[Tuple[Expr, ...]]':
+    conjunction = _conjunction(exprs)
+    if conjunction == boolean(True):
+        return []
+    conjuncts = conjunction.args if conjunction.symbol == BooleanConnectiveSymbol(True) else (conjunction,)
+
+    parents = list(range(len(conjuncts)))
+
+    def find(i: 'int') -> 'int':
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    owners: 'Dict[Expr, int]' = {}
+    for i, ε in enumerate(conjuncts):
+        for κ in ε.atoms | ε.variables:
+            j = owners.setdefault(κ, i)
+            if j != i:
+                parents[find(i)] = find(j)
+
+    components: 'Dict[int, List[Expr]]' = {}
+    for i, ε in enumerate(conjuncts):
+        components.setdefault(find(i), []).append(ε)
+    return [tuple(γ) for γ in components.values()]
+
+
+# -----------------------------------------------------------------------------
+
+
+ComponentResult = Tuple[Status, Mapping[Expr, bool]]
+
+
+def _solve(expr: 'Expr',
+           variables: 'Tuple[Expr, ...]',
+           bdd_limit: 'int') -> 'Tuple[Status, Tuple[Optional[bool], ...]]':
+    # Diagrams over a handful of atoms are built faster than the clause
+    # database of the DPLL solver.
+    model: 'Union[Model, BddModel]' = BddModel(expr) if len(expr.atoms) <= bdd_limit else Model(expr)
+    model.solve()
+    assert model.status is not None
+    values = tuple(None if υ is None else υ == boolean(True) for υ in (model.eval(ν) for ν in variables))
+    return model.status, values
+
+
+class ComponentModel:
+    status: 'Optional[Status]'
+
+    def __init__(self,
+                 exprs: 'Iterable[Expr]',
+                 workers: 'int' = 0,
+                 cache: 'Optional[BoundedCache[Expr, ComponentResult]]' = None,
+                 bdd_limit: 'int' = 16) -> 'None':
+        self.__components = tuple(_conjunction(γ) for γ in partition(exprs))
+        self.__workers, self.__cache, self.__bdd_limit = workers, cache, bdd_limit
+        self.__values: 'Dict[Expr, bool]' = {}
+        self.status = None
+
+    @property
+    def components(self) -> 'Tuple[Expr, ...]':
+        return self.__components
+
+    def solve(self) -> 'None':
+        results: 'Dict[Expr, ComponentResult]' = {}
+        pending: 'List[Expr]' = []
+        for γ in self.__components:
+            known = None if self.__cache is None else self.__cache.get(γ)
+            if known is None:
+                pending.append(γ)
+            else:
+                results[γ] = known
+
+        if all(ρ[0] is Status.SAT for ρ in results.values()):
+            for γ, ρ in self.__solve_pending(pending):
+                results[γ] = ρ
+                if self.__cache is not None:
+                    self.__cache.put(γ, ρ)
+                if ρ[0] is Status.UNSAT:
+                    break
+
+        if any(ρ[0] is Status.UNSAT for ρ in results.values()):
+            self.status = Status.UNSAT
+        else:
+            self.status = Status.SAT
+            for ρ in results.values():
+                self.__values.update(ρ[1])
+
+    def __solve_pending(self, pending: 'List[Expr]') -> 'Iterable[Tuple[Expr, ComponentResult]]':
+        variables = [tuple(sorted(ν for ν in γ.variables if ν.symbol.sort == Sort.BOOL)) for γ in pending]
+        solved: 'Iterable[Tuple[Status, Tuple[Optional[bool], ...]]]'
+        if self.__workers > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=self.__workers) as executor:
+                solved = list(executor.map(_solve, pending, variables, repeat(self.__bdd_limit)))
+        else:
+            solved = map(_solve, pending, variables, repeat(self.__bdd_limit))
+        for γ, vs, (status, values) in zip(pending, variables, solved):
+            yield γ, (status, {ν: υ for ν, υ in zip(vs, values) if υ is not None})
+
+    def eval(self, expr: 'Expr') -> 'Optional[Expr]':
+        assert (expr.symbol.sort is Sort.BOOL) and isinstance(expr.symbol, VariableSymbol)
+        value = self.__values.get(expr)
+        return None if value is None else boolean(value)
+
+
+def _conjunction(exprs: 'Iterable[Expr]') -> 'Expr':
+    return ExprBuilder(BooleanConnectiveSymbol(True)).extend(exprs).build()
+
+
+# -----------------------------------------------------------------------------
@@ -130,6 +130,7 @@ class Assignment:
     def __init__(self, mem: 'Memory', *literals: 'Literal') -> 'None':
         self.__mem = mem
         self.sentinel = Literal(mem, boolean(False))  # TODO: what if formula contains False?
+        self.sentinel.link = self.sentinel
         self.top_decision = Transactional(mem, self.sentinel)
 
         self.literals = TransactionalVector(mem)
@@ -244,6 +245,7 @@ class Model:
     __literals: 'CounterType[Literal]'
     assignment: 'Assignment'
     __learnt_clauses: 'TransactionalSet[Clause]'
+    __refuted: 'bool'
     status: 'Optional[Status]'
 
     def __init__(self, expr: 'Expr') -> 'None':
@@ -251,10 +253,12 @@ class Model:
         self.__clauses, self.__literals = set(), Counter()
 
         cnf_expr = to_cnf(expr)
+        # False would become the sentinel literal, which is never assigned.
+        self.__refuted = cnf_expr == boolean(False)
         if cnf_expr.symbol == BooleanConnectiveSymbol(True):
             for ε in cnf_expr.args:
                 self.__make_clause(ε)
-        else:
+        elif not self.__refuted:
             self.__make_clause(cnf_expr)
 
         literals = sorted(self.__literals.items(), key=lambda p: -p[1])
@@ -276,6 +280,9 @@ class Model:
         return lit
 
     def solve(self) -> 'None':
+        if self.__refuted:
+            self.status = Status.UNSAT
+            return
         while True:
             while True:
                 clause = self.assignment.get_suspicious_clause()
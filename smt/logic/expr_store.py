@@ -0,0 +1,380 @@
+from typing import Optional, Tuple, List, Dict, MutableMapping, Iterator, Sequence
+from dataclasses import dataclass
+from enum import IntEnum
+
+import numpy as np
+
+from smt.logic.symbols_base import Sort, Expr, Symbol, NegatorSymbol, VariableSymbol, ConstSymbol, ConnectiveTrait, \
+    expand_macros
+from smt.logic.builtin_symbols import BooleanConstSymbol, BooleanConnectiveSymbol, BooleanImplicationSymbol, \
+    BooleanEqSymbol, BooleanXorSymbol, IntegerConstSymbol, IntegerEqSymbol, IntegerSumSymbol, IntegerDiffSymbol
+
+
+# -----------------------------------------------------------------------------
+
+
+class _Column:
+    def __init__(self, dtype: 'np.dtype') -> 'None':
+        self.__data = np.empty(16, dtype=dtype)
+        self.__count = 0
+
+    def append(self, value: 'int') -> 'None':
+        self.__reserve(1)
+        self.__data[self.__count] = value
+        self.__count += 1
+
+    def extend(self, values: 'Sequence[int]') -> 'None':
+        n = len(values)
+        self.__reserve(n)
+        self.__data[self.__count: self.__count + n] = values
+        self.__count += n
+
+    @property
+    def view(self) -> 'np.ndarray':
+        return self.__data[:self.__count]
+
+    def __len__(self) -> 'int':
+        return self.__count
+
+    def __reserve(self, n: 'int') -> 'None':
+        capacity = len(self.__data)
+        if self.__count + n > capacity:
+            while self.__count + n > capacity:
+                capacity *= 2
+            data = np.empty(capacity, dtype=self.__data.dtype)
+            data[:self.__count] = self.__data[:self.__count]
+            self.__data = data
+
+
+class _Kind(IntEnum):
+    OTHER = 0
+    ATOM = 1
+    TRUE = 2
+    FALSE = 3
+    NOT = 4
+    AND = 5
+    OR = 6
+    IMPLIES = 7
+    EQ = 8
+    XOR = 9
+
+
+def _kind_of(symbol: 'Symbol') -> '_Kind':
+    # Terms and connectives without an encoding are OTHER, which to_cnf
+    # rejects instead of treating them as atoms.
+    if symbol.sort != Sort.BOOL:
+        return _Kind.OTHER
+    if isinstance(symbol, BooleanConstSymbol):
+        return _Kind.TRUE if symbol.value else _Kind.FALSE
+    if isinstance(symbol, NegatorSymbol):
+        return _Kind.NOT
+    if isinstance(symbol, BooleanConnectiveSymbol):
+        return _Kind.AND if symbol.neutral_elem else _Kind.OR
+    if isinstance(symbol, BooleanImplicationSymbol):
+        return _Kind.IMPLIES
+    if isinstance(symbol, BooleanEqSymbol):
+        return _Kind.EQ
+    if isinstance(symbol, BooleanXorSymbol):
+        return _Kind.XOR
+    if isinstance(symbol, (ConnectiveTrait, ConstSymbol)):
+        return _Kind.OTHER
+    return _Kind.ATOM
+
+
+def _gather(offsets: 'np.ndarray', indices: 'np.ndarray', nodes: 'np.ndarray') -> 'np.ndarray':
+    # The arguments of all the nodes, concatenated in order.
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    shifts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return indices[shifts + np.arange(len(shifts))]
+
+
+def _close(offsets: 'np.ndarray', indices: 'np.ndarray', mask: 'np.ndarray',
+           expand: 'Optional[np.ndarray]' = None) -> 'None':
+    # Marks everything below the marked nodes, descending only through the
+    # nodes selected by expand; each pass handles one level of the DAG.
+    frontier = np.flatnonzero(mask)
+    while len(frontier) > 0:
+        if expand is not None:
+            frontier = frontier[expand[frontier]]
+        children = _gather(offsets, indices, frontier)
+        frontier = np.unique(children[~mask[children]])
+        mask[frontier] = True
+
+
+class _Clauses:
+    def __init__(self) -> 'None':
+        self.__literals: 'List[np.ndarray]' = []
+        self.__lengths: 'List[np.ndarray]' = []
+        self.__pending: 'List[int]' = []
+        self.__pending_lengths: 'List[int]' = []
+
+    def add(self, literals: 'np.ndarray', lengths: 'np.ndarray') -> 'None':
+        self.__literals.append(np.asarray(literals, dtype=np.int64))
+        self.__lengths.append(np.asarray(lengths, dtype=np.int64))
+
+    def emit(self, *clause: 'int') -> 'None':
+        self.__pending.extend(clause)
+        self.__pending_lengths.append(len(clause))
+
+    def emit_and(self, t: 'int', args: 'Sequence[int]') -> 'None':
+        for λ in args:
+            self.emit(-t, λ)
+        self.emit(t, *(-λ for λ in args))
+
+    def emit_or(self, t: 'int', args: 'Sequence[int]') -> 'None':
+        self.emit_and(-t, [-λ for λ in args])
+
+    def emit_xor(self, t: 'int', a: 'int', b: 'int') -> 'None':
+        self.emit(-t, a, b)
+        self.emit(-t, -a, -b)
+        self.emit(t, -a, b)
+        self.emit(t, a, -b)
+
+    def arrays(self) -> 'Tuple[np.ndarray, np.ndarray]':
+        self.add(np.array(self.__pending), np.array(self.__pending_lengths))
+        self.__pending, self.__pending_lengths = [], []
+        lengths = np.concatenate(self.__lengths)
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return offsets, np.concatenate(self.__literals)
+
+
+# -----------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Cnf:
+    offsets: 'np.ndarray'
+    literals: 'np.ndarray'
+    variables: 'np.ndarray'
+
+    def clause(self, index: 'int') -> 'np.ndarray':
+        return self.literals[self.offsets[index]: self.offsets[index + 1]]
+
+    def __iter__(self) -> 'Iterator[np.ndarray]':
+        return (self.clause(i) for i in range(len(self)))
+
+    def __len__(self) -> 'int':
+        return len(self.offsets) - 1
+
+
+class ExprStore:
+    def __init__(self) -> 'None':
+        self.__symbols: 'List[Symbol]' = []
+        self.__symbol_to_id: 'Dict[Symbol, int]' = {}
+        self.__symbol_ids = _Column(np.int32)
+        self.__arg_offsets = _Column(np.int64)
+        self.__arg_offsets.append(0)
+        self.__arg_indices = _Column(np.int32)
+        self.__nodes: 'Dict[Tuple[int, Tuple[int, ...]], int]' = {}
+
+    @property
+    def symbols(self) -> 'Sequence[Symbol]':
+        return self.__symbols
+
+    @property
+    def symbol_ids(self) -> 'np.ndarray':
+        return self.__symbol_ids.view
+
+    @property
+    def arg_offsets(self) -> 'np.ndarray':
+        return self.__arg_offsets.view
+
+    @property
+    def arg_indices(self) -> 'np.ndarray':
+        return self.__arg_indices.view
+
+    def symbol_of(self, index: 'int') -> 'Symbol':
+        return self.__symbols[self.__symbol_ids.view[index]]
+
+    def args_of(self, index: 'int') -> 'np.ndarray':
+        offsets = self.__arg_offsets.view
+        return self.__arg_indices.view[offsets[index]: offsets[index + 1]]
+
+    def add(self, symbol: 'Symbol', args: 'Sequence[int]') -> 'int':
+        sid = self.__symbol_to_id.get(symbol)
+        if sid is None:
+            self.__symbol_to_id[symbol] = sid = len(self.__symbols)
+            self.__symbols.append(symbol)
+        key = (sid, tuple(args))
+        index = self.__nodes.get(key)
+        if index is None:
+            assert all(0 <= π < len(self) for π in key[1])
+            self.__nodes[key] = index = len(self)
+            self.__symbol_ids.append(sid)
+            self.__arg_indices.extend(key[1])
+            self.__arg_offsets.append(len(self.__arg_indices))
+        return index
+
+    def add_expr(self, expr: 'Expr') -> 'int':
+        expr = expand_macros(expr)
+        indexes: 'MutableMapping[Expr, int]' = {}
+        for ε in expr.topological_order():
+            indexes[ε] = self.add(ε.symbol, tuple(indexes[π] for π in ε.args))
+        return indexes[expr]
+
+    def to_expr(self, index: 'int') -> 'Expr':
+        exprs: 'Dict[int, Expr]' = {}
+        for i in self.postorder(index).tolist():
+            exprs[i] = self.symbol_of(i).apply(*(exprs[π] for π in self.args_of(i).tolist()))
+        return exprs[index]
+
+    def reachable(self, *roots: 'int') -> 'np.ndarray':
+        mask = np.zeros(len(self), dtype=bool)
+        mask[list(roots)] = True
+        _close(self.arg_offsets, self.arg_indices, mask)
+        return mask
+
+    def postorder(self, *roots: 'int') -> 'np.ndarray':
+        return np.flatnonzero(self.reachable(*roots))
+
+    def to_cnf(self, root: 'int') -> 'Cnf':
+        kinds = np.array([_kind_of(σ) for σ in self.__symbols], dtype=np.int8)[self.symbol_ids]
+        offsets, indices = self.arg_offsets, self.arg_indices
+        clauses = _Clauses()
+
+        # The conjuncts of the root, and the disjuncts of the top-level
+        # clauses, are the only nodes that need no definition of their own.
+        tops = self.args_of(root) if kinds[root] == _Kind.AND else np.array([root])
+        top_clauses = tops[kinds[tops] == _Kind.OR]
+        top_units = tops[kinds[tops] != _Kind.OR]
+        need = np.zeros(len(self), dtype=bool)
+        need[_gather(offsets, indices, top_clauses)] = True
+        need[top_units] = True
+        _close(offsets, indices, need, kinds >= _Kind.NOT)
+
+        nodes = np.flatnonzero(need)
+        node_kinds = kinds[nodes]
+        if np.any(node_kinds == _Kind.OTHER):
+            raise ValueError(f"Cannot encode '{self.symbol_of(int(nodes[node_kinds == _Kind.OTHER][0]))}'")
+
+        # Atoms and gates get fresh variables in postorder, preceded by the
+        # variable for True if a constant is needed.
+        constant = (node_kinds == _Kind.TRUE) | (node_kinds == _Kind.FALSE)
+        first = 2 if np.any(constant) else 1
+        fresh = nodes[~constant & (node_kinds != _Kind.NOT)]
+        lits = np.zeros(len(self), dtype=np.int64)
+        lits[fresh] = np.arange(first, first + len(fresh))
+        variables = [np.full(first, -1), np.where(kinds[fresh] >= _Kind.NOT, -1, fresh)]
+        if first == 2:
+            lits[nodes[node_kinds == _Kind.TRUE]] = 1
+            lits[nodes[node_kinds == _Kind.FALSE]] = -1
+            clauses.emit(1)
+
+        negations = nodes[node_kinds == _Kind.NOT]
+        targets = indices[offsets[negations]]
+        signs = np.full(len(negations), -1)
+        nested = kinds[targets] == _Kind.NOT
+        while np.any(nested):
+            targets[nested] = indices[offsets[targets[nested]]]
+            signs[nested] = -signs[nested]
+            nested = kinds[targets] == _Kind.NOT
+        lits[negations] = signs * lits[targets]
+
+        # t = a & b & ... becomes (~t | a), (~t | b), ... and (t | ~a | ~b | ...);
+        # disjunctions are the same with every literal flipped.
+        for kind, sign in ((_Kind.AND, 1), (_Kind.OR, -1)):
+            gates = nodes[node_kinds == kind]
+            counts = offsets[gates + 1] - offsets[gates]
+            args = sign * lits[_gather(offsets, indices, gates)]
+            heads = sign * lits[gates]
+            clauses.add(np.stack((-np.repeat(heads, counts), args), axis=1).ravel(), np.full(len(args), 2))
+            long = np.empty(len(args) + len(gates), dtype=np.int64)
+            starts = np.cumsum(counts + 1) - (counts + 1)
+            body = np.ones(len(long), dtype=bool)
+            body[starts] = False
+            long[starts], long[body] = heads, -args
+            clauses.add(long, counts + 1)
+
+        extra: 'List[int]' = []
+
+        def new_var() -> 'int':
+            extra.append(-1)
+            return first + len(fresh) + len(extra) - 1
+
+        for i in nodes[node_kinds >= _Kind.IMPLIES].tolist():
+            kind, t = kinds[i], int(lits[i])
+            args = lits[indices[offsets[i]: offsets[i + 1]]].tolist()
+            if kind == _Kind.IMPLIES:
+                clauses.emit_or(t, (-args[0], args[1]))
+            elif kind == _Kind.EQ:
+                p, q = new_var(), new_var()
+                clauses.emit_and(p, args)
+                clauses.emit_and(q, [-λ for λ in args])
+                clauses.emit_or(t, (p, q))
+            elif len(args) == 0:
+                clauses.emit(-t)
+            elif len(args) == 1:
+                clauses.emit_and(t, args)
+            else:
+                acc = args[0]
+                for λ in args[1:-1]:
+                    y = new_var()
+                    clauses.emit_xor(y, acc, λ)
+                    acc = y
+                clauses.emit_xor(t, acc, args[-1])
+
+        clauses.add(lits[_gather(offsets, indices, top_clauses)],
+                    offsets[top_clauses + 1] - offsets[top_clauses])
+        units = top_units[kinds[top_units] != _Kind.TRUE]
+        clauses.add(lits[units], np.ones(len(units)))
+
+        clause_offsets, literals = clauses.arrays()
+        return Cnf(clause_offsets, literals, np.concatenate((*variables, np.array(extra, dtype=np.int64))))
+
+    def evaluate(self, root: 'int', leaves: 'Sequence[int]', values: 'np.ndarray') -> 'np.ndarray':
+        values = np.asarray(values)
+        assert values.ndim == 2 and values.shape[1] == len(leaves)
+        count = values.shape[0]
+        results: 'Dict[int, np.ndarray]' = {ι: values[:, j] for j, ι in enumerate(leaves)}
+        for i in self.postorder(root).tolist():
+            if i in results:
+                continue
+            sym = self.symbol_of(i)
+            args = [results[π] for π in self.args_of(i).tolist()]
+            results[i] = _evaluate_node(sym, args, count)
+        return results[root]
+
+    def __len__(self) -> 'int':
+        return len(self.__symbol_ids)
+
+
+def _evaluate_node(symbol: 'Symbol', args: 'List[np.ndarray]', count: 'int') -> 'np.ndarray':
+    if isinstance(symbol, (BooleanConstSymbol, IntegerConstSymbol)):
+        dtype = bool if symbol.sort == Sort.BOOL else np.int64
+        return np.full(count, symbol.value, dtype=dtype)
+    if isinstance(symbol, NegatorSymbol):
+        return np.logical_not(args[0]) if symbol.sort == Sort.BOOL else np.negative(args[0])
+    if isinstance(symbol, BooleanConnectiveSymbol):
+        if len(args) == 0:
+            return np.full(count, symbol.neutral_elem, dtype=bool)
+        reducer = np.logical_and if symbol.neutral_elem else np.logical_or
+        return reducer.reduce(np.asarray(args, dtype=bool), axis=0)
+    if isinstance(symbol, BooleanImplicationSymbol):
+        return np.logical_or(np.logical_not(args[0]), args[1])
+    if isinstance(symbol, (BooleanEqSymbol, IntegerEqSymbol)):
+        result = np.ones(count, dtype=bool)
+        for a, b in zip(args, args[1:]):
+            result &= a == b
+        return result
+    if isinstance(symbol, BooleanXorSymbol):
+        if len(args) == 0:
+            return np.zeros(count, dtype=bool)
+        return np.logical_xor.reduce(np.asarray(args, dtype=bool), axis=0)
+    if isinstance(symbol, IntegerSumSymbol):
+        return np.sum(np.asarray(args, dtype=np.int64), axis=0) if args else np.zeros(count, dtype=np.int64)
+    if isinstance(symbol, IntegerDiffSymbol):
+        return np.subtract(args[0], args[1])
+    if isinstance(symbol, VariableSymbol):
+        raise KeyError(f"No values for variable '{symbol}'")
+    raise ValueError(f"Cannot evaluate '{symbol}'")
+
+
+def evaluate_batch(expr: 'Expr', variables: 'Sequence[Expr]', values: 'np.ndarray') -> 'np.ndarray':
+    store = ExprStore()
+    leaves = [store.add_expr(ν) for ν in variables]
+    return store.evaluate(store.add_expr(expr), leaves, values)
+
+
+# -----------------------------------------------------------------------------
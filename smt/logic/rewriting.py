@@ -0,0 +1,206 @@
+from typing import Optional, Tuple, List, Dict, Set, Iterable, Mapping, FrozenSet, Callable, Union, Any, \
+    TypeVar, Generic
+
+from smt.util import BoundedCache
+from smt.logic.symbols_base import Sort, Expr, AssociativeCommutativeSymbol
+
+
+# -----------------------------------------------------------------------------
+
+
+_T = TypeVar('_T')
+
+# A run of terms still to be visited, kept as a linked list of (term, rest)
+# pairs so that retrieval can share tails between branches.
+_Terms = Optional[Tuple[Expr, Any]]
+
+
+class _TreeNode(Generic[_T]):
+    def __init__(self) -> 'None':
+        self.children: 'Dict[Any, _TreeNode[_T]]' = {}
+        self.values: 'List[_T]' = []
+
+
+class DiscriminationTree(Generic[_T]):
+    def __init__(self) -> 'None':
+        self.__root: '_TreeNode[_T]' = _TreeNode()
+        self.__count = 0
+
+    def insert(self, pattern: 'Expr', variables: 'FrozenSet[Expr]', value: '_T') -> 'None':
+        node = self.__root
+        for key in DiscriminationTree.__keys(pattern, variables):
+            child = node.children.get(key)
+            if child is None:
+                node.children[key] = child = _TreeNode()
+            node = child
+        node.values.append(value)
+        self.__count += 1
+
+    def retrieve(self, expr: 'Expr') -> 'List[_T]':
+        found: 'List[_T]' = []
+        stack: 'List[Tuple[_TreeNode[_T], _Terms]]' = [(self.__root, (expr, None))]
+        while len(stack) > 0:
+            node, terms = stack.pop()
+            if terms is None:
+                found.extend(node.values)
+                continue
+            term, rest = terms
+            star = node.children.get(None)
+            if star is not None:
+                stack.append((star, rest))
+            child = node.children.get((term.symbol, len(term.args)))
+            if child is not None:
+                if not isinstance(term.symbol, AssociativeCommutativeSymbol):
+                    for π in reversed(term.args):
+                        rest = (π, rest)
+                    stack.append((child, rest))
+                else:
+                    stack.append((child, rest))
+        return found
+
+    def __len__(self) -> 'int':
+        return self.__count
+
+    @staticmethod
+    def __keys(pattern: 'Expr', variables: 'FrozenSet[Expr]') -> 'List[Any]':
+        # Arguments of associative-commutative applications are sorted by
+        # ordinal, so their positions say nothing about a match and are not
+        # indexed: the key of the head alone selects the candidates.
+        keys: 'List[Any]' = []
+        stack: 'List[Expr]' = [pattern]
+        while len(stack) > 0:
+            e = stack.pop()
+            if e in variables:
+                keys.append(None)
+            else:
+                keys.append((e.symbol, len(e.args)))
+                if not isinstance(e.symbol, AssociativeCommutativeSymbol):
+                    stack.extend(reversed(e.args))
+        return keys
+
+
+# -----------------------------------------------------------------------------
+
+
+Bindings = Mapping[Expr, Expr]
+
+
+class Rule:
+    def __init__(self,
+                 lhs: 'Expr',
+                 rhs: 'Union[Expr, Callable[[Bindings], Optional[Expr]]]',
+                 variables: 'Iterable[Expr]') -> 'None':
+        self.__lhs, self.__rhs, self.__variables = lhs, rhs, frozenset(variables)
+
+    @property
+    def lhs(self) -> 'Expr':
+        return self.__lhs
+
+    @property
+    def rhs(self) -> 'Union[Expr, Callable[[Bindings], Optional[Expr]]]':
+        return self.__rhs
+
+    @property
+    def variables(self) -> 'FrozenSet[Expr]':
+        return self.__variables
+
+    def match(self, expr: 'Expr') -> 'Optional[Dict[Expr, Expr]]':
+        bindings: 'Dict[Expr, Expr]' = {}
+        return bindings if self.__match(self.lhs, expr, bindings) else None
+
+    def apply(self, expr: 'Expr') -> 'Optional[Expr]':
+        bindings = self.match(expr)
+        if bindings is None:
+            return None
+        rhs = self.rhs
+        return rhs.substitute(bindings) if isinstance(rhs, Expr) else rhs(bindings)
+
+    def __match(self, pattern: 'Expr', expr: 'Expr', bindings: 'Dict[Expr, Expr]') -> 'bool':
+        if pattern in self.variables:
+            bound = bindings.get(pattern)
+            if bound is not None:
+                return bound is expr
+            sort = pattern.symbol.sort
+            if sort != Sort.UNKNOWN and sort != expr.symbol.sort:
+                return False
+            bindings[pattern] = expr
+            return True
+        if pattern.symbol != expr.symbol or len(pattern.args) != len(expr.args):
+            return False
+        if len(pattern.variables & self.variables) == 0:
+            return pattern is expr
+        if not isinstance(pattern.symbol, AssociativeCommutativeSymbol):
+            return all(self.__match(p, e, bindings) for p, e in zip(pattern.args, expr.args))
+        # Ground arguments go first and pattern variables last, so the most
+        # constrained arguments cut the search early.
+        patterns = sorted(pattern.args, key=lambda π: 0 if len(π.variables & self.variables) == 0
+                          else 2 if π in self.variables else 1)
+        return self.__match_multiset(patterns, 0, list(expr.args), bindings)
+
+    def __match_multiset(self,
+                         patterns: 'List[Expr]',
+                         i: 'int',
+                         subjects: 'List[Expr]',
+                         bindings: 'Dict[Expr, Expr]') -> 'bool':
+        # Pattern i is matched against each remaining subject argument in turn,
+        # with backtracking; equal subject arguments are tried only once.
+        if i == len(patterns):
+            return True
+        p = patterns[i]
+        tried: 'Set[Expr]' = set()
+        for j, e in enumerate(subjects):
+            if e in tried:
+                continue
+            tried.add(e)
+            attempt = dict(bindings)
+            if self.__match(p, e, attempt):
+                subjects[j] = subjects[-1]
+                last = subjects.pop()
+                if self.__match_multiset(patterns, i + 1, subjects, attempt):
+                    bindings.update(attempt)
+                    return True
+                subjects.append(last)
+                subjects[j] = e
+        return False
+
+
+class RewriteSystem:
+    def __init__(self, rules: 'Iterable[Rule]' = ()) -> 'None':
+        self.__index: 'DiscriminationTree[Tuple[int, Rule]]' = DiscriminationTree()
+        self.__normal_forms: 'BoundedCache[Expr, Expr]' = BoundedCache(1 << 16)
+        for ρ in rules:
+            self.add(ρ)
+
+    def add(self, rule: 'Rule') -> 'None':
+        self.__index.insert(rule.lhs, rule.variables, (len(self.__index), rule))
+        self.__normal_forms.clear()
+
+    def candidates(self, expr: 'Expr') -> 'List[Rule]':
+        return [ρ for _, ρ in sorted(self.__index.retrieve(expr), key=lambda p: p[0])]
+
+    def rewrite(self, expr: 'Expr') -> 'Expr':
+        res = self.__normal_forms.get(expr)
+        if res is None:
+            memo: 'Dict[Expr, Expr]' = {}
+            for ε in expr.topological_order():
+                normal = self.__normal_forms.get(ε)
+                if normal is None:
+                    args = tuple(memo[π] for π in ε.args)
+                    normal = self.__rewrite_root(ε if args == ε.args else ε.symbol.apply(*args))
+                    self.__normal_forms.put(ε, normal)
+                memo[ε] = normal
+            res = memo[expr]
+        return res
+
+    def __rewrite_root(self, expr: 'Expr') -> 'Expr':
+        for ρ in self.candidates(expr):
+            res = ρ.apply(expr)
+            if res is not None and res is not expr:
+                return self.rewrite(res)
+        return expr
+
+    def __len__(self) -> 'int':
+        return len(self.__index)
+
+
+# -----------------------------------------------------------------------------
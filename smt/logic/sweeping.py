@@ -0,0 +1,133 @@
+from typing import Optional, Tuple, List, Dict, FrozenSet
+
+import numpy as np
+
+from smt.logic.symbols_base import Sort, Expr, NegatorSymbol, expand_macros
+from smt.logic.builtin_symbols import BooleanConstSymbol, BooleanConnectiveSymbol, boolean
+from smt.logic.bdd import BDD, FALSE, TRUE
+
+
+# -----------------------------------------------------------------------------
+
+
+def _boolean_order(expr: 'Expr') -> 'List[Expr]':
+    # Connectives and negations are the inner nodes of the Boolean DAG; every
+    # other Boolean term is an opaque input and is not descended into.
+    return list(expr.postorder(lambda ε: not _is_gate(ε)))
+
+
+def _is_gate(expr: 'Expr') -> 'bool':
+    sym = expr.symbol
+    return isinstance(sym, (NegatorSymbol, BooleanConnectiveSymbol)) and sym.sort == Sort.BOOL
+
+
+def simulate(expr: 'Expr', words: 'int' = 4, seed: 'int' = 0) -> 'Dict[Expr, np.ndarray]':
+    # Every input gets 64 * words random bits, so each node ends up with the
+    # values it takes under that many random assignments.
+    rng = np.random.default_rng(seed)
+    ones = np.full(words, np.iinfo(np.uint64).max, dtype=np.uint64)
+    values: 'Dict[Expr, np.ndarray]' = {}
+    for ε in _boolean_order(expr):
+        sym = ε.symbol
+        if isinstance(sym, BooleanConstSymbol):
+            values[ε] = ones.copy() if sym.value else np.zeros(words, dtype=np.uint64)
+        elif not _is_gate(ε):
+            values[ε] = rng.integers(0, np.iinfo(np.uint64).max, size=words, dtype=np.uint64, endpoint=True)
+        elif isinstance(sym, NegatorSymbol):
+            values[ε] = np.invert(values[ε.args[0]])
+        else:
+            reducer = np.bitwise_and if sym.neutral_elem else np.bitwise_or
+            values[ε] = reducer.reduce(np.stack([values[π] for π in ε.args]), axis=0)
+    return values
+
+
+def sweep(expr: 'Expr', words: 'int' = 4, seed: 'int' = 0, support_limit: 'int' = 16) -> 'Expr':
+    # Nodes with equal or complementary simulation signatures are candidates
+    # for merging. A candidate is merged into the earlier node of its class
+    # only once decision diagrams over their common inputs prove it, which
+    # limits proofs to nodes with at most `support_limit` inputs; merging the
+    # lower nodes lets hash-consing catch equivalent nodes further up.
+    assert expr.symbol.sort == Sort.BOOL
+    expr = expand_macros(expr)
+    order = _boolean_order(expr)
+    values = simulate(expr, words, seed)
+    bdd = BDD()
+    diagrams: 'Dict[Expr, int]' = {}
+    supports: 'Dict[Expr, Optional[FrozenSet[Expr]]]' = {}
+    classes: 'Dict[bytes, List[Expr]]' = {}
+    merged: 'Dict[Expr, Tuple[Expr, bool]]' = {}
+
+    false = boolean(False)
+    diagrams[false] = FALSE
+    classes[np.zeros(words, dtype=np.uint64).tobytes()] = [false]
+
+    for ε in order:
+        support = _support(supports, ε, support_limit)
+        supports[ε] = support
+        if support is not None:
+            diagrams[ε] = _diagram(bdd, diagrams, ε)
+        value = values[ε]
+        phase = bool(value[0] & np.uint64(1))
+        key = (np.invert(value) if phase else value).tobytes()
+        members = classes.setdefault(key, [])
+        f = diagrams.get(ε)
+        for ρ in members if f is not None else ():
+            g = diagrams.get(ρ)
+            if g is not None and f == (bdd.negate(g) if phase != _phase(values, ρ) else g):
+                merged[ε] = (ρ, phase != _phase(values, ρ))
+                break
+        else:
+            members.append(ε)
+
+    rebuilt: 'Dict[Expr, Expr]' = {}
+    for ε in order:
+        if ε in merged:
+            ρ, negated = merged[ε]
+            target = rebuilt.get(ρ, ρ)
+            rebuilt[ε] = target.negated if negated else target
+        elif _is_gate(ε):
+            args = tuple(rebuilt[π] for π in ε.args)
+            rebuilt[ε] = ε if args == ε.args else ε.symbol.apply(*args)
+        else:
+            rebuilt[ε] = ε
+    return rebuilt[expr]
+
+
+def _phase(values: 'Dict[Expr, np.ndarray]', expr: 'Expr') -> 'bool':
+    value = values.get(expr)
+    return value is not None and bool(value[0] & np.uint64(1))
+
+
+def _support(supports: 'Dict[Expr, Optional[FrozenSet[Expr]]]',
+             expr: 'Expr',
+             limit: 'int') -> 'Optional[FrozenSet[Expr]]':
+    if isinstance(expr.symbol, BooleanConstSymbol):
+        return frozenset()
+    if not _is_gate(expr):
+        return frozenset((expr,))
+    support: 'FrozenSet[Expr]' = frozenset()
+    for π in expr.args:
+        σ = supports[π]
+        if σ is None:
+            return None
+        support |= σ
+        if len(support) > limit:
+            return None
+    return support
+
+
+def _diagram(bdd: 'BDD', diagrams: 'Dict[Expr, int]', expr: 'Expr') -> 'int':
+    sym = expr.symbol
+    if isinstance(sym, BooleanConstSymbol):
+        return TRUE if sym.value else FALSE
+    if not _is_gate(expr):
+        return bdd.variable(expr)
+    if isinstance(sym, NegatorSymbol):
+        return bdd.negate(diagrams[expr.args[0]])
+    res = TRUE if sym.neutral_elem else FALSE
+    for π in expr.args:
+        res = bdd.conjoin(res, diagrams[π]) if sym.neutral_elem else bdd.disjoin(res, diagrams[π])
+    return res
+
+
+# -----------------------------------------------------------------------------
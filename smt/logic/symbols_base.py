@@ -1,12 +1,18 @@
-from typing import Optional, Tuple, List, Mapping, MutableMapping, Set, \
-    Counter as CounterType, Callable, TypeVar, Generic
+from typing import Optional, Tuple, List, Dict, Iterable, Iterator, Mapping, MutableMapping, Set, MutableSet, \
+    FrozenSet, Counter as CounterType, Callable, TypeVar, Generic, Any
+from dataclasses import dataclass
 from typing_extensions import Protocol
 from enum import Enum, auto
 from abc import ABC, abstractmethod
-from weakref import WeakValueDictionary
-from collections import Counter
+from types import MappingProxyType
+from weakref import WeakValueDictionary, WeakKeyDictionary
+import weakref
+from collections import Counter, ChainMap
+from time import perf_counter
+from hashlib import blake2b
+from heapq import heappush, heappop
 
-from smt.util import Unique
+from smt.util import Arena, Unique, BoundedCache
 
 
 # -----------------------------------------------------------------------------
@@ -122,49 +128,450 @@ class Expr(Unique):
     def has_wrappers(self) -> 'bool':
         pass
 
+    @property
+    @abstractmethod
+    def depth(self) -> 'int':
+        pass
+
+    @property
+    @abstractmethod
+    def dag_size(self) -> 'int':
+        pass
+
+    @property
+    @abstractmethod
+    def variables(self) -> 'FrozenSet[Expr]':
+        pass
+
+    @property
+    @abstractmethod
+    def atoms(self) -> 'FrozenSet[Expr]':
+        pass
+
+    @property
+    def fingerprint(self) -> 'bytes':
+        return _fingerprinter(self)
+
+    @property
+    @abstractmethod
+    def arg_set(self) -> 'FrozenSet[Expr]':
+        pass
+
+    @property
+    @abstractmethod
+    def arg_signature(self) -> 'int':
+        pass
+
+    @property
+    @abstractmethod
+    def variable_signature(self) -> 'int':
+        pass
+
+    @abstractmethod
+    def topological_order(self) -> 'Tuple[Expr, ...]':
+        pass
+
+    def preorder(self,
+                 prune: 'Optional[Callable[[Expr], bool]]' = None,
+                 visited: 'Optional[MutableSet[Expr]]' = None) -> 'Traversal':
+        return Traversal((self,), False, prune, visited)
+
+    def postorder(self,
+                  prune: 'Optional[Callable[[Expr], bool]]' = None,
+                  visited: 'Optional[MutableSet[Expr]]' = None) -> 'Traversal':
+        return Traversal((self,), True, prune, visited)
+
+    def contains(self,
+                 predicate: 'Callable[[Expr], bool]',
+                 prune: 'Optional[Callable[[Expr], bool]]' = None) -> 'bool':
+        return any(predicate(ε) for ε in self.preorder(prune))
+
     def bottom_up(self, visit: 'Callable[[Expr], None]') -> 'None':
-        colors: 'CounterType[Expr]' = Counter()
-        stack: 'List[Expr]' = [self]
-        while len(stack) > 0:
-            expr = stack.pop()
-            color = colors[expr]
-            if color == 0:
-                stack.append(expr)
-                stack.extend(reversed(expr.args))
-                colors[expr] = 1
-            elif color == 1:
-                visit(expr)
-                colors[expr] = 2
+        for expr in self.topological_order():
+            visit(expr)
 
     def bottom_up_eval(self, ev: 'Eval[E]') -> 'E':
         values: 'MutableMapping[Expr, E]' = {}
-
-        def visit(expr: 'Expr') -> 'None':
+        for expr in self.topological_order():
             values[expr] = ev(expr, tuple(values[π] for π in expr.args))
-
-        self.bottom_up(visit)
         return values[self]
 
-    def bottom_up_transform(self, transform: 'Eval[Expr]') -> 'Expr':
-        def transform_wrapper(expr: 'Expr', values: 'Tuple[Expr, ...]') -> 'Expr':
-            return transform(expr, values) if isinstance(expr.symbol, ValencySymbol) \
-                else _ExprImpl(expr.symbol, values)
-
-        return self.bottom_up_eval(transform_wrapper)
+    def bottom_up_transform(self,
+                            transform: 'Eval[Expr]',
+                            variables: 'Optional[Iterable[Expr]]' = None) -> 'Expr':
+        mask = None if variables is None else _variable_mask(variables)
+        return _transform(self, transform, {}, mask, MappingProxyType({}))
 
     def substitute(self, table: 'Mapping[Expr, Expr]') -> 'Expr':
-        def transform(expr: 'Expr', values: 'Tuple[Expr, ...]') -> 'Expr':
-            return table[expr] if expr in table else expr.symbol.apply(*values)
+        return Substitution(table)(self)
 
-        return self.bottom_up_transform(transform)
+    @staticmethod
+    def substitute_many(roots: 'Iterable[Expr]', table: 'Mapping[Expr, Expr]') -> 'Tuple[Expr, ...]':
+        substitution = Substitution(table)
+        return tuple(substitution(ρ) for ρ in roots)
+
+
+class Traversal(Iterator[Expr]):
+    # Nodes are produced on demand, each at most once. A node for which
+    # `prune` holds is produced, but nothing below it is visited; in preorder
+    # the node produced last can also be pruned after the fact. Nodes already
+    # in `visited` are skipped together with everything below them, so one
+    # set shared by several traversals visits their common part only once.
+    def __init__(self,
+                 roots: 'Iterable[Expr]',
+                 postorder: 'bool',
+                 prune: 'Optional[Callable[[Expr], bool]]' = None,
+                 visited: 'Optional[MutableSet[Expr]]' = None) -> 'None':
+        self.__roots = list(roots)
+        self.__roots.reverse()
+        self.__postorder = postorder
+        self.__prune = prune
+        self.__visited: 'MutableSet[Expr]' = set() if visited is None else visited
+        self.__stack: 'List[Tuple[Expr, int]]' = []
+        self.__last: 'Optional[Expr]' = None
+        self.__stopped = False
+
+    @property
+    def visited(self) -> 'MutableSet[Expr]':
+        return self.__visited
+
+    def prune(self) -> 'None':
+        assert not self.__postorder
+        self.__last = None
+
+    def stop(self) -> 'None':
+        self.__stopped = True
+
+    def __iter__(self) -> 'Traversal':
+        return self
+
+    def __next__(self) -> 'Expr':
+        if self.__stopped:
+            raise StopIteration
+        return self.__next_postorder() if self.__postorder else self.__next_preorder()
+
+    def __next_preorder(self) -> 'Expr':
+        stack, visited = self.__stack, self.__visited
+        last = self.__last
+        if last is not None:
+            stack.extend((π, 0) for π in reversed(last.args) if π not in visited)
+        while len(stack) > 0 or len(self.__roots) > 0:
+            ε, _ = stack.pop() if len(stack) > 0 else (self.__roots.pop(), 0)
+            if ε not in visited:
+                visited.add(ε)
+                self.__last = None if self.__prune is not None and self.__prune(ε) else ε
+                return ε
+        self.__last = None
+        raise StopIteration
+
+    def __next_postorder(self) -> 'Expr':
+        # Stack entries are nodes with the index of their next argument to
+        # look at; pruned nodes start past their last argument.
+        stack, visited = self.__stack, self.__visited
+        while True:
+            if len(stack) == 0:
+                if len(self.__roots) == 0:
+                    raise StopIteration
+                ρ = self.__roots.pop()
+                if ρ not in visited:
+                    self.__enter(ρ)
+                continue
+            ε, i = stack[-1]
+            args = ε.args
+            while i < len(args) and args[i] in visited:
+                i += 1
+            if i < len(args):
+                stack[-1] = (ε, i + 1)
+                self.__enter(args[i])
+            else:
+                stack.pop()
+                return ε
+
+    def __enter(self, expr: 'Expr') -> 'None':
+        self.__visited.add(expr)
+        pruned = self.__prune is not None and self.__prune(expr)
+        self.__stack.append((expr, len(expr.args) if pruned else 0))
+
+
+class IncrementalEval(Generic[E]):
+    def __init__(self, root: 'Expr', ev: 'Eval[E]') -> 'None':
+        self.__root, self.__ev = root, ev
+        order = root.topological_order()
+        self.__positions: 'Dict[Expr, int]' = {ε: i for i, ε in enumerate(order)}
+        self.__parents: 'List[List[int]]' = [[] for _ in order]
+        for i, ε in enumerate(order):
+            for j in sorted({self.__positions[π] for π in ε.args}):
+                self.__parents[j].append(i)
+        self.__order = order
+        self.__values: 'List[E]' = []
+        self.__pinned: 'Dict[int, E]' = {}
+        self.__dirty: 'List[int]' = []
+        self.__queued: 'Set[int]' = set()
+        self.__evaluations = 0
+        for ε in order:
+            self.__values.append(self.__eval(ε))
+
+    @property
+    def root(self) -> 'Expr':
+        return self.__root
+
+    @property
+    def value(self) -> 'E':
+        return self[self.__root]
+
+    @property
+    def evaluations(self) -> 'int':
+        return self.__evaluations
+
+    def pin(self, expr: 'Expr', value: 'E') -> 'None':
+        i = self.__positions[expr]
+        self.__pinned[i] = value
+        self.__queue(i)
+
+    def unpin(self, expr: 'Expr') -> 'None':
+        i = self.__positions[expr]
+        if i in self.__pinned:
+            del self.__pinned[i]
+            self.__queue(i)
+
+    def invalidate(self, *exprs: 'Expr') -> 'None':
+        for ε in exprs:
+            self.__queue(self.__positions[ε])
+
+    def __getitem__(self, expr: 'Expr') -> 'E':
+        self.__propagate()
+        return self.__values[self.__positions[expr]]
+
+    def __contains__(self, expr: 'Expr') -> 'bool':
+        return expr in self.__positions
+
+    def __queue(self, i: 'int') -> 'None':
+        if i not in self.__queued:
+            self.__queued.add(i)
+            heappush(self.__dirty, i)
+
+    def __propagate(self) -> 'None':
+        dirty, values = self.__dirty, self.__values
+        while len(dirty) > 0:
+            i = heappop(dirty)
+            self.__queued.remove(i)
+            old = values[i]
+            new = self.__pinned[i] if i in self.__pinned else self.__eval(self.__order[i])
+            if new is not old and new != old:
+                values[i] = new
+                for j in self.__parents[i]:
+                    self.__queue(j)
+
+    def __eval(self, expr: 'Expr') -> 'E':
+        self.__evaluations += 1
+        values, positions = self.__values, self.__positions
+        return self.__ev(expr, tuple(values[positions[π]] for π in expr.args))
+
+
+def _variable_mask(variables: 'Iterable[Expr]') -> 'Optional[int]':
+    mask = 0
+    for ε in variables:
+        if not isinstance(ε.symbol, VariableSymbol):
+            return None
+        mask |= ε.variable_signature
+    return mask
+
+
+def _reapply(expr: 'Expr', values: 'Tuple[Expr, ...]') -> 'Expr':
+    return expr if values == expr.args else expr.symbol.apply(*values)
+
+
+def _transform(root: 'Expr',
+               transform: 'Eval[Expr]',
+               memo: 'MutableMapping[Expr, Expr]',
+               mask: 'Optional[int]',
+               table: 'Mapping[Expr, Expr]') -> 'Expr':
+    # A subtree whose free variables miss the mask cannot be affected by the
+    # transformation and is kept as is, without visiting anything below it.
+    # Signatures may collide, so an overlap only means "possibly affected".
+    stack: 'List[Expr]' = [root]
+    while len(stack) > 0:
+        ε = stack[-1]
+        if ε in memo:
+            stack.pop()
+            continue
+        sym = ε.symbol
+        if mask is not None and ε.variable_signature & mask == 0:
+            memo[ε] = ε
+        elif isinstance(sym, ValencySymbol) and ε in table:
+            memo[ε] = table[ε]
+        else:
+            pending = [π for π in ε.args if π not in memo]
+            if len(pending) > 0:
+                stack.extend(reversed(pending))
+                continue
+            values = tuple(memo[π] for π in ε.args)
+            if isinstance(sym, ValencySymbol):
+                memo[ε] = transform(ε, values)
+            else:
+                memo[ε] = ε if values == ε.args else _ExprImpl(sym, values)
+        stack.pop()
+    return memo[root]
+
+
+class Substitution:
+    def __init__(self, table: 'Mapping[Expr, Expr]') -> 'None':
+        self.__table = table
+        self.__mask = _variable_mask(table.keys())
+        self.__memo: 'MutableMapping[Expr, Expr]' = {}
+
+    @property
+    def table(self) -> 'Mapping[Expr, Expr]':
+        return self.__table
+
+    def __call__(self, expr: 'Expr') -> 'Expr':
+        res = self.__memo.get(expr)
+        if res is None:
+            res = _transform(expr, _reapply, self.__memo, self.__mask, self.__table)
+        return res
+
+
+class Fingerprinter:
+    def __init__(self, names: 'Mapping[Symbol, str]' = MappingProxyType({})) -> 'None':
+        self.__names = names
+        self.__digests: 'MutableMapping[Expr, bytes]' = WeakKeyDictionary()
+        self.__symbol_digests: 'MutableMapping[Symbol, bytes]' = WeakKeyDictionary()
+
+    @property
+    def names(self) -> 'Mapping[Symbol, str]':
+        return self.__names
+
+    def name_of(self, symbol: 'Symbol') -> 'str':
+        name = self.__names.get(symbol)
+        if name is None:
+            name = getattr(symbol, 'name', None)
+            if name is None:
+                raise KeyError(f"Cannot find a name for '{symbol}'")
+        return name
+
+    def symbol_digest(self, symbol: 'Symbol') -> 'bytes':
+        digest = self.__symbol_digests.get(symbol)
+        if digest is None:
+            fields = (type(symbol).__name__, *symbol._fingerprint_fields(self))
+            digest = blake2b(repr(fields).encode(), digest_size=16).digest()
+            self.__symbol_digests[symbol] = digest
+        return digest
+
+    def __call__(self, expr: 'Expr') -> 'bytes':
+        digests = self.__digests
+        digest = digests.get(expr)
+        if digest is None:
+            for ε in expr.postorder(lambda π: π in digests):
+                if ε not in digests:
+                    args = [digests[π] for π in ε.args]
+                    if isinstance(ε.symbol, CommutativeTrait):
+                        args.sort()
+                    h = blake2b(self.symbol_digest(ε.symbol), digest_size=16)
+                    for α in args:
+                        h.update(α)
+                    digests[ε] = h.digest()
+            digest = digests[expr]
+        return digest
+
+
+_fingerprinter = Fingerprinter()
+
+
+def _drop_topological_order(ref: 'weakref.ReferenceType[_ExprImpl]', _: 'int') -> 'None':
+    expr = ref()
+    if expr is not None:
+        expr._drop_topological_order()
+
+
+_topological_orders: 'BoundedCache[weakref.ReferenceType[_ExprImpl], int]' = \
+    BoundedCache(1 << 20, lambda n: n, _drop_topological_order)
+
+
+@dataclass(frozen=True)
+class _Metrics:
+    dag_size: 'int'
+    variables: 'FrozenSet[Expr]'
+    atoms: 'FrozenSet[Expr]'
+
+
+_SLOT_BITS, _SLOTS = 16, 4
+
+
+def _structure_slot(obj: 'Unique') -> 'int':
+    return (min(obj.priority_level, 15) << (_SLOT_BITS - 4)) | (obj.structure >> (_SLOT_BITS * _SLOTS - _SLOT_BITS + 4))
 
 
 @Unique.cached
 class _ExprImpl(Expr):
+    __metrics: 'Optional[_Metrics]'
+    __order: 'Optional[Tuple[Expr, ...]]'
+    __arg_set: 'Optional[Tuple[FrozenSet[Expr], int]]'
+    __negated: 'Optional[Expr]'
+    __negated_ref: 'Optional[weakref.ReferenceType[Expr]]'
+
     def __init__(self, symbol: 'Symbol', args: 'Tuple[Expr, ...]') -> 'None':
         self.__symbol, self.__args = symbol, args
         self.__has_wrappers = isinstance(symbol, WrapperSymbol) or any(π.has_wrappers for π in args)
-        self.__negated = NegatorSymbol(symbol.sort).apply(self)
+        self.__depth = max((π.depth + 1 for π in args), default=0)
+        signature = 1 << (self.ordinal & 63) if isinstance(symbol, VariableSymbol) else 0
+        for π in args:
+            signature |= π.variable_signature
+        self.__variable_signature = signature
+        self.__metrics = None
+        self.__arg_set = None
+        self.__order = None
+        self.__negated, self.__negated_ref = None, None
+
+    @classmethod
+    def _get_priority(cls, symbol: 'Symbol', args: 'Tuple[Expr, ...]') -> 'int':
+        return symbol.priority_level
+
+    @classmethod
+    def _get_structure(cls, symbol: 'Symbol', args: 'Tuple[Expr, ...]') -> 'int':
+        # Leaves take the key of their symbol and negations the key of their
+        # argument, so constants stay ordered by value and named variables and
+        # their negations by name. Other nodes pack the leading bits of the
+        # keys of the symbol and of the first arguments, which approximates
+        # comparing them lexicographically.
+        if len(args) == 0:
+            return symbol.structure
+        if isinstance(symbol, NegatorSymbol):
+            return args[0].structure
+        structure = _structure_slot(symbol)
+        for i in range(_SLOTS - 1):
+            structure = (structure << _SLOT_BITS) | (_structure_slot(args[i]) if i < len(args) else 0)
+        return structure
+
+    def topological_order(self) -> 'Tuple[Expr, ...]':
+        # The cached order ends with the expression itself, which makes a
+        # reference cycle: the shared bound breaks it for rarely used roots,
+        # and the garbage collector reclaims the orders of dead ones.
+        order = self.__order
+        if order is None:
+            nodes: 'List[Expr]' = []
+            colors: 'CounterType[Expr]' = Counter()
+            stack: 'List[Expr]' = [self]
+            while len(stack) > 0:
+                expr = stack.pop()
+                color = colors[expr]
+                if color == 0:
+                    stack.append(expr)
+                    stack.extend(reversed(expr.args))
+                    colors[expr] = 1
+                elif color == 1:
+                    nodes.append(expr)
+                    colors[expr] = 2
+            self.__order = order = tuple(nodes)
+            _topological_orders.put(weakref.ref(self), len(nodes))
+        else:
+            _topological_orders.get(weakref.ref(self))
+        return order
+
+    def _drop_topological_order(self) -> 'None':
+        self.__order = None
+
+    def __reduce__(self):
+        return self.symbol.apply, self.args
 
     @property
     def symbol(self) -> 'Symbol':
@@ -176,12 +583,78 @@ class _ExprImpl(Expr):
 
     @property
     def negated(self) -> 'Expr':
-        return self.__negated
+        negated = self.__negated
+        if negated is None:
+            ref = self.__negated_ref
+            negated = None if ref is None else ref()
+            if negated is None:
+                negated = NegatorSymbol(self.__symbol.sort).apply(self)
+                self.__link_negated(negated)
+        return negated
+
+    def __link_negated(self, negated: 'Expr') -> 'None':
+        # The expression keeps its negation alive, while the negation refers back
+        # only weakly, so a pair of compound expressions never forms a reference
+        # cycle. An atom and its negator node still do, since the latter holds
+        # the atom as its argument.
+        if negated is self:
+            self.__negated_ref = weakref.ref(self)
+        else:
+            self.__negated = negated
+            if isinstance(negated, _ExprImpl):
+                negated.__negated, negated.__negated_ref = None, weakref.ref(self)
 
     @property
     def has_wrappers(self) -> 'bool':
         return self.__has_wrappers
 
+    @property
+    def depth(self) -> 'int':
+        return self.__depth
+
+    @property
+    def dag_size(self) -> 'int':
+        return self.__get_metrics().dag_size
+
+    @property
+    def variables(self) -> 'FrozenSet[Expr]':
+        return self.__get_metrics().variables
+
+    @property
+    def atoms(self) -> 'FrozenSet[Expr]':
+        return self.__get_metrics().atoms
+
+    @property
+    def arg_set(self) -> 'FrozenSet[Expr]':
+        return self.__get_arg_set()[0]
+
+    @property
+    def arg_signature(self) -> 'int':
+        return self.__get_arg_set()[1]
+
+    @property
+    def variable_signature(self) -> 'int':
+        return self.__variable_signature
+
+    def __get_arg_set(self) -> 'Tuple[FrozenSet[Expr], int]':
+        arg_set = self.__arg_set
+        if arg_set is None:
+            signature = 0
+            for π in self.__args:
+                signature |= 1 << (π.ordinal & 63)
+            self.__arg_set = arg_set = (frozenset(self.__args), signature)
+        return arg_set
+
+    def __get_metrics(self) -> '_Metrics':
+        metrics = self.__metrics
+        if metrics is None:
+            order = self.topological_order()
+            variables = frozenset(ε for ε in order if isinstance(ε.symbol, VariableSymbol))
+            atoms = frozenset(ε for ε in order if ε.symbol.sort == Sort.BOOL and
+                              not isinstance(ε.symbol, (ConnectiveTrait, ConstSymbol)))
+            self.__metrics = metrics = _Metrics(len(order), variables, atoms)
+        return metrics
+
 
 # -----------------------------------------------------------------------------
 
@@ -253,11 +726,23 @@ class BinaryReducerMixin(ReducerTrait, ABC):
 # -----------------------------------------------------------------------------
 
 
+class ConnectiveTrait(ABC):
+    pass
+
+
+class CommutativeTrait(ABC):
+    pass
+
+
 class Symbol(Unique, SortTrait):
     @abstractmethod
     def apply(self, *args: 'Expr') -> 'Expr':
         pass
 
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def _fingerprint_fields(self, fingerprinter: 'Fingerprinter') -> 'Tuple[Any, ...]':
+        return ()
+
 
 class WrapperSymbol(Symbol):
     def __init__(self, opt_symbol: 'Optional[ValencySymbol]' = None) -> 'None':
@@ -275,20 +760,97 @@ class WrapperSymbol(Symbol):
     def apply(self, *args: 'Expr') -> 'Expr':
         return _ExprImpl(self, args)
 
+    def _fingerprint_fields(self, fingerprinter: 'Fingerprinter') -> 'Tuple[Any, ...]':
+        opt_symbol = self.opt_symbol
+        return () if opt_symbol is None else (fingerprinter.symbol_digest(opt_symbol),)
+
+
+@dataclass
+class ApplicationStatistics:
+    hits: 'int' = 0
+    misses: 'int' = 0
+    reductions: 'int' = 0
+    reduce_time: 'float' = 0.0
+
+
+_ApplicationKey = Tuple['ValencySymbol', Tuple[Expr, ...]]
+
+
+class RetentionPolicy(Protocol):
+    @abstractmethod
+    def get(self, key: '_ApplicationKey') -> 'Optional[Expr]':
+        pass
+
+    @abstractmethod
+    def put(self, key: '_ApplicationKey', expr: 'Expr') -> 'None':
+        pass
+
+
+class WeakRetentionPolicy(RetentionPolicy):
+    # Results are held weakly under the ordinals of the symbol and arguments,
+    # so the policy keeps neither alive. Ordinals are never reused, so entries
+    # left behind by dead arguments never match and are evicted in time.
+    def __init__(self, capacity: 'int' = 1 << 16) -> 'None':
+        self.__entries: 'BoundedCache[Tuple[int, ...], weakref.ReferenceType[Expr]]' = BoundedCache(capacity)
+
+    def get(self, key: '_ApplicationKey') -> 'Optional[Expr]':
+        ref = self.__entries.get(WeakRetentionPolicy.__ordinals(key))
+        return None if ref is None else ref()
+
+    def put(self, key: '_ApplicationKey', expr: 'Expr') -> 'None':
+        self.__entries.put(WeakRetentionPolicy.__ordinals(key), weakref.ref(expr))
+
+    @staticmethod
+    def __ordinals(key: '_ApplicationKey') -> 'Tuple[int, ...]':
+        symbol, args = key
+        return (symbol.ordinal, *(π.ordinal for π in args))
+
 
 class ValencySymbol(Symbol, ValencyTrait, ReducerTrait, ABC):
-    __applications_cache: 'MutableMapping[Tuple[ValencySymbol, Tuple[Expr, ...]], Expr]' = \
-        WeakValueDictionary()
+    __applications_cache: 'MutableMapping[_ApplicationKey, Expr]' = WeakValueDictionary()
+    __retention_policy: 'Optional[RetentionPolicy]' = WeakRetentionPolicy()
+    __statistics: 'Optional[ApplicationStatistics]' = None
+
+    @staticmethod
+    def retention_policy() -> 'Optional[RetentionPolicy]':
+        return ValencySymbol.__retention_policy
+
+    @staticmethod
+    def set_retention_policy(policy: 'Optional[RetentionPolicy]') -> 'None':
+        ValencySymbol.__retention_policy = policy
+
+    @property
+    def statistics(self) -> 'ApplicationStatistics':
+        statistics = self.__statistics
+        if statistics is None:
+            self.__statistics = statistics = ApplicationStatistics()
+        return statistics
 
     def apply(self, *args: 'Expr') -> 'Expr':
         if not self.check_args(*(π.symbol.sort for π in args)):
             return WrapperSymbol(self).apply(*args)
         key = (self, args)
-        expr = ValencySymbol.__applications_cache.get(key)
+        statistics = self.statistics
+        expr = Arena.lookup(ValencySymbol.__applications_cache, key)
+        policy = ValencySymbol.__retention_policy
+        if expr is None and policy is not None:
+            expr = policy.get(key)
+        if expr is not None:
+            statistics.hits += 1
+            return expr
+
+        statistics.misses += 1
+        start = perf_counter()
+        expr = self._reduce(*args)
+        statistics.reduce_time += perf_counter() - start
         if expr is None:
-            expr = self._reduce(*args)
-            if expr is None:
-                ValencySymbol.__applications_cache[key] = expr = _ExprImpl(self, args)
+            expr = _ExprImpl(self, args)
+            Arena.store(ValencySymbol.__applications_cache, key, expr)
+        else:
+            statistics.reductions += 1
+            # Results built inside an arena must not outlive it.
+            if policy is not None and not Arena.is_active():
+                policy.put(key, expr)
         return expr
 
 
@@ -303,10 +865,13 @@ class CustomSymbol(ValencySymbol, ABC):
     def sort(self) -> 'Sort':
         return self.__sort
 
+    def _fingerprint_fields(self, fingerprinter: 'Fingerprinter') -> 'Tuple[Any, ...]':
+        return self.sort.name,
+
 
 @Unique.priority(0)
 @Unique.cached
-class NegatorSymbol(CustomSymbol, UnaryValencyMixin, UnaryReducerMixin):
+class NegatorSymbol(CustomSymbol, UnaryValencyMixin, UnaryReducerMixin, ConnectiveTrait):
     @property
     def arg_sort(self) -> 'Sort':
         return self.sort
@@ -329,34 +894,69 @@ class NegatorSymbol(CustomSymbol, UnaryValencyMixin, UnaryReducerMixin):
 
 @Unique.priority(2)
 class VariableSymbol(CustomSymbol, NullaryValencyMixin):
-    pass
+    def __init__(self, sort: 'Sort', name: 'Optional[str]' = None) -> 'None':
+        super().__init__(sort)
+        self.__name = name
+
+    @property
+    def name(self) -> 'Optional[str]':
+        return self.__name
+
+    @classmethod
+    def _get_structure(cls, *args, **kwargs) -> 'int':
+        name = kwargs.get('name', args[1] if len(args) > 1 else None)
+        return super()._get_structure(*args, **kwargs) if name is None else Unique.ordered_structure(name)
+
+    def _fingerprint_fields(self, fingerprinter: 'Fingerprinter') -> 'Tuple[Any, ...]':
+        return self.sort.name, fingerprinter.name_of(self)
 
 
 @Unique.priority(3)
 class FunctionSymbol(CustomSymbol):
     def __init__(self,
                  sort: 'Sort',
-                 args: 'Tuple[Sort, ...]') -> 'None':
+                 args: 'Tuple[Sort, ...]',
+                 name: 'Optional[str]' = None) -> 'None':
         super().__init__(sort)
-        self.__args = args
+        self.__args, self.__name = args, name
 
     @property
     def args(self) -> 'Tuple[Sort, ...]':
         return self.__args
 
+    @property
+    def name(self) -> 'Optional[str]':
+        return self.__name
+
+    def _fingerprint_fields(self, fingerprinter: 'Fingerprinter') -> 'Tuple[Any, ...]':
+        return self.sort.name, tuple(π.name for π in self.args), fingerprinter.name_of(self)
+
     def get_arg_sort(self, index: 'int', present: 'bool') -> 'Optional[Sort]':
         return self.args[index] if 0 <= index < len(self.args) else None
 
 
 @Unique.priority(4)
 @Unique.cached
+@Unique.transform_args(lambda sort, formal_args, body, lazy=False: (sort, formal_args, body, lazy))
 class MacroSymbol(FunctionSymbol):
     def __init__(self,
                  sort: 'Sort',
                  formal_args: 'Tuple[VariableSymbol, ...]',
-                 body: 'Expr') -> 'None':
+                 body: 'Expr',
+                 lazy: 'bool' = False) -> 'None':
         super().__init__(sort, tuple(π.sort for π in formal_args))
-        self.__formal_args, self.__body = formal_args, body
+        self.__formal_args, self.__body, self.__lazy = formal_args, body, lazy
+
+    @classmethod
+    def _get_structure(cls,
+                       sort: 'Sort',
+                       formal_args: 'Tuple[VariableSymbol, ...]',
+                       body: 'Expr',
+                       lazy: 'bool' = False) -> 'int':
+        # The lazy and eager versions of a macro stay distinct symbols, as only
+        # the eager one expands when applied, but laziness leaves the order of
+        # expressions unchanged; expand_macros maps one onto the other.
+        return super()._get_structure(sort, formal_args, body)
 
     @property
     def formal_args(self) -> 'Tuple[VariableSymbol, ...]':
@@ -366,67 +966,205 @@ class MacroSymbol(FunctionSymbol):
     def body(self) -> 'Expr':
         return self.__body
 
-    def _reduce(self, *args: 'Expr') -> 'Optional[Expr]':
-        if isinstance(self.body.symbol, ValencySymbol) and (self.body.symbol.sort == self.sort):
+    @property
+    def lazy(self) -> 'bool':
+        return self.__lazy
+
+    @property
+    def is_expandable(self) -> 'bool':
+        return isinstance(self.body.symbol, ValencySymbol) and (self.body.symbol.sort == self.sort)
+
+    def expand(self, *args: 'Expr') -> 'Expr':
+        key = (self, args)
+        expr = _macro_expansions.get(key)
+        if expr is None:
             table = {self.formal_args[i].apply(): args[i] for i in range(len(args))}
-            return self.body.substitute(table)
+            expr = self.body.substitute(table)
+            _macro_expansions.put(key, expr)
+        return expr
+
+    def _reduce(self, *args: 'Expr') -> 'Optional[Expr]':
+        if not self.lazy and self.is_expandable:
+            return self.expand(*args)
         return None
 
+    def _fingerprint_fields(self, fingerprinter: 'Fingerprinter') -> 'Tuple[Any, ...]':
+        formal_names = {π: f"#{i}" for i, π in enumerate(self.formal_args)}
+        body = Fingerprinter(ChainMap(formal_names, fingerprinter.names))(self.body)
+        return self.sort.name, tuple(π.name for π in self.args), self.lazy, body
+
+
+_macro_expansions: 'BoundedCache[Tuple[MacroSymbol, Tuple[Expr, ...]], Expr]' = BoundedCache(1 << 16)
+
+
+def expand_macros(expr: 'Expr') -> 'Expr':
+    def transform(e: 'Expr', args: 'Tuple[Expr, ...]') -> 'Expr':
+        sym = e.symbol
+        if isinstance(sym, MacroSymbol) and sym.is_expandable:
+            return expand_macros(sym.expand(*args))
+        return _reapply(e, args)
+
+    if not expr.contains(_is_expandable_macro):
+        return expr
+    return expr.bottom_up_transform(transform)
+
+
+def _is_expandable_macro(expr: 'Expr') -> 'bool':
+    sym = expr.symbol
+    return isinstance(sym, MacroSymbol) and sym.is_expandable
+
 
 # -----------------------------------------------------------------------------
 
 
-class AssociativeCommutativeSymbol(ValencySymbol, MultiaryValencyMixin, ABC):
+class AssociativeCommutativeSymbol(ValencySymbol, MultiaryValencyMixin, CommutativeTrait, ABC):
     def __init__(self) -> 'None':
         assert self.sort == self.get_arg_sort(0, True)
 
     def _reduce(self, *args: 'Expr') -> 'Expr':
         index_to_expr: 'List[Expr]' = []
-
-        def flatten(*es: 'Expr') -> 'Set[int]':
-            dest: 'Set[int]' = set()
-            stack: 'List[Expr]' = list(es)
+        res: 'Set[int]' = set()
+        by_expr: 'Dict[Expr, List[int]]' = {}
+        candidates: 'Set[int]' = set()
+        unindexed: 'Set[int]' = set()
+        occurrences: 'Dict[Any, Set[int]]' = {}
+        negators: 'Dict[Expr, Expr]' = {}
+        fresh: 'List[int]' = []
+        const: 'Optional[Expr]' = None
+
+        def combine(a: 'Expr', b: 'Expr') -> 'Optional[Expr]':
+            c = self._binary_reduce(a, b)
+            return c if c is not None else self._binary_reduce(b, a)
+
+        def add(e: 'Expr') -> 'None':
+            index = len(index_to_expr)
+            index_to_expr.append(e)
+            res.add(index)
+            by_expr.setdefault(e, []).append(index)
+            if isinstance(e.symbol, NegatorSymbol):
+                negators[e.args[0]] = e
+            if self._needs_pairwise_reduce(e):
+                candidates.add(index)
+                keys = self._occurrence_keys(e)
+                if keys is None:
+                    unindexed.add(index)
+                else:
+                    for key in keys:
+                        occurrences.setdefault(key, set()).add(index)
+            fresh.append(index)
+
+        def remove(index: 'int') -> 'None':
+            res.remove(index)
+            by_expr[index_to_expr[index]].remove(index)
+            if index in candidates:
+                candidates.remove(index)
+                keys = self._occurrence_keys(index_to_expr[index])
+                if keys is None:
+                    unindexed.remove(index)
+                else:
+                    for key in keys:
+                        occurrences[key].discard(index)
+
+        def match(e: 'Expr') -> 'Optional[Expr]':
+            # Only explicit negator nodes are matched as complements, so that no
+            # negation has to be built for every argument; subtler complements
+            # are left to the pairwise reduction.
+            complement = e.args[0] if isinstance(e.symbol, NegatorSymbol) else negators.get(e)
+            for key in (e, complement):
+                if key is None:
+                    continue
+                indexes = by_expr.get(key)
+                if indexes:
+                    c = combine(index_to_expr[indexes[-1]], e)
+                    if c is not None:
+                        remove(indexes[-1])
+                        return c
+            return None
+
+        def insert(*es: 'Expr') -> 'None':
+            nonlocal const
+            stack: 'List[Expr]' = list(reversed(es))
             while len(stack) > 0:
                 e = stack.pop()
                 if e.symbol == self:
-                    stack.extend(e.args)
+                    stack.extend(reversed(e.args))
+                    continue
+                if isinstance(e.symbol, ConstSymbol):
+                    if const is None:
+                        const = e
+                        continue
+                    c = combine(const, e)
+                    if c is not None:
+                        const = None
+                else:
+                    c = match(e)
+                if c is not None:
+                    stack.append(c)
                 else:
-                    index = len(index_to_expr)
-                    index_to_expr.append(e)
-                    dest.add(index)
-            return dest
-
-        res: 'Set[int]' = flatten(*args)
-        res_copy = res.copy()
-        tasks: 'List[Tuple[Set[int], Set[int]]]' = [(res_copy, res_copy)]
-        while len(tasks) > 0:
-            (first, second) = tasks.pop()
-            second_list = [i for i in second if i in res]
-            created: 'Set[int]' = set()
-            for a in first:
-                if a in res:
-                    for i in range(len(second_list)):
-                        b = second_list[i]
-                        if (a != b) and (b in res):
+                    add(e)
+
+        def partners(a: 'int') -> 'List[int]':
+            keys = self._partner_keys(index_to_expr[a])
+            if keys is None:
+                return list(res) if a in candidates else list(candidates)
+            indexed, live = keys
+            found: 'Set[int]' = set(unindexed)
+            for key in indexed:
+                found.update(occurrences.get(key, ()))
+            if a in candidates:
+                for key in live:
+                    found.update(by_expr.get(key, ()))
+                    complement = key.args[0] if isinstance(key.symbol, NegatorSymbol) else negators.get(key)
+                    if complement is not None:
+                        found.update(by_expr.get(complement, ()))
+            return sorted(found)
+
+        insert(*args)
+        while True:
+            while len(fresh) > 0:
+                a = fresh.pop()
+                if a not in res:
+                    continue
+                for b in partners(a):
+                    if (a != b) and (b in res):
+                        c = self._binary_reduce(index_to_expr[b], index_to_expr[a]) if a in candidates else None
+                        if c is None and b in candidates:
                             c = self._binary_reduce(index_to_expr[a], index_to_expr[b])
-                            if c is not None:
-                                res.remove(a)
-                                res.remove(b)
-                                created |= flatten(c)
-                                second_list[i] = second_list[-1]
-                                second_list.pop()
-                                break
-            if len(created) > 0:
-                res_copy = res.copy()
-                tasks.append((res_copy, created))
-                tasks.append((created, res_copy))
-                tasks.append((created, created))
-                res |= created
+                        if c is not None:
+                            remove(a)
+                            remove(b)
+                            insert(c)
+                            break
+            if const is None:
+                break
+            e, const = const, None
+            for b in res:
+                c = combine(e, index_to_expr[b])
+                if c is not None:
+                    remove(b)
+                    insert(c)
+                    break
+            else:
+                add(e)
 
         new_args = tuple(sorted(index_to_expr[i] for i in res))
         return new_args[0] if len(res) == 1 and isinstance(new_args[0].symbol, ValencySymbol) \
             else _ExprImpl(self, new_args)
 
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def _needs_pairwise_reduce(self, e: 'Expr') -> 'bool':
+        return True
+
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def _occurrence_keys(self, e: 'Expr') -> 'Optional[Iterable[Any]]':
+        return None
+
+    # Index keys to look up, and arguments whose equal or complementary
+    # arguments are partners as well.
+    # noinspection PyMethodMayBeStatic,PyUnusedLocal
+    def _partner_keys(self, e: 'Expr') -> 'Optional[Tuple[Iterable[Any], Iterable[Expr]]]':
+        return None
+
     # noinspection PyMethodMayBeStatic,PyUnusedLocal
     def _binary_reduce(self, a: 'Expr', b: 'Expr') -> 'Optional[Expr]':
         return None
@@ -449,5 +1187,12 @@ class ConstSymbol(Generic[T], ValencySymbol, NullaryValencyMixin, NullaryReducer
     def value(self) -> T:
         return self.__value
 
+    @classmethod
+    def _get_structure(cls, value: 'T') -> 'int':
+        return Unique.ordered_structure(value)
+
+    def _fingerprint_fields(self, fingerprinter: 'Fingerprinter') -> 'Tuple[Any, ...]':
+        return self.value,
+
 
 # -----------------------------------------------------------------------------
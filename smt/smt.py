@@ -6,10 +6,21 @@ from smt.interpreters import Position, MessageSet, Smtlib
 parser = ArgumentParser(description='Experimental SMT solver.')
 parser.add_argument('files', metavar='File', type=str, nargs='+',
                     help='a file in SMTLIB language')
+parser.add_argument('--lazy-macros', action='store_true',
+                    help='keep define-fun applications unexpanded until solving')
+parser.add_argument('--workers', metavar='N', type=int, default=0,
+                    help='solve independent groups of assertions in N worker processes')
+parser.add_argument('--bdd-limit', metavar='N', type=int, default=16,
+                    help='decide groups of at most N atoms with decision diagrams instead of DPLL')
+parser.add_argument('--sweep', action='store_true',
+                    help='merge equivalent subterms by simulation and SAT sweeping before solving (needs numpy)')
 
 args = parser.parse_args()
 ms = MessageSet()
-interpreter = Smtlib(ms)
+try:
+    interpreter = Smtlib(ms, args.lazy_macros, args.workers, args.bdd_limit, args.sweep)
+except ValueError as error:
+    parser.error(str(error))
 for filename in args.files:
     pos = Position.beginning_of(filename)
     interpreter.execute(pos)
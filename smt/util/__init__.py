@@ -1,4 +1,5 @@
-from smt.util.unique import UniqueMeta, Unique
-from smt.util.vector import Vector
+from smt.util.unique import Arena, UniqueMeta, Unique
+from smt.util.vector import VectorSlice, Vector
+from smt.util.cache import BoundedCache
 from smt.util.transactional import Memory, Transaction, \
     Transactional, TransactionalSet, TransactionalMapping, TransactionalVector
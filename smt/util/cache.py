@@ -0,0 +1,93 @@
+from typing import Optional, Tuple, List, Callable, Hashable, TypeVar, Generic
+from collections import OrderedDict
+from threading import Lock
+
+
+# -----------------------------------------------------------------------------
+
+
+_K = TypeVar('_K', bound=Hashable)
+_V = TypeVar('_V')
+
+
+class BoundedCache(Generic[_K, _V]):
+    def __init__(self,
+                 capacity: 'int',
+                 weigh: 'Optional[Callable[[_V], int]]' = None,
+                 evict: 'Optional[Callable[[_K, _V], None]]' = None) -> 'None':
+        self.__capacity = capacity
+        self.__weigh = weigh
+        self.__on_evict = evict
+        self.__weight = 0
+        self.__entries: 'OrderedDict[_K, _V]' = OrderedDict()
+        self.__lock = Lock()
+
+    @property
+    def capacity(self) -> 'int':
+        return self.__capacity
+
+    @capacity.setter
+    def capacity(self, value: 'int') -> 'None':
+        with self.__lock:
+            self.__capacity = value
+            evicted = self.__evict()
+        self.__notify(evicted)
+
+    @property
+    def weight(self) -> 'int':
+        return self.__weight
+
+    def get(self, key: '_K') -> 'Optional[_V]':
+        with self.__lock:
+            value = self.__entries.get(key)
+            if value is not None:
+                self.__entries.move_to_end(key)
+            return value
+
+    def put(self, key: '_K', value: '_V') -> 'None':
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__weight -= self.__weight_of(old)
+            self.__entries[key] = value
+            self.__weight += self.__weight_of(value)
+            evicted = self.__evict()
+        self.__notify(evicted)
+
+    def discard(self, key: '_K') -> 'None':
+        with self.__lock:
+            old = self.__entries.pop(key, None)
+            if old is not None:
+                self.__weight -= self.__weight_of(old)
+
+    def clear(self) -> 'None':
+        with self.__lock:
+            self.__entries.clear()
+            self.__weight = 0
+
+    def __contains__(self, key: '_K') -> 'bool':
+        return key in self.__entries
+
+    def __len__(self) -> 'int':
+        return len(self.__entries)
+
+    def __weight_of(self, value: '_V') -> 'int':
+        return 1 if self.__weigh is None else self.__weigh(value)
+
+    def __evict(self) -> 'List[Tuple[_K, _V]]':
+        entries = self.__entries
+        evicted: 'List[Tuple[_K, _V]]' = []
+        while self.__weight > self.__capacity and len(entries) > 0:
+            key, value = entries.popitem(last=False)
+            self.__weight -= self.__weight_of(value)
+            evicted.append((key, value))
+        return evicted
+
+    def __notify(self, evicted: 'List[Tuple[_K, _V]]') -> 'None':
+        # Called without the lock, so the callback may use the cache again.
+        if self.__on_evict is not None:
+            for key, value in evicted:
+                self.__on_evict(key, value)
+
+
+# -----------------------------------------------------------------------------
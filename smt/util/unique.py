@@ -1,12 +1,104 @@
-from typing import Any, Optional, Tuple, MutableMapping, Callable
+from typing import Any, Optional, Tuple, List, Mapping, MutableMapping, Dict, Callable
+from types import MappingProxyType
 from abc import ABC, ABCMeta
-from functools import total_ordering
-from weakref import WeakValueDictionary
+from enum import Enum
+from functools import total_ordering, lru_cache
+from hashlib import blake2b
+from itertools import count
+from threading import RLock, local
+from uuid import uuid4
+from weakref import WeakValueDictionary, WeakKeyDictionary
+import weakref
 
 
 # -----------------------------------------------------------------------------
 
 
+class Arena:
+    def __init__(self) -> 'None':
+        self.__tables: 'Dict[int, Tuple[MutableMapping[Any, Any], Dict[Any, Any]]]' = {}
+
+    def __enter__(self) -> 'Arena':
+        with _lock:
+            _local.arenas.append(self)
+            _open.append(self)
+        return self
+
+    def __exit__(self, *exc_info) -> 'None':
+        # The tables are dropped at once; objects that are still referenced
+        # from elsewhere then move to the enclosing arena or the global tables,
+        # so they stay interned. Garbage in reference cycles is moved as well
+        # and leaves the global tables once the collector frees it. Everything
+        # happens under the lock, so no other thread can build a second copy of
+        # a survivor before it has moved.
+        with _lock:
+            arenas = _local.arenas
+            assert arenas[-1] is self
+            arenas.pop()
+            _open.remove(self)
+            tables, self.__tables = self.__tables, {}
+            survivors = [(cache, key, weakref.ref(obj))
+                         for cache, table in tables.values() for key, obj in table.items()]
+            del tables
+            for cache, key, ref in survivors:
+                obj = ref()
+                if obj is not None and Arena.lookup(cache, key) is None:
+                    Arena.store(cache, key, obj)
+
+    def __len__(self) -> 'int':
+        return sum(len(t) for _, t in self.__tables.values())
+
+    @staticmethod
+    def is_active() -> 'bool':
+        return len(_local.arenas) > 0
+
+    @staticmethod
+    def lookup(cache: 'MutableMapping[Any, Any]', key: 'Any') -> 'Any':
+        obj = cache.get(key)
+        if obj is None:
+            for arena in reversed(_open):
+                entry = arena.__tables.get(id(cache))
+                if entry is not None:
+                    obj = entry[1].get(key)
+                    if obj is not None:
+                        break
+        return obj
+
+    @staticmethod
+    def store(cache: 'MutableMapping[Any, Any]', key: 'Any', obj: 'Any') -> 'None':
+        arenas = _local.arenas
+        if len(arenas) == 0:
+            cache[key] = obj
+        else:
+            tables = arenas[-1].__tables
+            entry = tables.get(id(cache))
+            if entry is None:
+                tables[id(cache)] = entry = (cache, {})
+            entry[1][key] = obj
+
+
+class _ArenaStack(local):
+    def __init__(self) -> 'None':
+        self.arenas: 'List[Arena]' = []
+
+
+# Every thread has its own arenas, so objects built by other threads are never
+# stored in them. Lookups search the open arenas of all threads, so an object
+# interned in one of them is never built a second time elsewhere.
+_local = _ArenaStack()
+_open: 'List[Arena]' = []
+
+
+# Objects are constructed under one reentrant lock: construction recurses into
+# other classes (negations, watches), so finer-grained locks could deadlock.
+# Until the outermost construction returns, new objects are visible only to the
+# constructing thread through the pending table, so the lock-free lookup in
+# UniqueMeta.__call__ never returns a partially initialized object.
+_lock = RLock()
+_pending: 'Dict[Tuple[int, Any], Tuple[MutableMapping[Any, Any], Any]]' = {}
+_depth = 0
+
+
 class UniqueMeta(ABCMeta):
     def __init__(cls, name, bases, namespace) -> 'None':
         super().__init__(name, bases, namespace)
@@ -14,47 +106,119 @@ class UniqueMeta(ABCMeta):
         cls._transform: 'Optional[Callable]' = None
 
     def __call__(cls, *args, **kwargs):
-        obj: 'Optional[Unique]' = None
-        if cls._cache is not None:
-            obj = cls._cache.get(_make_key(cls._transform, *args, **kwargs))
+        cache = cls._cache
+        if cache is None:
+            return super().__call__(*args, **kwargs)
+        key = _make_key(cls._transform, *args, **kwargs)
+        obj: 'Optional[Unique]' = Arena.lookup(cache, key)
         if obj is None:
+            with _lock:
+                entry = _pending.get((id(cache), key))
+                obj = Arena.lookup(cache, key) if entry is None else entry[1]
+                if obj is None:
+                    obj = cls.__construct(*args, **kwargs)
+        return obj
+
+    def __construct(cls, *args, **kwargs):
+        global _depth
+        _depth += 1
+        try:
             obj = super().__call__(*args, **kwargs)
+        except BaseException:
+            if _depth == 1:
+                _pending.clear()
+            raise
+        finally:
+            _depth -= 1
+        if _depth == 0:
+            for (_, key), (cache, value) in _pending.items():
+                Arena.store(cache, key, value)
+            _pending.clear()
         return obj
 
 
+# An ordinal packs the priority, a structural key and the construction counter,
+# from the most significant bits down. The structural key depends only on the
+# content of an object, so objects of the same priority are ordered the same
+# way in every process; the counter only breaks ties between equal keys.
+_COUNTER_BITS = 48
+_STRUCTURE_BITS = 64
+_STRUCTURE_MASK = (1 << _STRUCTURE_BITS) - 1
+
+
 @total_ordering
 class Unique(ABC, metaclass=UniqueMeta):
-    __key: 'Tuple[Any, ...]'
+    __ordinal: 'int'
     __precomputed_hash: 'int'
+    __new_args: 'Tuple[Any, ...]'
+    __new_kwargs: 'Mapping[str, Any]'
 
     __priority: 'int' = 1000
-    __count: 'int' = 0
+    __counter = count()
 
     def __new__(cls, *args, **kwargs):
         obj = super().__new__(cls)
         key = _make_key(cls._transform, *args, **kwargs)
-        obj.__key = (cls.__priority, cls.__name__, key, cls.__count)
-        cls.__count += 1
-        obj.__precomputed_hash = hash(obj.__key)
+        structure = cls._get_structure(*args, **kwargs) & _STRUCTURE_MASK
+        obj.__ordinal = (((cls._get_priority(*args, **kwargs) << _STRUCTURE_BITS) | structure) << _COUNTER_BITS) | \
+            next(Unique.__counter)
+        obj.__precomputed_hash = hash(obj.__ordinal)
+        obj.__new_args, obj.__new_kwargs = args, kwargs if len(kwargs) > 0 else _NO_KWARGS
         if cls._cache is not None:
-            cls._cache[key] = obj
+            _pending[(id(cls._cache), key)] = (cls._cache, obj)
         return obj
 
+    @property
+    def ordinal(self) -> 'int':
+        return self.__ordinal
+
+    @property
+    def priority_level(self) -> 'int':
+        return self.__ordinal >> (_STRUCTURE_BITS + _COUNTER_BITS)
+
+    @property
+    def structure(self) -> 'int':
+        return (self.__ordinal >> _COUNTER_BITS) & _STRUCTURE_MASK
+
+    @classmethod
+    def _get_priority(cls, *args, **kwargs) -> 'int':
+        return cls.__priority
+
+    @classmethod
+    def _get_structure(cls, *args, **kwargs) -> 'int':
+        return _structure_of((cls.__name__, _make_key(cls._transform, *args, **kwargs)))
+
     def __eq__(self, other) -> 'bool':
         return self is other
 
     def __lt__(self, other) -> 'bool':
         assert isinstance(other, Unique)
-        return self.__key < other.__key
+        return self.__ordinal < other.__ordinal
 
     def __hash__(self) -> 'int':
         return self.__precomputed_hash
 
+    def __reduce__(self):
+        cls = type(self)
+        if cls._cache is None:
+            return _reintern, (cls, _uid_of(self), self.__new_args, dict(self.__new_kwargs))
+        if len(self.__new_kwargs) == 0:
+            return cls, self.__new_args
+        return _reconstruct, (cls, self.__new_args, dict(self.__new_kwargs))
+
     @staticmethod
     def cached(cls):
         cls._cache = WeakValueDictionary()
         return cls
 
+    @staticmethod
+    def ordered_structure(value: 'Any') -> 'int':
+        return _ordered_structure(value)
+
+    @staticmethod
+    def arena() -> 'Arena':
+        return Arena()
+
     @staticmethod
     def transform_args(transform: 'Callable'):
         def set_transform(cls):
@@ -70,9 +234,75 @@ class Unique(ABC, metaclass=UniqueMeta):
         return set_priority
 
 
+_NO_KWARGS: 'Mapping[str, Any]' = MappingProxyType({})
+
+
+def _reconstruct(cls: 'UniqueMeta', args: 'Tuple[Any, ...]', kwargs: 'Mapping[str, Any]') -> 'Unique':
+    return cls(*args, **kwargs)
+
+
+# Objects that are not hash-consed are identified across pickling by a uid
+# assigned when they are first pickled. Loading a uid yields the live object
+# that carries it, or builds one that takes the uid over, so every load in a
+# process shares the same instance.
+_uids: 'MutableMapping[str, Unique]' = WeakValueDictionary()
+_uids_by_object: 'MutableMapping[Unique, str]' = WeakKeyDictionary()
+
+
+def _uid_of(obj: 'Unique') -> 'str':
+    with _lock:
+        uid = _uids_by_object.get(obj)
+        if uid is None:
+            _uids_by_object[obj] = uid = uuid4().hex
+            _uids[uid] = obj
+        return uid
+
+
+def _reintern(cls: 'UniqueMeta', uid: 'str', args: 'Tuple[Any, ...]', kwargs: 'Mapping[str, Any]') -> 'Unique':
+    with _lock:
+        obj = _uids.get(uid)
+        if obj is None:
+            obj = cls(*args, **kwargs)
+            _uids_by_object[obj], _uids[uid] = uid, obj
+        return obj
+
+
+def _structure_of(value: 'Any') -> 'int':
+    # Tuples of integers hash the same way in every process, unlike strings,
+    # which are digested instead. Values of other types do not contribute.
+    if isinstance(value, Unique):
+        return value.ordinal >> _COUNTER_BITS
+    if isinstance(value, tuple):
+        return hash(tuple(_structure_of(ν) for ν in value))
+    if isinstance(value, str):
+        return _string_structure(value)
+    if isinstance(value, Enum):
+        return _string_structure(value.name)
+    if isinstance(value, int):
+        return value
+    return 0
+
+
+@lru_cache(maxsize=1 << 12)
+def _string_structure(value: 'str') -> 'int':
+    return int.from_bytes(blake2b(value.encode(), digest_size=8).digest(), 'big')
+
+
+def _ordered_structure(value: 'Any') -> 'int':
+    # A structural key that preserves the natural order of integers and, up to
+    # their first eight bytes, of strings.
+    if isinstance(value, int):
+        return min(max(value + (1 << (_STRUCTURE_BITS - 1)), 0), _STRUCTURE_MASK)
+    if isinstance(value, str):
+        return int.from_bytes(value.encode()[:_STRUCTURE_BITS // 8].ljust(_STRUCTURE_BITS // 8, b"\0"), 'big')
+    return _structure_of(value)
+
+
 def _make_key(transform: 'Optional[Callable]', *args, **kwargs) -> 'Tuple[Any, ...]':
-    transformed_args = args if transform is None else transform(*args)
-    return transformed_args, tuple(sorted(kwargs.items()))
+    # A transform normalises keyword arguments too, so it sees all of them.
+    if transform is not None:
+        return transform(*args, **kwargs), ()
+    return args, tuple(sorted(kwargs.items()))
 
 
 # -----------------------------------------------------------------------------
@@ -1,5 +1,6 @@
-from typing import List, Iterator, TypeVar, Generic
+from typing import Union, Optional, List, Iterable, Iterator, Sequence, TypeVar, Generic, overload, cast
 from abc import ABC, abstractmethod
+from itertools import repeat
 
 
 # -----------------------------------------------------------------------------
@@ -30,20 +31,38 @@ class VectorBase(Generic[_E], ABC):
         self._set_count(count + 1)
         self._set_element(count, e)
 
+    def extend(self, es: 'Iterable[_E]') -> 'None':
+        for e in es:
+            self.append(e)
+
     def truncate(self, index: 'int') -> 'None':
         self._set_count(self.__normalize_index(index))
 
     def remove_by_pop(self, index: 'int') -> 'None':
         i = self.__normalize_index(index)
         count = self._get_count() - 1
-        self._set_count(count)
         if i < count:
             self._set_element(i, self._get_element(count))
+        self._set_count(count)
+
+    def slice(self, start: 'Optional[int]' = None, stop: 'Optional[int]' = None,
+              step: 'Optional[int]' = None) -> 'VectorSlice[_E]':
+        return VectorSlice(self, range(self._get_count())[start:stop:step])
 
     def __setitem__(self, index: 'int', e: '_E') -> 'None':
         self._set_element(self.__normalize_index(index), e)
 
+    @overload
     def __getitem__(self, index: 'int') -> '_E':
+        pass
+
+    @overload
+    def __getitem__(self, index: 'slice') -> 'VectorSlice[_E]':
+        pass
+
+    def __getitem__(self, index: 'Union[int, slice]') -> 'Union[_E, VectorSlice[_E]]':
+        if isinstance(index, slice):
+            return self.slice(index.start, index.stop, index.step)
         return self._get_element(self.__normalize_index(index))
 
     def __iter__(self) -> 'Iterator[_E]':
@@ -64,23 +83,70 @@ class VectorBase(Generic[_E], ABC):
         return index
 
 
+class VectorSlice(Generic[_E], Sequence[_E]):
+    def __init__(self, vector: 'VectorBase[_E]', indices: 'range') -> 'None':
+        self.__vector, self.__indices = vector, indices
+
+    def __setitem__(self, index: 'int', e: '_E') -> 'None':
+        self.__vector[self.__indices[index]] = e
+
+    @overload
+    def __getitem__(self, index: 'int') -> '_E':
+        pass
+
+    @overload
+    def __getitem__(self, index: 'slice') -> 'VectorSlice[_E]':
+        pass
+
+    def __getitem__(self, index: 'Union[int, slice]') -> 'Union[_E, VectorSlice[_E]]':
+        if isinstance(index, slice):
+            return VectorSlice(self.__vector, self.__indices[index])
+        return self.__vector[self.__indices[index]]
+
+    def __iter__(self) -> 'Iterator[_E]':
+        vector = self.__vector
+        return (vector[i] for i in self.__indices)
+
+    def __len__(self) -> 'int':
+        return len(self.__indices)
+
+
 # -----------------------------------------------------------------------------
 
 
 class Vector(Generic[_E], VectorBase[_E]):
+    __MIN_CAPACITY = 8
+
     def __init__(self) -> 'None':
         super().__init__()
         self.__count = 0
-        self.__elements: 'List[_E]' = []
+        self.__elements: 'List[Optional[_E]]' = []
+
+    @property
+    def capacity(self) -> 'int':
+        return len(self.__elements)
+
+    def extend(self, es: 'Iterable[_E]') -> 'None':
+        items = list(es)
+        count = self.__count
+        self.__elements[count: count + len(items)] = items
+        self.__count = count + len(items)
 
     def _get_count(self) -> 'int':
         return self.__count
 
     def _set_count(self, value: 'int') -> 'None':
-        self.__count = value
+        count, self.__count = self.__count, value
+        if value < count:
+            elements = self.__elements
+            elements[value: count] = repeat(None, count - value)
+            capacity = len(elements)
+            while value <= capacity // 4 and capacity > Vector.__MIN_CAPACITY:
+                capacity //= 2
+            del elements[capacity:]
 
     def _get_element(self, index: 'int') -> '_E':
-        return self.__elements[index]
+        return cast(_E, self.__elements[index])
 
     def _set_element(self, index: 'int', e: '_E') -> 'None':
         if index < len(self.__elements):
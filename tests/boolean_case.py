@@ -0,0 +1,56 @@
+from typing import Tuple, Dict
+from unittest import TestCase
+from functools import reduce
+from operator import and_, or_
+import random
+
+from smt.logic import Sort, Expr, VariableSymbol, NegatorSymbol, BooleanConstSymbol, BooleanConnectiveSymbol, \
+    boolean_and, boolean_or, boolean_eq
+
+
+# -----------------------------------------------------------------------------
+
+
+class BooleanTestCase(TestCase):
+    # Six Boolean variables and their complete truth tables: bit j of the
+    # pattern of the i-th variable is bit i of j.
+    def setUp(self) -> 'None':
+        self.vs = [VariableSymbol(Sort.BOOL).apply() for _ in range(6)]
+
+    def patterns(self) -> 'Dict[Expr, int]':
+        width = 1 << len(self.vs)
+        return {ν: sum(1 << j for j in range(width) if (j >> i) & 1) for i, ν in enumerate(self.vs)}
+
+    def truth_table(self, e: 'Expr') -> 'int':
+        # Evaluates all assignments at once, independently of the AIG under test.
+        patterns, mask = self.patterns(), (1 << (1 << len(self.vs))) - 1
+
+        def ev(expr: 'Expr', args: 'Tuple[int, ...]') -> 'int':
+            sym = expr.symbol
+            if isinstance(sym, VariableSymbol):
+                return patterns[expr]
+            if isinstance(sym, BooleanConstSymbol):
+                return mask if sym.value else 0
+            if isinstance(sym, NegatorSymbol):
+                return mask ^ args[0]
+            assert isinstance(sym, BooleanConnectiveSymbol)
+            return reduce(and_ if sym.neutral_elem else or_, args, mask if sym.neutral_elem else 0)
+
+        return e.bottom_up_eval(ev)
+
+    def equivalent(self, a: 'Expr', b: 'Expr') -> 'bool':
+        return self.truth_table(a) == self.truth_table(b)
+
+    def count_models(self, e: 'Expr') -> 'int':
+        return bin(self.truth_table(e)).count("1")
+
+    def random_expr(self, depth: 'int') -> 'Expr':
+        if depth == 0:
+            ν = random.choice(self.vs)
+            return ν.negated if random.random() < 0.5 else ν
+        args = [self.random_expr(depth - 1) for _ in range(random.randint(2, 3))]
+        e = random.choice((boolean_and, boolean_or, boolean_eq))(*args)
+        return e.negated if random.random() < 0.3 else e
+
+
+# -----------------------------------------------------------------------------
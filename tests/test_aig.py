@@ -0,0 +1,100 @@
+from typing import List
+import random
+
+from smt.logic import Sort, VariableSymbol, AIG, aig_minimize, Model, Status, \
+    boolean, boolean_and, boolean_or, integer, integer_eq
+from smt.logic.aig import FALSE, TRUE
+
+from boolean_case import BooleanTestCase
+
+
+# -----------------------------------------------------------------------------
+
+
+class TestAIG(BooleanTestCase):
+    def test_structural_hashing(self):
+        aig = AIG()
+        a, b, c = (aig.input(ν) for ν in self.vs[:3])
+        self.assertEqual(a, aig.input(self.vs[0]))
+        self.assertEqual(aig.conjoin(a, b), aig.conjoin(b, a))
+        self.assertEqual(a, aig.conjoin(a, a))
+        self.assertEqual(FALSE, aig.conjoin(a, a ^ 1))
+        self.assertEqual(a, aig.conjoin(TRUE, a))
+        self.assertEqual(FALSE, aig.conjoin(b, FALSE))
+        self.assertEqual(aig.disjoin(a, b), aig.conjoin(a ^ 1, b ^ 1) ^ 1)
+        self.assertEqual(2, aig.and_count)
+        abc = aig.conjoin_many((a, b, c))
+        self.assertEqual(abc, aig.conjoin_many((c, b, a)))
+        self.assertEqual(3, len(aig.inputs))
+
+    def test_expr_round_trip(self):
+        random.seed(47)
+        x = VariableSymbol(Sort.INT).apply()
+        atom = integer_eq(x, integer(3))
+        aig = AIG()
+        root = aig.add_expr(boolean_or(atom, self.vs[0].negated))
+        self.assertIn(atom, aig.inputs)
+        self.assertEqual(boolean_or(atom, self.vs[0].negated), aig.to_expr(root))
+        self.assertEqual(boolean(True), aig.to_expr(aig.add_expr(boolean(True))))
+
+        for _ in range(30):
+            e = self.random_expr(3)
+            aig = AIG()
+            root = aig.add_expr(e)
+            self.assertTrue(self.equivalent(e, aig.to_expr(root)))
+
+    def test_balance(self):
+        aig = AIG()
+        chain = TRUE
+        for ν in self.vs:
+            chain = aig.conjoin(chain, aig.input(ν))
+        self.assertEqual(5, aig.level(chain))
+        balanced, (root,) = aig.balance((chain,))
+        self.assertEqual(3, balanced.level(root))
+        self.assertEqual(5, balanced.and_count)
+        self.assertEqual(aig.simulate((chain,), self.patterns(), 64), balanced.simulate((root,), self.patterns(), 64))
+
+    def test_rewrite(self):
+        a, b, c = self.vs[:3]
+        e = boolean_or(boolean_and(a, b), boolean_and(a, c))
+        aig = AIG()
+        root = aig.add_expr(e)
+        self.assertEqual(3, aig.and_count)
+        rewritten, (new_root,) = aig.rewrite((root,))
+        self.assertEqual(2, rewritten.and_count)
+        self.assertTrue(self.equivalent(e, rewritten.to_expr(new_root)))
+
+        random.seed(4747)
+        for _ in range(30):
+            e = self.random_expr(3)
+            aig = AIG()
+            root = aig.add_expr(e)
+            rewritten, (new_root,) = aig.rewrite((root,))
+            self.assertLessEqual(rewritten.and_count, aig.and_count)
+            self.assertEqual(aig.simulate((root,), self.patterns(), 64),
+                             rewritten.simulate((new_root,), self.patterns(), 64))
+            self.assertTrue(self.equivalent(e, aig_minimize(e)))
+
+    def test_cnf(self):
+        random.seed(470)
+        for _ in range(4):
+            e = self.random_expr(3)
+            aig = AIG()
+            root = aig.add_expr(e)
+            statuses: 'List[Status]' = []
+            for formula in (e, aig.to_cnf((root,))):
+                model = Model(formula)
+                model.solve()
+                assert model.status is not None
+                statuses.append(model.status)
+            self.assertEqual(statuses[0], statuses[1])
+
+        a = self.vs[0]
+        aig = AIG()
+        model = Model(aig.to_cnf((aig.add_expr(boolean_and(boolean_or(a, self.vs[1]), a.negated)),
+                                  aig.add_expr(self.vs[1].negated))))
+        model.solve()
+        self.assertIs(Status.UNSAT, model.status)
+
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,119 @@
+import random
+
+from smt.logic import Sort, VariableSymbol, BDD, BddModel, ComponentModel, Status, \
+    boolean, boolean_and, boolean_or
+from smt.logic.bdd import FALSE, TRUE
+
+from boolean_case import BooleanTestCase
+
+
+# -----------------------------------------------------------------------------
+
+
+class TestBDD(BooleanTestCase):
+    def test_operations(self):
+        bdd = BDD()
+        a, b, c = (bdd.variable(ν) for ν in self.vs[:3])
+        self.assertEqual(a, bdd.variable(self.vs[0]))
+        self.assertEqual(bdd.conjoin(a, b), bdd.conjoin(b, a))
+        self.assertEqual(a, bdd.negate(bdd.negate(a)))
+        self.assertEqual(FALSE, bdd.conjoin(a, bdd.negate(a)))
+        self.assertEqual(TRUE, bdd.disjoin(a, bdd.negate(a)))
+        self.assertEqual(bdd.ite(a, b, c), bdd.disjoin(bdd.conjoin(a, b), bdd.conjoin(bdd.negate(a), c)))
+        xor = bdd.apply(lambda p, q: p != q, a, b)
+        self.assertEqual(xor, bdd.ite(a, bdd.negate(b), b))
+        self.assertEqual(b, bdd.exists((self.vs[0],), bdd.conjoin(a, b)))
+        self.assertEqual(TRUE, bdd.exists((self.vs[0],), xor))
+        self.assertEqual(6, bdd.count(bdd.disjoin(a, b)))
+        self.assertEqual(8, bdd.count(TRUE))
+        self.assertEqual(0, bdd.count(FALSE))
+        self.assertEqual(self.vs[0], bdd.top(xor))
+        self.assertEqual({self.vs[0]: False, self.vs[1]: True}, bdd.satisfy(xor))
+        self.assertIsNone(bdd.satisfy(FALSE))
+
+    def test_add_expr(self):
+        random.seed(48)
+        for _ in range(30):
+            e = self.random_expr(3)
+            bdd = BDD()
+            for ν in self.vs:
+                bdd.variable(ν)
+            f = bdd.add_expr(e)
+            self.assertEqual(self.count_models(e), bdd.count(f))
+            self.assertEqual(bdd.negate(f), bdd.add_expr(e.negated))
+
+    def test_reorder(self):
+        xs, ys = self.vs[:3], self.vs[3:]
+        e = boolean_or(*(boolean_and(ξ, υ) for ξ, υ in zip(xs, ys)))
+        bdd = BDD()
+        for ν in self.vs:
+            bdd.variable(ν)
+        f = bdd.add_expr(e)
+        count = bdd.count(f)
+        self.assertEqual(14, bdd.size(f))
+        (f,) = bdd.reorder((f,))
+        self.assertEqual(6, bdd.size(f))
+        self.assertEqual(count, bdd.count(f))
+        self.assertEqual(f, bdd.add_expr(e))
+        self.assertEqual(self.vs, sorted(bdd.order))
+
+        # With all xs above all ys the diagram is exponential in the number of
+        # pairs, and linear once every pair is adjacent.
+        xs = [VariableSymbol(Sort.BOOL).apply() for _ in range(8)]
+        ys = [VariableSymbol(Sort.BOOL).apply() for _ in range(8)]
+        bdd = BDD()
+        for ν in (*xs, *ys):
+            bdd.variable(ν)
+        pairs = boolean_or(*(boolean_and(ξ, υ) for ξ, υ in zip(xs, ys)))
+        g = bdd.add_expr(pairs)
+        count = bdd.count(g)
+        self.assertEqual(510, bdd.size(g))
+        (g,) = bdd.reorder((g,))
+        self.assertEqual(16, bdd.size(g))
+        self.assertEqual(18, bdd.node_count)
+        self.assertEqual(count, bdd.count(g))
+        self.assertEqual(g, bdd.add_expr(pairs))
+
+        # Nodes that die while a variable is sifted must not be swapped along.
+        random.seed(4848)
+        zs = [VariableSymbol(Sort.BOOL).apply() for _ in range(30)]
+        literals = [*zs, *(ζ.negated for ζ in zs)]
+        cnf = boolean_and(*(boolean_or(*random.sample(literals, 3)) for _ in range(16)))
+        bdd = BDD()
+        for ζ in zs:
+            bdd.variable(ζ)
+        h = bdd.add_expr(cnf)
+        count, size = bdd.count(h), bdd.size(h)
+        (h,) = bdd.reorder((h,))
+        self.assertLess(bdd.size(h), size)
+        self.assertEqual(bdd.size(h) + 2, bdd.node_count)
+        self.assertEqual(count, bdd.count(h))
+        self.assertEqual(h, bdd.add_expr(cnf))
+        xs, ys = self.vs[:3], self.vs[3:]
+
+        # The smaller conjunct is added first and puts all of xs above ys.
+        e = boolean_and(boolean_or(*xs), e)
+        model = BddModel(e)
+        self.assertEqual(14, model.bdd.size(model.root))
+        count = model.count()
+        model = BddModel(e, reorder_limit=8)
+        self.assertEqual(6, model.bdd.size(model.root))
+        self.assertEqual(count, model.count())
+
+    def test_model(self):
+        random.seed(480)
+        for _ in range(20):
+            e = self.random_expr(3)
+            model = BddModel(e, reorder_limit=random.choice((0, 1 << 12)))
+            model.solve()
+            self.assertEqual(Status.SAT if self.count_models(e) > 0 else Status.UNSAT, model.status)
+            if model.status is Status.SAT:
+                table = {ν: model.eval(ν) for ν in self.vs if model.eval(ν) is not None}
+                self.assertEqual(boolean(True), e.substitute(table))
+
+            dpll = ComponentModel((e,), bdd_limit=0)
+            dpll.solve()
+            self.assertEqual(model.status, dpll.status)
+
+
+# -----------------------------------------------------------------------------
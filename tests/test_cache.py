@@ -0,0 +1,51 @@
+from unittest import TestCase
+
+from smt.util import BoundedCache
+
+
+# -----------------------------------------------------------------------------
+
+
+class TestBoundedCache(TestCase):
+    def test_eviction(self):
+        c: 'BoundedCache[str, str]' = BoundedCache(6, len)
+        c.put("a", "xx")
+        c.put("b", "yy")
+        c.put("c", "zz")
+        self.assertEqual(6, c.weight)
+        self.assertEqual("xx", c.get("a"))
+        c.put("d", "u")
+        self.assertNotIn("b", c)
+        self.assertEqual(["a", "c", "d"], sorted(k for k in "abcd" if k in c))
+        self.assertEqual(5, c.weight)
+
+        c.put("e", "long value")
+        self.assertEqual(0, len(c))
+        self.assertEqual(0, c.weight)
+
+    def test_capacity(self):
+        c: 'BoundedCache[int, int]' = BoundedCache(10)
+        for i in range(20):
+            c.put(i, i)
+        self.assertEqual(10, len(c))
+        c.capacity = 3
+        self.assertEqual(3, len(c))
+        self.assertEqual([17, 18, 19], [i for i in range(20) if i in c])
+        c.discard(18)
+        c.clear()
+        self.assertEqual(0, len(c))
+
+    def test_evict_callback(self):
+        evicted = []
+        c: 'BoundedCache[str, int]' = BoundedCache(2, evict=lambda k, v: evicted.append((k, v)))
+        c.put("a", 1)
+        c.put("b", 2)
+        c.get("a")
+        c.put("c", 3)
+        self.assertEqual([("b", 2)], evicted)
+        c.discard("a")
+        c.capacity = 0
+        self.assertEqual([("b", 2), ("c", 3)], evicted)
+
+
+# -----------------------------------------------------------------------------
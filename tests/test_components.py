@@ -0,0 +1,78 @@
+from typing import List
+from unittest import TestCase
+
+from smt.util import BoundedCache
+from smt.logic import Sort, Expr, VariableSymbol, boolean, boolean_or, boolean_implies, \
+    integer, integer_eq, partition, ComponentResult, ComponentModel, Status
+
+
+# -----------------------------------------------------------------------------
+
+
+class TestComponents(TestCase):
+    def setUp(self) -> 'None':
+        self.vs = [VariableSymbol(Sort.BOOL).apply() for _ in range(9)]
+
+    def groups(self) -> 'List[Expr]':
+        vs = self.vs
+        return [
+            boolean_or(vs[0], vs[1]), boolean_implies(vs[1], vs[2]),
+            boolean_or(vs[3], vs[4].negated), boolean_or(vs[4], vs[5]),
+            boolean_or(vs[6], vs[7]), boolean_or(vs[6].negated, vs[7].negated)
+        ]
+
+    def test_partition(self):
+        vs = self.vs
+        components = partition(self.groups())
+        self.assertEqual(3, len(components))
+        self.assertEqual({frozenset(vs[:3]), frozenset(vs[3:6]), frozenset(vs[6:8])},
+                         {frozenset().union(*(ε.variables for ε in γ)) for γ in components})
+        self.assertEqual([], partition([]))
+        self.assertEqual([], partition([boolean(True)]))
+        self.assertEqual(1, len(partition([*self.groups(), boolean_or(vs[0], vs[3], vs[6])])))
+
+        x = VariableSymbol(Sort.INT).apply()
+        self.assertEqual(1, len(partition([boolean_or(vs[0], integer_eq(x, integer(1))),
+                                           boolean_or(vs[8], integer_eq(x, integer(2)))])))
+
+    def test_component_model(self):
+        vs = self.vs
+        for workers in (0, 2):
+            model = ComponentModel(self.groups(), workers)
+            self.assertEqual(3, len(model.components))
+            model.solve()
+            self.assertIs(Status.SAT, model.status)
+            values = {ν: model.eval(ν) == boolean(True) for ν in vs[:8]}
+            self.assertTrue(values[vs[0]] or values[vs[1]])
+            self.assertTrue(not values[vs[1]] or values[vs[2]])
+            self.assertTrue((values[vs[3]] or not values[vs[4]]) and (values[vs[4]] or values[vs[5]]))
+            self.assertTrue(values[vs[6]] != values[vs[7]])
+            self.assertIsNone(model.eval(vs[8]))
+
+            model = ComponentModel([*self.groups(), vs[8], vs[8].negated], workers)
+            model.solve()
+            self.assertIs(Status.UNSAT, model.status)
+
+    def test_component_cache(self):
+        vs = self.vs
+        cache: 'BoundedCache[Expr, ComponentResult]' = BoundedCache(16)
+        model = ComponentModel(self.groups(), cache=cache)
+        model.solve()
+        self.assertEqual(3, len(cache))
+
+        extended = [*self.groups(), vs[8]]
+        model = ComponentModel(extended, cache=cache)
+        model.solve()
+        self.assertIs(Status.SAT, model.status)
+        self.assertEqual(4, len(cache))
+        self.assertEqual(boolean(True), model.eval(vs[8]))
+        self.assertIsNotNone(model.eval(vs[5]))
+
+        unsat = boolean_or(vs[0].negated, vs[1].negated)
+        cache.put(unsat, (Status.UNSAT, {}))
+        model = ComponentModel([unsat, vs[8]], cache=cache)
+        model.solve()
+        self.assertIs(Status.UNSAT, model.status)
+
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,161 @@
+from typing import Tuple, List, Mapping, Dict
+from unittest import TestCase, skipIf
+from itertools import product
+
+try:
+    import numpy
+    from smt.logic.expr_store import ExprStore, Cnf, evaluate_batch
+except ImportError:
+    numpy = None
+
+from smt.logic import Sort, Expr, VariableSymbol, NegatorSymbol, MacroSymbol, \
+    BooleanConstSymbol, BooleanConnectiveSymbol, \
+    boolean, boolean_and, boolean_or, boolean_implies, boolean_eq, integer, integer_eq, integer_sum
+from smt.logic.builtin_symbols import BooleanXorSymbol, BooleanImplicationSymbol, BooleanEqSymbol, IntegerDiffSymbol
+
+
+# -----------------------------------------------------------------------------
+
+
+@skipIf(numpy is None, "numpy is not installed")
+class TestExprStore(TestCase):
+    def setUp(self) -> 'None':
+        self.a, self.b, self.c = (VariableSymbol(Sort.BOOL).apply() for _ in range(3))
+        self.x = VariableSymbol(Sort.INT).apply()
+
+    def test_import_export(self):
+        a, b, c, x = self.a, self.b, self.c, self.x
+        shared = boolean_or(a, b.negated)
+        e1 = boolean_and(shared, boolean_or(c, integer_eq(x, integer(3))))
+        e2 = boolean_or(shared.negated, c)
+
+        store = ExprStore()
+        i1, i2 = store.add_expr(e1), store.add_expr(e2)
+        self.assertEqual(i1, store.add_expr(e1))
+        self.assertEqual(len(store), len(set(e1.topological_order()) | set(e2.topological_order())))
+        self.assertIs(e1, store.to_expr(i1))
+        self.assertIs(e2, store.to_expr(i2))
+        self.assertEqual(e2.dag_size, len(store.postorder(i2)))
+
+        n = store.add(integer(1).symbol, ())
+        s = store.add(integer_sum(self.x, integer(1)).symbol, (store.add_expr(x), n))
+        self.assertIs(integer_sum(x, integer(1)), store.to_expr(s))
+
+    def test_cnf(self):
+        a, b, c = self.a, self.b, self.c
+        p = integer_eq(self.x, integer(3))
+        atoms = (a, b, c, p)
+        for e in (boolean_and(boolean_or(a, b), c),
+                  boolean_or(boolean_and(a, b), boolean_and(c, p)),
+                  boolean_eq(a, boolean_or(b, boolean_and(c.negated, p))),
+                  boolean_and(boolean_or(a, boolean_and(b, c)), boolean_or(a.negated, p)),
+                  a, a.negated, boolean(True), boolean(False)):
+            with self.subTest(e=e):
+                store = ExprStore()
+                cnf = store.to_cnf(store.add_expr(e))
+                for values in product((False, True), repeat=len(atoms)):
+                    model = dict(zip(atoms, values))
+                    self.assertEqual(self.evaluate(e, model), self.satisfiable(store, cnf, model))
+
+    def test_cnf_keeps_top_level_clauses(self):
+        a, b, c = self.a, self.b, self.c
+        store = ExprStore()
+        cnf = store.to_cnf(store.add_expr(boolean_and(boolean_or(a, b.negated), c)))
+        self.assertEqual(2, len(cnf))
+        self.assertEqual(3, len(cnf.variables) - 1)
+        self.assertEqual([1, 2], sorted(len(κ) for κ in cnf))
+        self.assertTrue(all(ν >= 0 for ν in cnf.variables[1:].tolist()))
+
+    def test_cnf_gates(self):
+        a, b, c = self.a, self.b, self.c
+        store = ExprStore()
+        ia, ib, ic = (store.add_expr(ν) for ν in (a, b, c))
+        xor = store.add(BooleanXorSymbol(), (ia, ib, ic))
+        eq = store.add(BooleanEqSymbol(), (ia, store.add_expr(b.negated), ic))
+        implies = store.add(BooleanImplicationSymbol(), (xor, store.add(BooleanXorSymbol(), (ib,))))
+        roots = (xor, eq, implies, store.add(BooleanConnectiveSymbol(False), (eq, implies, store.add(BooleanXorSymbol(), ()))))
+        rows = numpy.array(list(product((False, True), repeat=3)))
+        for root in roots:
+            with self.subTest(root=root):
+                cnf = store.to_cnf(root)
+                expected = store.evaluate(root, (ia, ib, ic), rows).tolist()
+                self.assertEqual(expected, [self.satisfiable(store, cnf, dict(zip((a, b, c), values)))
+                                            for values in rows.tolist()])
+
+        with self.assertRaises(ValueError):
+            store.to_cnf(store.add(BooleanConnectiveSymbol(True), (ia, store.add_expr(self.x))))
+
+    def test_evaluate_batch(self):
+        a, b, x = self.a, self.b, self.x
+        y = VariableSymbol(Sort.INT).apply()
+        e = boolean_or(boolean_and(a, b.negated),
+                       integer_eq(integer_sum(x, y.negated, integer(2)), integer(5)),
+                       boolean_implies(b, integer_eq(x, y)))
+        rows = [(p, q, i, j) for p, q in product((False, True), repeat=2) for i in range(-3, 4) for j in range(-3, 4)]
+        values = numpy.array(rows, dtype=numpy.int64)
+        expected = [(p and not q) or (i - j + 2 == 5) or (not q or i == j) for p, q, i, j in rows]
+        self.assertEqual(expected, evaluate_batch(e, (a, b, x, y), values).tolist())
+
+        store = ExprStore()
+        ia, ib, ix, iy = (store.add_expr(ν) for ν in (a, b, x, y))
+        diff = store.add(IntegerDiffSymbol(), (ix, iy))
+        xor = store.add(BooleanXorSymbol(), (ia, ib))
+        implies = store.add(BooleanImplicationSymbol(), (xor, store.add_expr(integer_eq(x, integer(1)))))
+        root = store.add(BooleanConnectiveSymbol(True), (implies, store.add(integer_eq(x, y).symbol, (diff, iy))))
+        expected = [((p != q) <= (i == 1)) and (i - j == j) for p, q, i, j in rows]
+        self.assertEqual(expected, store.evaluate(root, (ia, ib, ix, iy), values).tolist())
+        with self.assertRaises(KeyError):
+            store.evaluate(root, (ia, ib, ix), values[:, :3])
+
+    def test_lazy_macros(self):
+        a, b = self.a, self.b
+        p, q = VariableSymbol(Sort.BOOL), VariableSymbol(Sort.BOOL)
+        m = MacroSymbol(Sort.BOOL, (p, q), boolean_and(p.apply(), q.apply()), lazy=True)
+        e = boolean_and(m.apply(a, b), a.negated)
+        self.assertIn(m.apply(a, b), e.args)
+
+        store = ExprStore()
+        cnf = store.to_cnf(store.add_expr(e))
+        for values in product((False, True), repeat=2):
+            self.assertFalse(self.satisfiable(store, cnf, dict(zip((a, b), values))))
+        rows = numpy.array(list(product((False, True), repeat=2)))
+        self.assertEqual([False] * 4, evaluate_batch(e, (a, b), rows).tolist())
+        self.assertEqual([False, False, False, True], evaluate_batch(m.apply(a, b), (a, b), rows).tolist())
+
+    @staticmethod
+    def evaluate(e: 'Expr', model: 'Mapping[Expr, bool]') -> 'bool':
+        def ev(expr: 'Expr', args: 'Tuple[bool, ...]') -> 'bool':
+            sym = expr.symbol
+            if expr in model:
+                return model[expr]
+            if sym.sort != Sort.BOOL:
+                return False
+            if isinstance(sym, BooleanConstSymbol):
+                return sym.value
+            if isinstance(sym, NegatorSymbol):
+                return not args[0]
+            assert isinstance(sym, BooleanConnectiveSymbol)
+            return all(args) if sym.neutral_elem else any(args)
+
+        return e.bottom_up_eval(ev)
+
+    @staticmethod
+    def satisfiable(store: 'ExprStore', cnf: 'Cnf', model: 'Mapping[Expr, bool]') -> 'bool':
+        variables = cnf.variables.tolist()
+        fixed: 'Dict[int, bool]' = {}
+        free: 'List[int]' = []
+        for v in range(1, len(variables)):
+            node = variables[v]
+            if node >= 0:
+                fixed[v] = model[store.to_expr(node)]
+            else:
+                free.append(v)
+        for values in product((False, True), repeat=len(free)):
+            assignment = dict(fixed)
+            assignment.update(zip(free, values))
+            if all(any(assignment[abs(λ)] == (λ > 0) for λ in κ.tolist()) for κ in cnf):
+                return True
+        return False
+
+
+# -----------------------------------------------------------------------------
@@ -0,0 +1,83 @@
+from typing import Optional
+from unittest import TestCase
+
+from smt.logic import Sort, Expr, VariableSymbol, FunctionSymbol, IntegerConstSymbol, \
+    DiscriminationTree, Rule, RewriteSystem, \
+    boolean, boolean_or, integer, integer_sum, integer_eq
+from smt.logic.rewriting import Bindings
+
+
+# -----------------------------------------------------------------------------
+
+
+class TestRewriting(TestCase):
+    def setUp(self) -> 'None':
+        self.f = FunctionSymbol(Sort.INT, (Sort.INT,))
+        self.g = FunctionSymbol(Sort.INT, (Sort.INT, Sort.INT))
+        self.x, self.y = VariableSymbol(Sort.INT).apply(), VariableSymbol(Sort.INT).apply()
+        self.a, self.b = VariableSymbol(Sort.INT).apply(), VariableSymbol(Sort.INT).apply()
+
+    def test_discrimination_tree(self):
+        f, g, x, y, a, b = self.f, self.g, self.x, self.y, self.a, self.b
+        tree: 'DiscriminationTree[str]' = DiscriminationTree()
+        variables = frozenset((x, y))
+        tree.insert(f.apply(x), variables, "f(x)")
+        tree.insert(f.apply(g.apply(x, y)), variables, "f(g(x, y))")
+        tree.insert(g.apply(x, x), variables, "g(x, x)")
+        tree.insert(g.apply(a, y), variables, "g(a, y)")
+        tree.insert(integer_sum(x, integer(1)), variables, "x + 1")
+        self.assertEqual(5, len(tree))
+
+        self.assertEqual({"f(x)", "f(g(x, y))"}, set(tree.retrieve(f.apply(g.apply(a, b)))))
+        self.assertEqual({"f(x)"}, set(tree.retrieve(f.apply(a))))
+        self.assertEqual({"g(x, x)", "g(a, y)"}, set(tree.retrieve(g.apply(a, b))))
+        self.assertEqual({"g(x, x)"}, set(tree.retrieve(g.apply(b, a))))
+        self.assertEqual({"x + 1"}, set(tree.retrieve(integer_sum(a, b))))
+        self.assertEqual([], tree.retrieve(a))
+
+    def test_match(self):
+        f, g, x, y, a, b = self.f, self.g, self.x, self.y, self.a, self.b
+        rule = Rule(g.apply(x, x), x, (x,))
+        self.assertEqual({x: f.apply(a)}, rule.match(g.apply(f.apply(a), f.apply(a))))
+        self.assertIsNone(rule.match(g.apply(a, b)))
+
+        rule = Rule(integer_sum(x, f.apply(y)), g.apply(x, y), (x, y))
+        self.assertEqual(g.apply(a, b), rule.apply(integer_sum(f.apply(b), a)))
+        self.assertIsNone(rule.apply(integer_sum(a, b)))
+
+        # Associative-commutative arguments are matched as a multiset instead
+        # of trying every permutation of the subject.
+        zs = [VariableSymbol(Sort.INT).apply() for _ in range(10)]
+        rule = Rule(integer_sum(x, f.apply(y), *zs), g.apply(x, y), (x, y))
+        self.assertEqual(g.apply(a, b), rule.apply(integer_sum(*reversed(zs), a, f.apply(b))))
+        self.assertIsNone(rule.apply(integer_sum(*zs[1:], a, b, f.apply(b))))
+        rule = Rule(integer_sum(x, x, f.apply(y), f.apply(y)), y, (x, y))
+        self.assertEqual(b, rule.apply(integer_sum(f.apply(b), a, f.apply(b), a)))
+        self.assertIsNone(rule.apply(integer_sum(f.apply(b), a, f.apply(a), a)))
+
+    def test_rewrite(self):
+        f, g, x, y, a, b = self.f, self.g, self.x, self.y, self.a, self.b
+
+        def fold_even(bindings: 'Bindings') -> 'Optional[Expr]':
+            sym = bindings[y].symbol
+            if isinstance(sym, IntegerConstSymbol) and sym.value % 2 == 0:
+                return integer(sym.value // 2)
+            return None
+
+        system = RewriteSystem([
+            Rule(f.apply(f.apply(x)), x, (x,)),
+            Rule(g.apply(x, x), f.apply(x), (x,)),
+        ])
+        system.add(Rule(f.apply(y), fold_even, (y,)))
+        self.assertEqual(3, len(system))
+
+        e = boolean_or(integer_eq(g.apply(f.apply(a), f.apply(a)), b),
+                       integer_eq(f.apply(integer(4)), f.apply(integer(3))))
+        self.assertEqual(boolean_or(integer_eq(a, b), integer_eq(integer(2), f.apply(integer(3)))),
+                         system.rewrite(e))
+        self.assertIs(system.rewrite(e), system.rewrite(e))
+        self.assertEqual(integer(1), system.rewrite(f.apply(f.apply(f.apply(f.apply(integer(4)))))))
+        self.assertIs(boolean(True), system.rewrite(integer_eq(g.apply(a, a), f.apply(a))))
+
+
+# -----------------------------------------------------------------------------
@@ -133,13 +133,15 @@ class TestScanner(TestCase):
 
 class TestInterpreter(TestCase):
     def check(self, src: 'str', expected: 'str'):
-        ms = MessageSet()
-        interpreter = Smtlib(ms)
-        pos = Position.beginning_of("test.smt", src)
-        interpreter.execute(pos)
-        self.assertEqual(0, len(ms))
-        a = interpreter.symbols.serialize_expr(to_cnf(interpreter.assertion))
-        self.assertEqual(dedent(expected.replace("\t", "    ")), a.replace("\t", "    "))
+        for lazy_macros in (False, True):
+            with self.subTest(lazy_macros=lazy_macros):
+                ms = MessageSet()
+                interpreter = Smtlib(ms, lazy_macros)
+                pos = Position.beginning_of("test.smt", src)
+                interpreter.execute(pos)
+                self.assertEqual(0, len(ms))
+                a = interpreter.symbols.serialize_expr(to_cnf(interpreter.assertion))
+                self.assertEqual(dedent(expected.replace("\t", "    ")), a.replace("\t", "    "))
 
     def test_1(self):
         src = """
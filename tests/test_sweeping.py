@@ -0,0 +1,54 @@
+from unittest import skipIf
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from smt.logic import boolean, boolean_and, boolean_or, boolean_eq
+
+from boolean_case import BooleanTestCase
+
+
+# -----------------------------------------------------------------------------
+
+
+@skipIf(numpy is None, "numpy is not installed")
+class TestSweeping(BooleanTestCase):
+    def test_simulate(self):
+        from smt.logic.sweeping import simulate
+        a, b, c = self.vs[:3]
+        e = boolean_or(boolean_and(a, b), boolean_and(a.negated, c))
+        values = simulate(e, words=2, seed=1)
+        self.assertEqual((2,), values[a].shape)
+        self.assertTrue(numpy.array_equal(numpy.invert(values[a]), values[a.negated]))
+        self.assertTrue(numpy.array_equal(values[a] & values[b], values[boolean_and(a, b)]))
+        self.assertTrue(numpy.array_equal(values[boolean_and(a, b)] | (values[a.negated] & values[c]), values[e]))
+
+    def test_sweep(self):
+        from smt.logic.sweeping import sweep
+        a, b, c, d, e = self.vs[:5]
+        p = boolean_or(boolean_and(a, b), boolean_and(a, c))
+        q = boolean_and(a, boolean_or(b, c))
+        self.assertIsNot(p, q)
+        self.assertEqual(boolean(True), sweep(boolean_eq(p, q)))
+
+        f = boolean_or(boolean_and(p, d), q, e)
+        g = sweep(f)
+        self.assertLess(g.dag_size, f.dag_size)
+        self.assertTrue(self.equivalent(f, g))
+        self.assertEqual(boolean(False), sweep(boolean_and(boolean_or(a, b), a.negated, b.negated, c)))
+
+        random.seed(49)
+        literals = [*self.vs, *(ν.negated for ν in self.vs)]
+        for _ in range(20):
+            clauses = [boolean_or(*random.sample(literals, 3)) for _ in range(6)]
+            f = boolean_and(*(boolean_or(boolean_and(*random.sample(clauses, 2)), random.choice(literals))
+                              for _ in range(6)))
+            g = sweep(f, support_limit=4)
+            self.assertTrue(self.equivalent(f, g))
+            self.assertLessEqual(g.dag_size, f.dag_size)
+
+
+# -----------------------------------------------------------------------------
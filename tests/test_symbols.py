@@ -1,13 +1,25 @@
-from typing import Optional, Tuple, Mapping, cast
+from typing import Optional, Tuple, List, Dict, Mapping, cast
 from unittest import TestCase
+from threading import Thread, Event
+import gc
+import os
+import pickle
+import random
+import subprocess
+import sys
+import weakref
 
 
+from smt.util import Unique
 from smt.logic.symbols_base import Sort, \
     NullaryValencyMixin, UnaryValencyMixin, BinaryValencyMixin, MultiaryValencyMixin, \
-    BooleanArgsMixin, IntegerArgsMixin, IntegerMixin, Expr, \
-    ValencySymbol, WrapperSymbol, NegatorSymbol, AssociativeCommutativeSymbol, VariableSymbol
+    BooleanArgsMixin, IntegerArgsMixin, IntegerMixin, Expr, Substitution, \
+    ValencySymbol, WrapperSymbol, NegatorSymbol, AssociativeCommutativeSymbol, VariableSymbol, \
+    MacroSymbol, expand_macros, RetentionPolicy, WeakRetentionPolicy, Fingerprinter, IncrementalEval, Traversal
 from smt.logic.builtin_symbols import IntegerConstSymbol, integer, integer_sum, \
-    boolean, boolean_and, boolean_or, boolean_implies, boolean_eq, integer_eq
+    boolean, boolean_and, boolean_or, boolean_implies, boolean_eq, integer_eq, \
+    BooleanEqSymbol, BooleanImplicationSymbol, BooleanConnectiveSymbol, IntegerSumSymbol, IntegerEqSymbol, \
+    ExprBuilder
 
 
 # -----------------------------------------------------------------------------
@@ -120,6 +132,41 @@ class TestExpr(TestCase):
         self.assertEqual(e, e.negated.args[0])
         self.assertEqual(e, e.negated.negated)
 
+    def test_ordering(self):
+        x = VariableSymbol(Sort.INT).apply()
+        y = VariableSymbol(Sort.INT).apply()
+        c = integer(1000001)
+        b = TestExpr.B()
+        e = b.apply(x, y)
+        self.assertLess(x, y)
+        self.assertLess(c, x)
+        self.assertLess(x.negated, c)
+        self.assertLess(y, e)
+        self.assertEqual([x.negated, c, x, y, e], sorted([e, y, x, c, x.negated]))
+
+        v, u = VariableSymbol(Sort.BOOL, "v").apply(), VariableSymbol(Sort.BOOL, "u").apply()
+        self.assertLess(u, v)
+        self.assertLess(u.negated, v.negated)
+        self.assertLess(integer(-2), integer(-1))
+        self.assertEqual((u, v), boolean_or(v, u).args)
+
+        # The order does not depend on what the process has built before.
+        script = ("import sys\n"
+                  "from smt.logic import *\n"
+                  "vs = {ν: VariableSymbol(Sort.BOOL, ν).apply() for ν in sys.argv[2:]}\n"
+                  "a, b, c = vs['a'], vs['b'], vs['c']\n"
+                  "keep = [boolean_or(c, a.negated), boolean_and(b, c)] * int(sys.argv[1])\n"
+                  "e = boolean_and(boolean_or(a, b.negated, c), boolean_or(c, a.negated), boolean_or(b, c))\n"
+                  "print([ν.symbol.name for ε in e.args for ν in ε.args for ν in (ν.args or (ν,))])\n")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        outputs = set()
+        for seed, count, names in (("1", "0", "abc"), ("2", "1", "cba")):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            out = subprocess.run([sys.executable, "-c", script, count, *names],
+                                 cwd=root, env=env, check=True, stdout=subprocess.PIPE)
+            outputs.add(out.stdout)
+        self.assertEqual(1, len(outputs))
+
     def test_bottom_up(self):
         x, y, z = TestExpr.A(1), TestExpr.A(2), TestExpr.A(3)
         b = TestExpr.B()
@@ -141,6 +188,27 @@ class TestExpr(TestCase):
         self.assertEqual(9, s)
         self.assertEqual(3, count[0])
 
+    def test_topological_order(self):
+        x, y = TestExpr.A(1).apply(), TestExpr.A(2).apply()
+        b = TestExpr.B()
+        f = b.apply(x, y)
+        e = b.apply(f, b.apply(y, f))
+        order = e.topological_order()
+        self.assertEqual((x, y, f, b.apply(y, f), e), order)
+        self.assertIs(order, e.topological_order())
+
+        visited: 'List[Expr]' = []
+        e.bottom_up(visited.append)
+        self.assertEqual(list(order), visited)
+
+        # A cached order does not keep its root alive past a collection.
+        g = b.apply(e, x)
+        self.assertEqual(order + (g,), g.topological_order())
+        ref = weakref.ref(g)
+        del g
+        gc.collect()
+        self.assertIsNone(ref())
+
     def test_substitute(self):
         u, v, x, y, z = TestExpr.A(10), TestExpr.A(20), TestExpr.A(1), TestExpr.A(2), TestExpr.A(3)
         b = TestExpr.B()
@@ -173,6 +241,129 @@ class TestExpr(TestCase):
         self.assertEqual(e2, e3)
 
 
+    def test_substitute_many(self):
+        u, v, x, y = TestExpr.A(10).apply(), TestExpr.A(20).apply(), TestExpr.A(1).apply(), TestExpr.A(2).apply()
+        b = TestExpr.B()
+        f = b.apply(x, y)
+        e1, e2 = b.apply(f, u), b.apply(v, b.apply(f, f))
+        table: 'Mapping[Expr, Expr]' = {x: u, y: v}
+        g = b.apply(u, v)
+        self.assertEqual((b.apply(g, u), b.apply(v, b.apply(g, g))), Expr.substitute_many((e1, e2), table))
+
+        substitution = Substitution(table)
+        self.assertIs(substitution(e2), e2.substitute(table))
+        self.assertIs(g, substitution(f))
+        self.assertIs(substitution(e1), substitution(e1))
+
+    def test_substitute_affected(self):
+        xs = [VariableSymbol(Sort.INT).apply() for _ in range(64)]
+        b = TestExpr.B()
+        level = xs
+        while len(level) > 1:
+            level = [b.apply(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+        e = level[0]
+        ground = b.apply(TestExpr.A(1).apply(), TestExpr.A(2).apply())
+        self.assertEqual(0, ground.variable_signature)
+        for ξ in xs:
+            self.assertEqual(ξ.variable_signature, e.variable_signature & ξ.variable_signature)
+
+        visited: 'List[Expr]' = []
+
+        def transform(expr: 'Expr', args: 'Tuple[Expr, ...]') -> 'Expr':
+            visited.append(expr)
+            return expr if args == expr.args else expr.symbol.apply(*args)
+
+        self.assertIs(e, e.bottom_up_transform(transform))
+        self.assertEqual(e.dag_size, len(visited))
+        visited.clear()
+        self.assertIs(ground, ground.bottom_up_transform(transform, [xs[0]]))
+        self.assertEqual(0, len(visited))
+        self.assertIs(e, e.bottom_up_transform(transform, [xs[0]]))
+        self.assertLess(len(visited), e.dag_size)
+
+        table: 'Mapping[Expr, Expr]' = {xs[5]: TestExpr.A(5).apply()}
+        expected = e.bottom_up_eval(lambda expr, args: table.get(expr, expr) if len(args) == 0
+                                    else b.apply(*args))
+        self.assertIs(expected, e.substitute(table))
+
+    def test_incremental_eval(self):
+        b = TestExpr.B()
+        xs = [TestExpr.A(i).apply() for i in range(8)]
+        sums = [b.apply(xs[i], xs[i + 1]) for i in range(0, 8, 2)]
+        root = b.apply(b.apply(sums[0], sums[1]), b.apply(sums[2], sums[3]))
+        model: 'Dict[Expr, int]' = {}
+
+        def ev(expr: 'Expr', args: 'Tuple[int, ...]') -> 'int':
+            if len(args) == 0:
+                return model.get(expr, cast(TestExpr.A, expr.symbol).value)
+            return sum(args)
+
+        incremental = IncrementalEval(root, ev)
+        self.assertEqual(28, incremental.value)
+        self.assertEqual(15, incremental.evaluations)
+        self.assertEqual(13, incremental[sums[3]])
+
+        model[xs[0]] = 22
+        incremental.invalidate(xs[0])
+        self.assertEqual(15, incremental.evaluations)
+        self.assertEqual(50, incremental.value)
+        self.assertEqual(19, incremental.evaluations)
+
+        incremental.pin(xs[6], 8)
+        incremental.pin(xs[7], 5)
+        self.assertEqual(13, incremental[sums[3]])
+        self.assertEqual(50, incremental.value)
+        self.assertEqual(20, incremental.evaluations)
+
+        incremental.pin(xs[1], 0)
+        self.assertEqual(49, incremental.value)
+        self.assertEqual(23, incremental.evaluations)
+
+        for ξ in (xs[1], xs[6], xs[7]):
+            incremental.unpin(ξ)
+        self.assertEqual(root.bottom_up_eval(ev), incremental.value)
+        self.assertTrue(sums[0] in incremental)
+        self.assertFalse(b.apply(xs[0], xs[7]) in incremental)
+
+    def test_traversal(self):
+        b = TestExpr.B()
+        xs = [TestExpr.A(i).apply() for i in range(4)]
+        f = b.apply(xs[0], xs[1])
+        g = b.apply(xs[2], f)
+        e = b.apply(f, b.apply(g, xs[3]))
+        self.assertEqual(list(e.topological_order()), list(e.postorder()))
+        self.assertEqual([e, f, xs[0], xs[1], b.apply(g, xs[3]), g, xs[2], xs[3]], list(e.preorder()))
+        self.assertEqual([xs[0], xs[1], f, e.args[1], e], list(e.postorder(lambda ε: ε is e.args[1])))
+
+        traversal = e.preorder()
+        for ε in traversal:
+            if ε is f:
+                traversal.prune()
+        self.assertNotIn(xs[0], traversal.visited)
+        self.assertIn(xs[3], traversal.visited)
+
+        traversal = e.preorder()
+        self.assertIs(e, next(traversal))
+        self.assertIs(f, next(traversal))
+        traversal.stop()
+        self.assertEqual([], list(traversal))
+        self.assertEqual(2, len(traversal.visited))
+
+        visited = set(f.postorder())
+        self.assertEqual([xs[2], g], list(g.postorder(visited=visited)))
+        self.assertEqual([xs[3], b.apply(g, xs[3]), e], list(Traversal((e,), True, None, visited)))
+
+        inspected: 'List[Expr]' = []
+
+        def is_f(expr: 'Expr') -> 'bool':
+            inspected.append(expr)
+            return expr is f
+
+        self.assertTrue(e.contains(is_f))
+        self.assertEqual([e, f], inspected)
+        self.assertFalse(e.contains(lambda ε: ε is xs[0], lambda ε: ε is f))
+
+
 class TestReducers(TestCase):
     class Op(AssociativeCommutativeSymbol, IntegerMixin, IntegerArgsMixin):
         def _binary_reduce(self, a: 'Expr', b: 'Expr') -> 'Optional[Expr]':
@@ -262,6 +453,8 @@ class TestBuiltins(TestCase):
                          boolean_or(a.negated, b))
         self.assertEqual(boolean_and(boolean_or(a, b), a.negated),
                          boolean_and(a.negated, b))
+        self.assertEqual(boolean_and(boolean_or(a, b, c), a.negated),
+                         boolean_and(a.negated, boolean_or(b, c)))
         self.assertEqual(boolean_implies(a, b),
                          boolean_implies(b.negated, a.negated))
         self.assertEqual(a.negated.negated, a)
@@ -275,7 +468,383 @@ class TestBuiltins(TestCase):
         self.assertEqual(boolean_eq(a, a, a, a), boolean(True))
         self.assertEqual(boolean_eq(b, a, a), boolean_eq(a, b))
         self.assertEqual(boolean_eq(a, b, c),
-                         boolean_and(boolean_eq(a, b), boolean_eq(b, c)))
+                         boolean_or(boolean_and(a, b, c), boolean_and(a.negated, b.negated, c.negated)))
+        self.assertEqual(boolean_eq(a, b.negated, a), boolean_eq(a, b.negated))
+        self.assertEqual(boolean_eq(a, b, a.negated, c), boolean(False))
+
+    def test_large_ac_reduction(self):
+        n = 2000
+        vs = [VariableSymbol(Sort.BOOL).apply() for _ in range(n)]
+        e = boolean_and(*vs, boolean(True), *vs[::2], boolean(True))
+        self.assertEqual(tuple(sorted(vs)), e.args)
+        self.assertEqual(boolean(False), boolean_and(*vs, boolean(True), vs[-1].negated))
+        self.assertEqual(boolean(True), boolean_or(boolean(True), *vs))
+
+        xs = [VariableSymbol(Sort.INT).apply() for _ in range(n)]
+        e = integer_sum(*xs, *(integer(i) for i in range(10)), *(ξ.negated for ξ in xs[1:]), xs[0])
+        self.assertEqual(integer_sum(xs[0], xs[0], integer(45)), e)
+        self.assertEqual(3, len(e.args))
+
+        # Resolution, absorption and unit rules find complementary literals and
+        # clauses from their structure, without building negations.
+        a, b, c = vs[:3]
+        na, nb, nc = a.negated, b.negated, c.negated
+        clauses = [boolean_or(a, b), boolean_or(a, nb), boolean_or(na, c), boolean_or(b, c, vs[3])]
+        nested = boolean_or(vs[4], boolean_and(na, nb))
+        statistics = NegatorSymbol(Sort.BOOL).statistics
+        misses = statistics.misses
+        self.assertEqual(boolean_and(a, c), boolean_and(*clauses))
+        self.assertEqual(boolean_and(boolean_or(a, b), vs[4]), boolean_and(boolean_or(a, b), nested))
+        self.assertEqual(boolean_and(nc, na, b), boolean_and(na, boolean_or(a, b), nc))
+        self.assertEqual(misses, statistics.misses)
+
+        # Flattening and matching arguments builds none of their negations.
+        ys = [VariableSymbol(Sort.INT).apply() for _ in range(50)]
+        statistics = NegatorSymbol(Sort.INT).statistics
+        misses = statistics.misses
+        e = integer_sum(integer_sum(*ys[:25]), *ys[25:], *ys[:10], integer(1))
+        self.assertEqual(61, len(e.args))
+        self.assertEqual(misses, statistics.misses)
+
+    def test_builder(self):
+        vs = [VariableSymbol(Sort.BOOL).apply() for _ in range(50)]
+        for neutral_elem in (True, False):
+            connective = BooleanConnectiveSymbol(neutral_elem)
+            builder = ExprBuilder(connective)
+            self.assertEqual(boolean(neutral_elem), builder.build())
+            for ν in vs:
+                builder.add(ν, connective.apply(ν, vs[0]))
+            self.assertEqual(50, len(builder))
+            self.assertEqual(connective.apply(*vs), builder.build())
+            self.assertEqual(boolean(not neutral_elem), builder.add(vs[7].negated).build())
+            builder = ExprBuilder(connective).add(vs[0].negated, boolean(neutral_elem))
+            self.assertEqual(vs[0].negated, builder.build())
+            self.assertEqual(boolean(not neutral_elem), builder.extend(vs).build())
+
+        random.seed(45)
+        literals = [*vs, *(ν.negated for ν in vs[:10])]
+        for _ in range(50):
+            args = [boolean_or(*random.sample(literals, 2)) for _ in range(10)]
+            self.assertEqual(boolean_and(*args), ExprBuilder(BooleanConnectiveSymbol(True)).extend(args).build())
+
+        xs = [VariableSymbol(Sort.INT).apply() for _ in range(5)]
+        builder = ExprBuilder(IntegerSumSymbol())
+        self.assertEqual(integer(0), builder.build())
+        builder.add(xs[0], integer(2), xs[1].negated, xs[1], integer_sum(xs[0], xs[2], integer(-2)))
+        self.assertEqual(integer_sum(xs[0], xs[0], xs[2]), builder.build())
+        builder.add(xs[0].negated, xs[2].negated, integer(3))
+        self.assertEqual(integer_sum(xs[0], integer(3)), builder.build())
+        builder.add(xs[0].negated, integer(-3))
+        self.assertEqual(integer(0), builder.build())
+
+        builder = ExprBuilder(IntegerEqSymbol()).add(xs[0], xs[0])
+        self.assertEqual(boolean(True), builder.build())
+        self.assertEqual(integer_eq(xs[0], xs[1], integer(1)), builder.add(xs[1], integer(1), xs[1]).build())
+        self.assertEqual(boolean(False), builder.add(integer(2)).build())
+        builder = ExprBuilder(BooleanEqSymbol()).add(vs[0], vs[1], vs[0])
+        self.assertEqual(boolean_eq(vs[0], vs[1]), builder.build())
+        self.assertEqual(boolean(False), builder.add(vs[1].negated).build())
+
+    def test_clause_index(self):
+        vs = [VariableSymbol(Sort.BOOL).apply() for _ in range(300)]
+        a, b, c = vs[:3]
+        clause = boolean_or(a, b.negated, c)
+        self.assertEqual(frozenset((a, b.negated, c)), clause.arg_set)
+        self.assertEqual(0, clause.arg_signature & ~boolean_or(a, b.negated, c, vs[3]).arg_signature)
+
+        clauses = [boolean_or(vs[i], vs[i + 1], vs[i + 2]) for i in range(3, len(vs) - 2)]
+        e = boolean_and(*clauses,
+                        boolean_or(a, b), boolean_or(a, b, c),
+                        boolean_or(a.negated, c), boolean_or(a.negated, c.negated))
+        self.assertEqual(set(clauses) | {a.negated, b}, set(e.args))
+
+    def test_macros(self):
+        x, y = VariableSymbol(Sort.BOOL), VariableSymbol(Sort.BOOL)
+        a, b, c = (VariableSymbol(Sort.BOOL).apply() for _ in range(3))
+        body = boolean_or(x.apply(), y.apply().negated)
+        eager = MacroSymbol(Sort.BOOL, (x, y), body)
+        self.assertIs(eager, MacroSymbol(Sort.BOOL, (x, y), body, False))
+        self.assertEqual(boolean_or(a, b.negated), eager.apply(a, b))
+        self.assertIs(eager.expand(a, b), eager.expand(a, b))
+
+        # Laziness splits a macro into two symbols with the same structure,
+        # whose applications agree once expanded.
+        lazy = MacroSymbol(Sort.BOOL, (x, y), body, True)
+        self.assertIsNot(eager, lazy)
+        self.assertIs(lazy, MacroSymbol(Sort.BOOL, (x, y), body, lazy=True))
+        self.assertEqual(eager.structure, lazy.structure)
+        self.assertIs(eager.apply(a, b), expand_macros(lazy.apply(a, b)))
+        outer = MacroSymbol(Sort.BOOL, (x, y), boolean_and(lazy.apply(x.apply(), y.apply()), y.apply()), True)
+        e = boolean_and(outer.apply(a, b), lazy.apply(b, c))
+        self.assertEqual({outer, lazy}, {π.symbol for π in e.args})
+        self.assertIn(outer.apply(a, b), e.args)
+        self.assertEqual(boolean_and(boolean_or(a, b.negated), b, boolean_or(b, c.negated)), expand_macros(e))
+
+    def test_application_statistics(self):
+        a = VariableSymbol(Sort.BOOL).apply()
+        b = VariableSymbol(Sort.BOOL).apply()
+        statistics = BooleanEqSymbol().statistics
+        hits, misses, reductions = statistics.hits, statistics.misses, statistics.reductions
+        e = boolean_eq(a, b)
+        self.assertIs(e, boolean_eq(a, b))
+        self.assertEqual(hits + 1, statistics.hits)
+        self.assertEqual(misses + 1, statistics.misses)
+        self.assertEqual(reductions + 1, statistics.reductions)
+        self.assertGreater(statistics.reduce_time, 0.0)
+        default = ValencySymbol.retention_policy()
+        self.assertIsInstance(default, WeakRetentionPolicy)
+
+        # The default policy pins neither the arguments nor the result
+        c, d = VariableSymbol(Sort.BOOL).apply(), VariableSymbol(Sort.BOOL).apply()
+        default.put((BooleanEqSymbol(), (a, c)), d)
+        self.assertIs(d, default.get((BooleanEqSymbol(), (a, c))))
+        refs = weakref.ref(c), weakref.ref(d)
+        del c, d, e
+        gc.collect()
+        self.assertEqual([None, None], [ρ() for ρ in refs])
+        hits = statistics.hits
+        self.assertIsNotNone(boolean_eq(a, b))
+        self.assertEqual(hits, statistics.hits)
+
+        class Retention(RetentionPolicy):
+            def __init__(self) -> 'None':
+                self.entries: 'Dict[Tuple[ValencySymbol, Tuple[Expr, ...]], Expr]' = {}
+
+            def get(self, key: 'Tuple[ValencySymbol, Tuple[Expr, ...]]') -> 'Optional[Expr]':
+                return self.entries.get(key)
+
+            def put(self, key: 'Tuple[ValencySymbol, Tuple[Expr, ...]]', expr: 'Expr') -> 'None':
+                self.entries[key] = expr
+
+        retention = Retention()
+        ValencySymbol.set_retention_policy(retention)
+        try:
+            e = boolean_implies(b, a)
+            self.assertIs(e, retention.entries[(BooleanImplicationSymbol(), (b, a))])
+            self.assertIs(e, boolean_implies(b, a))
+            hits = statistics.hits
+            self.assertIs(boolean_eq(a, b), boolean_eq(a, b))
+            self.assertEqual(hits + 1, statistics.hits)
+        finally:
+            ValencySymbol.set_retention_policy(default)
+
+    def test_fingerprint(self):
+        def build(order: 'str', names: 'str' = "abc") -> 'Expr':
+            vs = {ν: VariableSymbol(Sort.BOOL, names["abc".index(ν)]).apply() for ν in order}
+            x = VariableSymbol(Sort.INT, "x").apply()
+            return boolean_and(boolean_or(vs["a"], vs["b"].negated),
+                               boolean_eq(vs["c"], integer_eq(integer_sum(x, integer(1)), integer(0))))
+
+        e1, e2 = build("abc"), build("cba")
+        self.assertIsNot(e1, e2)
+        self.assertEqual(16, len(e1.fingerprint))
+        self.assertEqual(e1.fingerprint, e2.fingerprint)
+        self.assertNotEqual(e1.fingerprint, build("abc", "bac").fingerprint)
+        self.assertNotEqual(e1.fingerprint, e1.args[0].fingerprint)
+
+        def chain(order: 'str') -> 'Tuple[Expr, Fingerprinter]':
+            vs = {ν: VariableSymbol(Sort.BOOL).apply() for ν in order}
+            return boolean_eq(*(vs[ν] for ν in "abcd")), Fingerprinter({vs[ν].symbol: ν for ν in order})
+
+        (e1, f1), (e2, f2) = chain("abcd"), chain("acdb")
+        self.assertEqual(f1(e1), f2(e2))
+        self.assertNotEqual(f1(e1), f1(boolean_eq(*e1.args[0].args[:3])))
+
+        # Equivalent but distinct expressions never share a fingerprint.
+        x, y, z = (VariableSymbol(Sort.BOOL, ν).apply() for ν in "xyz")
+        e1 = boolean_and(boolean_eq(x, y.negated), boolean_eq(y, z.negated))
+        e2 = boolean_and(boolean_eq(x, y.negated), boolean_eq(x, z))
+        self.assertIsNot(e1, e2)
+        self.assertNotEqual(e1.fingerprint, e2.fingerprint)
+
+        a, b = VariableSymbol(Sort.BOOL), VariableSymbol(Sort.BOOL)
+        with self.assertRaises(KeyError):
+            _ = boolean_or(a.apply(), b.apply()).fingerprint
+        fingerprinter = Fingerprinter({a: "a", b: "b"})
+        self.assertEqual(fingerprinter(boolean_or(a.apply(), b.apply().negated)),
+                         boolean_or(VariableSymbol(Sort.BOOL, "a").apply(),
+                                    VariableSymbol(Sort.BOOL, "b").apply().negated).fingerprint)
+
+        script = ("from smt.logic import *\n"
+                  "a, b = VariableSymbol(Sort.BOOL, 'a').apply(), VariableSymbol(Sort.BOOL, 'b').apply()\n"
+                  "print(boolean_or(b, a.negated, boolean(False)).fingerprint.hex())\n")
+        env = dict(os.environ, PYTHONHASHSEED="12345")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, "-c", script], cwd=root, env=env, check=True, stdout=subprocess.PIPE)
+        a, b = VariableSymbol(Sort.BOOL, 'a').apply(), VariableSymbol(Sort.BOOL, 'b').apply()
+        self.assertEqual(boolean_or(a.negated, b).fingerprint.hex(), out.stdout.decode().strip())
+
+    def test_lazy_negation(self):
+        a = VariableSymbol(Sort.BOOL).apply()
+        b = VariableSymbol(Sort.BOOL).apply()
+        gc.disable()
+        try:
+            e = boolean_and(a, b)
+            n = e.negated
+            self.assertIs(boolean_or(a.negated, b.negated), n)
+            self.assertIs(e, n.negated)
+            refs = weakref.ref(e), weakref.ref(n)
+            del e, n
+            self.assertIsNone(refs[0]())
+            self.assertIsNone(refs[1]())
+        finally:
+            gc.enable()
+
+    def test_metrics(self):
+        a = VariableSymbol(Sort.BOOL).apply()
+        b = VariableSymbol(Sort.BOOL).apply()
+        x = VariableSymbol(Sort.INT).apply()
+        p = integer_eq(x, integer(1))
+        e = boolean_and(boolean_or(a, b.negated), boolean_or(a.negated, p))
+        self.assertEqual(0, a.depth)
+        self.assertEqual(3, e.depth)
+        self.assertEqual(10, e.dag_size)
+        self.assertEqual(frozenset({a, b, x}), e.variables)
+        self.assertEqual(frozenset({a, b, p}), e.atoms)
+        self.assertEqual(frozenset(), boolean(True).atoms)
+
+    def test_pickling(self):
+        a = VariableSymbol(Sort.BOOL).apply()
+        b = VariableSymbol(Sort.BOOL).apply()
+        c = VariableSymbol(Sort.BOOL).apply()
+        e = boolean_and(boolean_or(a, b), boolean_or(a, c.negated), boolean_eq(b, c))
+        self.assertIs(integer(42), pickle.loads(pickle.dumps(integer(42))))
+        self.assertIs(e.symbol, pickle.loads(pickle.dumps(e.symbol)))
+
+        self.assertIs(a, pickle.loads(pickle.dumps(a)))
+        self.assertIs(e, pickle.loads(pickle.dumps(e)))
+        self.assertEqual((a, b, c, e), pickle.loads(pickle.dumps((a, b, c, e))))
+
+        # Variables keep their identity through a round trip to another process.
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = "import pickle, sys\nsys.stdout.buffer.write(pickle.dumps(pickle.loads(sys.stdin.buffer.read())))\n"
+        out = subprocess.run([sys.executable, "-c", script], cwd=root, input=pickle.dumps(e),
+                             check=True, stdout=subprocess.PIPE)
+        self.assertIs(e, pickle.loads(out.stdout))
+
+        # Once the originals are gone, separately pickled expressions are loaded
+        # onto shared fresh variables.
+        def dump() -> 'Tuple[bytes, bytes]':
+            x, y, z = (VariableSymbol(Sort.BOOL).apply() for _ in range(3))
+            return pickle.dumps(boolean_or(x, y)), pickle.dumps(boolean_and(y, z.negated))
+
+        d1, d2 = dump()
+        gc.collect()
+        e1, e2 = pickle.loads(d1), pickle.loads(d2)
+        self.assertEqual(1, len(e1.variables & e2.variables))
+        self.assertIs(e1, pickle.loads(d1))
+        self.assertIs(e2.negated.negated, e2)
+
+    def test_arena(self):
+        with Unique.arena() as arena:
+            a = VariableSymbol(Sort.BOOL).apply()
+            b = VariableSymbol(Sort.BOOL).apply()
+            e = boolean_or(a, b.negated)
+            self.assertIs(e, boolean_or(b.negated, a))
+            self.assertIs(boolean(True), boolean_or(a, a.negated))
+            self.assertGreater(len(arena), 0)
+        self.assertEqual(0, len(arena))
+        self.assertIs(e, boolean_or(a, b.negated))
+        self.assertIs(boolean(False), boolean_and(a, a.negated))
+
+        # Objects built inside an arena that are still referenced from global
+        # objects and caches stay interned once it closes.
+        c = VariableSymbol(Sort.BOOL).apply()
+        x = VariableSymbol(Sort.BOOL)
+        g = boolean_and(a, c)
+        m = MacroSymbol(Sort.BOOL, (x,), boolean_or(x.apply(), c))
+        with Unique.arena():
+            with Unique.arena():
+                self.assertIs(boolean_or(a.negated, c.negated), g.negated)
+                self.assertIs(boolean_or(b, c), m.apply(b))
+        self.assertIs(g.negated, boolean_or(a.negated, c.negated))
+        self.assertIs(m.apply(b), boolean_or(b, c))
+        self.assertIs(boolean_or(b, c).negated, boolean_and(b.negated, c.negated))
+
+        with Unique.arena() as arena:
+            ref = weakref.ref(boolean_or(a, c.negated))
+            self.assertIsNotNone(ref())
+        self.assertIsNone(ref())
+
+    def test_thread_arenas(self):
+        xs = [VariableSymbol(Sort.BOOL).apply() for _ in range(4)]
+        entered, built, exited = Event(), Event(), Event()
+        sizes: 'List[int]' = []
+
+        def hold_arena() -> 'None':
+            try:
+                with Unique.arena() as arena:
+                    entered.set()
+                    built.wait(10)
+                    sizes.append(len(arena))
+            finally:
+                exited.set()
+
+        # Another thread's arena neither captures objects built here nor has
+        # to be closed in the reverse order of the arenas of this thread.
+        thread = Thread(target=hold_arena)
+        thread.start()
+        entered.wait(10)
+        e = boolean_or(xs[0], xs[1])
+        with Unique.arena():
+            f = boolean_or(xs[2], xs[3])
+            built.set()
+            exited.wait(10)
+        thread.join()
+        self.assertEqual([0], sizes)
+        del f
+        self.assertIs(e, boolean_or(xs[1], xs[0]))
+
+        # An object interned in another thread's arena is found, not rebuilt,
+        # and stays the only copy once that arena closes.
+        for event in (entered, built, exited):
+            event.clear()
+        shared: 'List[Expr]' = []
+
+        def build_in_arena() -> 'None':
+            try:
+                with Unique.arena():
+                    shared.append(boolean_and(xs[0], xs[2]))
+                    entered.set()
+                    built.wait(10)
+            finally:
+                exited.set()
+
+        thread = Thread(target=build_in_arena)
+        thread.start()
+        entered.wait(10)
+        g = boolean_and(xs[2], xs[0])
+        built.set()
+        exited.wait(10)
+        thread.join()
+        self.assertIs(shared[0], g)
+        shared.clear()
+        self.assertIs(g, boolean_and(xs[0], xs[2]))
+
+    def test_concurrent_construction(self):
+        xs = [VariableSymbol(Sort.BOOL).apply() for _ in range(20)]
+        results: 'List[List[Expr]]' = []
+
+        def build(seed: 'int') -> 'None':
+            rnd = random.Random(seed)
+            res: 'List[Expr]' = []
+            for i in range(len(xs)):
+                for j in range(i):
+                    args = [xs[i], xs[j].negated, xs[(i * j) % len(xs)]]
+                    rnd.shuffle(args)
+                    res.append(boolean_eq(boolean_or(*args), boolean_and(*args)))
+            results.append(res)
+
+        threads = [Thread(target=build, args=(k,)) for k in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(threads), len(results))
+        for res in results[1:]:
+            self.assertEqual(len(results[0]), len(res))
+            for e1, e2 in zip(results[0], res):
+                self.assertIs(e1, e2)
 
     def test_integer_eq(self):
         a = VariableSymbol(Sort.INT).apply()
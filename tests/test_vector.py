@@ -0,0 +1,63 @@
+from unittest import TestCase
+
+from smt.util import Memory, Vector, TransactionalVector
+
+
+# -----------------------------------------------------------------------------
+
+
+class TestVector(TestCase):
+    def test_extend_and_slice(self):
+        v: 'Vector[int]' = Vector()
+        v.append(0)
+        v.extend(range(1, 10))
+        self.assertEqual(list(range(10)), list(v))
+
+        s = v[2:8:2]
+        self.assertEqual([2, 4, 6], list(s))
+        self.assertEqual([6, 4, 2], list(reversed(s)))
+        self.assertEqual([4, 6], list(s[1:]))
+        self.assertEqual(6, s[-1])
+
+        s[0] = 20
+        self.assertEqual(20, v[2])
+        self.assertEqual([7, 8, 9], list(v.slice(7)))
+
+    def test_truncate_and_extend(self):
+        v: 'Vector[str]' = Vector()
+        v.extend("abcdef")
+        v.truncate(2)
+        v.extend("xy")
+        v.append("z")
+        self.assertEqual(list("abxyz"), list(v))
+        v.remove_by_pop(0)
+        self.assertEqual(list("zbxy"), list(v))
+        with self.assertRaises(IndexError):
+            _ = v[4]
+
+    def test_shrink(self):
+        v: 'Vector[int]' = Vector()
+        v.extend(range(1000))
+        self.assertEqual(1000, v.capacity)
+        v.truncate(600)
+        self.assertEqual(1000, v.capacity)
+        v.truncate(100)
+        self.assertEqual(250, v.capacity)
+        self.assertEqual(list(range(100)), list(v))
+        for _ in range(100):
+            v.remove_by_pop(-1)
+        self.assertEqual(0, len(v))
+        self.assertLessEqual(v.capacity, 8)
+
+    def test_transactional(self):
+        mem = Memory()
+        v: 'TransactionalVector[int]' = TransactionalVector(mem)
+        v.extend([1, 2, 3])
+        t = mem.begin_transaction()
+        v.extend([4, 5])
+        self.assertEqual([2, 3, 4], list(v[1:4]))
+        t.rollback()
+        self.assertEqual([1, 2, 3], list(v))
+
+
+# -----------------------------------------------------------------------------